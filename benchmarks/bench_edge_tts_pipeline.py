@@ -0,0 +1,174 @@
+"""
+Edge TTS 单句耗时与磁盘读写基准：原先经过文件的流程与内存中的 `synthesize()` 对比
+
+原流程：`Communicate.save` 写入 MP3 -> pydub 调用 ffmpeg 读取 MP3 文件解码 -> 导出 WAV 文件 -> 删除 MP3 -> 播放时读取 WAV 文件
+新流程：`EdgeTTS.synthesize` 在内存中收集 MP3，通过管道交给 ffmpeg 解码为 PCM，不经过磁盘（未启用缓存时）
+
+两者使用同一段 MP3，排除网络的影响：默认由 ffmpeg 生成 24kHz 单声道 48kbps 的测试音（与 Edge TTS 的输出格式相同），
+加上 `--edge` 时先通过 Edge TTS 合成各句的真实 MP3。两个流程都需要 PATH 中有 ffmpeg
+
+运行：python benchmarks/bench_edge_tts_pipeline.py [--edge] [重复次数]
+"""
+
+import asyncio
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+USE_EDGE = "--edge" in sys.argv
+if not USE_EDGE and "edge_tts" not in sys.modules:
+    try:
+        import edge_tts  # noqa: F401
+    except ImportError:
+        # 离线测量时不需要 edge_tts，`Communicate` 会在下面被替换
+        sys.modules["edge_tts"] = types.SimpleNamespace(Communicate=None)  # type:ignore
+
+import edge_tts  # noqa: E402
+
+from services.tts.edge_tts import EdgeTTS  # noqa: E402
+from services.tts.player import AudioClip  # noqa: E402
+
+SENTENCES = [
+    "你好呀。",
+    "欢迎来到直播间，今天也要开开心心的喵。",
+    "谢谢你送的礼物，我会继续努力唱歌和聊天的，大家晚上好。",
+    "今天我们来聊聊显卡的显存带宽，带宽决定了每秒能搬运多少数据，大模型推理时瓶颈往往在带宽而不是算力，所以显存更快的卡生成速度更快。",
+]
+"""不同长度的测试句子"""
+SECONDS_PER_CHAR = 0.22
+"""离线测试音的时长（每字秒数，与 Edge TTS 的语速相近）"""
+CHANNELS, SAMPLE_WIDTH, RATE = 1, 2, 24000
+
+
+def tone_mp3(seconds: float) -> bytes:
+    """用 ffmpeg 生成与 Edge TTS 输出格式相同的测试音"""
+    return subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds:.2f}",
+         "-ac", "1", "-ar", str(RATE), "-b:a", "48k", "-f", "mp3", "pipe:1"],
+        capture_output=True, check=True,
+    ).stdout
+
+
+async def edge_mp3(text: str) -> bytes:
+    mp3 = bytearray()
+    async for chunk in edge_tts.Communicate(text, "zh-CN-XiaoyiNeural").stream():
+        if chunk["type"] == "audio":
+            mp3 += chunk["data"]
+    return bytes(mp3)
+
+
+class ReplayCommunicate:
+    """按 Edge TTS 的分块格式回放预先取得的 MP3"""
+    sources: Dict[str, bytes] = {}
+
+    def __init__(self, text: str, voice: str, proxy=None) -> None:
+        self.mp3 = self.sources[text]
+
+    async def stream(self) -> AsyncIterator[dict]:
+        for i in range(0, len(self.mp3), 4096):
+            yield {"type": "audio", "data": self.mp3[i:i + 4096]}
+
+
+def old_path(mp3: bytes, output: Path) -> Tuple[AudioClip, int, int, int]:
+    """
+    原先的流程（与 pydub 执行的操作相同）
+
+    :return: (音频, 写入字节数, 读取字节数, 创建与删除的文件数)
+    """
+    mp3_file = output / f"{time.time_ns()}.mp3"
+    wav_file = mp3_file.with_suffix(".wav")
+    # communicate.save(output_file)
+    mp3_file.write_bytes(mp3)
+    if os.stat(mp3_file).st_size == 0:
+        raise RuntimeError("生成的TTS语音文件为空")
+    # AudioSegment.from_mp3：ffmpeg 读取 MP3 文件并解码
+    pcm = subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-y", "-i", str(mp3_file), "-vn",
+         "-f", "s16le", "-ac", str(CHANNELS), "-ar", str(RATE), "pipe:1"],
+        capture_output=True, check=True,
+    ).stdout
+    # sound.export(..., format="wav")
+    AudioClip(CHANNELS, SAMPLE_WIDTH, RATE, memoryview(pcm)).save(str(wav_file))
+    wav_size = os.stat(wav_file).st_size
+    os.remove(mp3_file)
+    # 播放时读取 WAV 文件
+    clip = AudioClip.from_wav(str(wav_file))
+    return clip, len(mp3) + wav_size, len(mp3) + wav_size, 3
+
+
+class WriteCounter:
+    """通过审计钩子统计以写入模式打开的文件数"""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.opened: List[str] = []
+        sys.addaudithook(self.hook)
+
+    def hook(self, event: str, args: tuple):
+        # 以文件描述符打开的是与 ffmpeg 通信的管道，不计入
+        if self.enabled and event == "open" and isinstance(args[0], (str, bytes, os.PathLike)):
+            mode = args[1] or "r"
+            if isinstance(mode, str) and any(flag in mode for flag in "wax+"):
+                self.opened.append(str(args[0]))
+
+
+def percentile(values: List[float], ratio: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * ratio), len(ordered) - 1)]
+
+
+async def main(repeat: int):
+    if not shutil.which("ffmpeg"):
+        sys.exit("需要 ffmpeg")
+
+    for text in SENTENCES:
+        ReplayCommunicate.sources[text] = await edge_mp3(text) if USE_EDGE else tone_mp3(len(text) * SECONDS_PER_CHAR)
+    edge_tts.Communicate = ReplayCommunicate  # type:ignore
+
+    tts = EdgeTTS({"proxy": None})
+    counter = WriteCounter()
+    output = Path(tempfile.mkdtemp(prefix="bench_edge_tts_"))
+    print(f"MP3 来源: {'Edge TTS' if USE_EDGE else 'ffmpeg 测试音'}，每句重复 {repeat} 次")
+    print(f"{'时长':>6} {'MP3':>8} | {'原流程 p50':>10} {'p95':>8} {'写入':>9} {'文件操作':>6} | {'新流程 p50':>10} {'p95':>8} {'写入文件':>6}")
+    try:
+        for text in SENTENCES:
+            mp3 = ReplayCommunicate.sources[text]
+            old_times: List[float] = []
+            new_times: List[float] = []
+            written = files = 0
+            for _ in range(repeat):
+                start = time.perf_counter()
+                clip, written, _, files = old_path(mp3, output)
+                old_times.append(time.perf_counter() - start)
+
+                counter.opened.clear()
+                counter.enabled = True
+                start = time.perf_counter()
+                new_clip = await tts.synthesize(text)
+                new_times.append(time.perf_counter() - start)
+                counter.enabled = False
+                assert new_clip is not None and abs(new_clip.duration - clip.duration) < 0.1
+
+            print(
+                f"{clip.duration:>5.1f}s {len(mp3) / 1024:>6.1f}KB | "
+                f"{statistics.median(old_times) * 1000:>8.1f}ms {percentile(old_times, 0.95) * 1000:>6.1f}ms "
+                f"{written / 1024:>7.1f}KB {files:>8} | "
+                f"{statistics.median(new_times) * 1000:>8.1f}ms {percentile(new_times, 0.95) * 1000:>6.1f}ms "
+                f"{len(counter.opened):>8}"
+            )
+    finally:
+        shutil.rmtree(output, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    counts = [arg for arg in sys.argv[1:] if arg.isdigit()]
+    asyncio.run(main(int(counts[0]) if counts else 20))
@@ -0,0 +1,85 @@
+"""
+事件循环延迟基准：同步 SDK 流式输出（如 Dashscope）直接迭代与经 `iterate_blocking` 桥接的对比
+
+模拟的 SDK 流在每块内容之前阻塞读取一段时间，同时用一个定时器每 10ms 醒来一次，
+测量事件循环被阻塞的程度（醒来时间超出预期的部分即为延迟）
+
+运行：python benchmarks/bench_loop_lag.py [块数] [每块阻塞毫秒数]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import AsyncIterator, Callable, Iterator, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from infra.runtime import Runtime, iterate_blocking  # noqa: E402
+
+TICK = 0.01
+"""定时器间隔（秒）"""
+
+
+def sdk_stream(chunks: int, read: float) -> Iterator[str]:
+    """模拟同步 SDK 的流式响应：每块内容之前有一次阻塞的网络读取"""
+    for i in range(chunks):
+        time.sleep(read)
+        yield f"chunk{i}"
+
+
+async def direct(chunks: int, read: float) -> AsyncIterator[str]:
+    """桥接前的做法：在事件循环中直接迭代同步流"""
+    for chunk in sdk_stream(chunks, read):
+        yield chunk
+
+
+async def bridged(chunks: int, read: float) -> AsyncIterator[str]:
+    """Dashscope 加载器的做法：在 llm-io 线程池中迭代，逐块交给事件循环"""
+    async for chunk in iterate_blocking("llm-io", sdk_stream(chunks, read)):
+        yield chunk
+
+
+async def measure(stream: Callable[[int, float], AsyncIterator[str]], chunks: int, read: float) -> Tuple[int, float, List[float]]:
+    """
+    :return: (收到的块数, 总耗时, 各次定时器的延迟)
+    """
+    lags: List[float] = []
+    done = False
+
+    async def ticker():
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(TICK)
+            lags.append(time.perf_counter() - start - TICK)
+
+    tick_task = asyncio.create_task(ticker())
+    await asyncio.sleep(TICK * 1.5)
+    start = time.perf_counter()
+    received = 0
+    async for _ in stream(chunks, read):
+        received += 1
+    total = time.perf_counter() - start
+    done = True
+    await tick_task
+    return received, total, lags
+
+
+async def main(chunks: int, read_ms: float):
+    Runtime.attach()
+    try:
+        print(f"模拟流: {chunks} 块，每块阻塞 {read_ms:g}ms，定时器间隔 {TICK * 1000:g}ms")
+        for stream in (direct, bridged):
+            received, total, lags = await measure(stream, chunks, read_ms / 1000)
+            print(
+                f"{stream.__name__:>8}: {received} 块 {total:.2f}s | 循环延迟 p50 {statistics.median(lags) * 1000:.1f}ms "
+                f"最大 {max(lags) * 1000:.1f}ms | 定时器触发 {len(lags)} 次"
+            )
+    finally:
+        await Runtime.shutdown()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    asyncio.run(main(int(args[0]) if args else 40, float(args[1]) if len(args) > 1 else 50))
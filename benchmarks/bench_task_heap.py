@@ -0,0 +1,111 @@
+"""
+预处理队列微基准：`TaskHeap` 与原先「取出全部 - 排序 - 重新入队」实现的对比
+
+每次操作为一次队列已满时的入队（淘汰最差任务）加一次分发（取出最优任务），
+与直播间弹幕持续涌入、队列保持满载时的情形一致。为公平起见，旧实现会把淘汰后剩余的任务重新入队
+
+运行：python benchmarks/bench_task_heap.py [队列大小 ...]
+"""
+
+import asyncio
+import random
+import sys
+import time
+import types
+from pathlib import Path
+from typing import List, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "core"))
+
+# task_heap 只在类型注解中用到 BaseTask，这里不必加载完整的任务模块（及其模型、TTS 等依赖）
+if "tasks" not in sys.modules:
+    sys.modules["tasks"] = types.SimpleNamespace(BaseTask=object)  # type:ignore
+
+from task_heap import TaskHeap  # noqa: E402
+
+SIZES = [7, 100, 1000, 10000]
+"""默认测量的队列大小"""
+
+
+class BenchTask:
+    """只带有排序所需字段的任务"""
+
+    def __init__(self, created: float) -> None:
+        self.time = created
+
+    def __lt__(self, other: "BenchTask") -> bool:
+        return self.time < other.time
+
+
+Item = Tuple[float, BenchTask]
+
+
+def make_items(count: int) -> List[Item]:
+    now = time.time()
+    return [(random.choice([2, 3, 5, 10]), BenchTask(now + i * 1e-3)) for i in range(count)]
+
+
+async def old_round(queue: asyncio.PriorityQueue, item: Item):
+    """原实现：入队时取出全部任务排序淘汰，分发时再取出全部任务排序后重新入队"""
+    items = []
+    while not queue.empty():
+        items.append(await queue.get())
+    items.append(item)
+    items.sort(key=lambda x: (x[0], -x[1].time))
+    items.pop()
+    for survivor in items:
+        await queue.put(survivor)
+
+    items = []
+    while not queue.empty():
+        items.append(await queue.get())
+    items.sort(key=lambda x: (x[0], x[1]))
+    for rest in items[1:]:
+        await queue.put(rest)
+    # 分发后补回一个任务，保持队列满载
+    await queue.put(items[0])
+
+
+def new_round(heap: TaskHeap, item: Item):
+    heap.push(*item)
+    heap.evict_worst()
+    best = heap.pop_best()
+    heap.push(*best)
+
+
+async def measure(size: int, rounds: int) -> Tuple[float, float]:
+    """
+    :return: (旧实现, TaskHeap) 每次操作的平均耗时（微秒）
+    """
+    incoming = make_items(rounds)
+
+    queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+    for item in make_items(size):
+        queue.put_nowait(item)
+    start = time.perf_counter()
+    for item in incoming:
+        await old_round(queue, item)
+    old = (time.perf_counter() - start) / rounds * 1e6
+
+    heap = TaskHeap()
+    for item in make_items(size):
+        heap.push(*item)
+    start = time.perf_counter()
+    for item in incoming:
+        new_round(heap, item)
+    new = (time.perf_counter() - start) / rounds * 1e6
+    return old, new
+
+
+async def main(sizes: List[int]):
+    random.seed(0)
+    print(f"{'队列大小':>8} {'旧实现':>12} {'TaskHeap':>12} {'加速比':>8}")
+    for size in sizes:
+        rounds = max(20, min(2000, 200000 // size))
+        old, new = await measure(size, rounds)
+        print(f"{size:>8} {old:>10.1f}us {new:>10.1f}us {old / new:>7.0f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main([int(arg) for arg in sys.argv[1:]] or SIZES))
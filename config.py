@@ -1,7 +1,7 @@
 import sys
 import yaml
 import os
-from typing import Optional
+from typing import Dict, Optional
 from services.llm import ModelConfig
 from pathlib import Path
 
@@ -29,6 +29,9 @@ class Config:
         self.TTS_LOADER = self.config['tts']['loader']
         self.TTS_CONFIG = self.config['tts']
         self.WEATHER = self.config['weather']
+        self.QUEUE_CONFIG = self.config.get('queue') or {}
+        self.RUNTIME_CONFIG = self.config.get('runtime') or {}
+        self.ROUTER_CONFIG = self.config.get('router') or {}
 
     def save(self, key:str, value:str) -> None:
         self.config[key] = value
@@ -36,13 +39,7 @@ class Config:
         with open('configs.yml','w',encoding='utf-8') as f:
             yaml.dump(self.config, f)
 
-def get_model_config(model_config_types: Optional[str] = "default") -> ModelConfig:
-    """
-    从配置文件 `configs/models.yml` 中获取指定模型的配置文件
-
-    :model_config_name: (可选)模型配置名称。若为空，则先寻找配置了 `default: true` 的首个配置项，若失败就再寻找首个配置项
-    若都不存在，则抛出 `FileNotFoundError`
-    """
+def _load_model_configs() -> dict:
     if not os.path.isfile(MODELS_CONFIG_PATH):
         raise FileNotFoundError("configs/models.yml 不存在！请先创建")
 
@@ -52,6 +49,17 @@ def get_model_config(model_config_types: Optional[str] = "default") -> ModelConf
     if not configs:
         raise ValueError("configs/models.yml 为空，请先至少定义一个模型配置")
 
+    return configs
+
+def get_model_config(model_config_types: Optional[str] = "default") -> ModelConfig:
+    """
+    从配置文件 `configs/models.yml` 中获取指定模型的配置文件
+
+    :model_config_name: (可选)模型配置名称。若为空，则先寻找配置了 `default: true` 的首个配置项，若失败就再寻找首个配置项
+    若都不存在，则抛出 `FileNotFoundError`
+    """
+    configs = _load_model_configs()
+
     model_config = next((config for config in configs.values() if config.get(model_config_types)), None)  # 尝试获取默认配置
     if not model_config:
         model_config = next(iter(configs.values()), None)  # 尝试获取第一个配置
@@ -61,4 +69,19 @@ def get_model_config(model_config_types: Optional[str] = "default") -> ModelConf
 
     model_config = ModelConfig(**model_config)
 
-    return model_config
\ No newline at end of file
+    return model_config
+
+def get_model_configs(model_config_types: str = "default") -> Dict[str, ModelConfig]:
+    """
+    从配置文件 `configs/models.yml` 中获取指定用途的所有模型配置（按文件中的顺序），供模型路由使用（仅在 `router.enabled` 为 true 时）
+
+    :model_config_types: 模型用途，即配置项中标记为 true 的字段（如 `default`、`leisure`、`multimodal`）
+    若没有配置项标记该用途，则与 `get_model_config` 相同退回首个配置项
+    """
+    configs = _load_model_configs()
+
+    matched = {name: ModelConfig(**config) for name, config in configs.items() if config and config.get(model_config_types)}
+    if matched:
+        return matched
+
+    return {next(iter(configs)): get_model_config(model_config_types)}
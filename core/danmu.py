@@ -3,11 +3,18 @@ from services.blivedm.blivedm.models import open_live as open_models
 from services.blivedm.blivedm.models import web as web_models
 from .event_handler import DanmuEventHandler
 from .resources import Resources
-import logging,asyncio,threading,time
+from infra.runtime import Runtime
+import logging,asyncio
+from typing import Optional
 
 logger = logging.getLogger('Muice.Danmu')
 
 class DanmuHandler(blivedm.BaseHandler):
+    """
+    弹幕事件回调
+
+    blivedm 客户端与事件队列运行在同一个事件循环中，回调直接在该循环中启动事件处理任务
+    """
     def __init__(self, EventHandler:DanmuEventHandler):
         self.EventHandler = EventHandler
 
@@ -20,38 +27,32 @@ class DanmuHandler(blivedm.BaseHandler):
 
     def _on_open_live_enter_room(self, client: blivedm.OpenLiveClient, message: open_models.RoomEnterMessage):
         """进入房间"""
-        loop = asyncio.get_event_loop()
-        asyncio.run_coroutine_threadsafe(self.EventHandler.EnterRoomEvent(message), loop)
+        Runtime.get().spawn(self.EventHandler.EnterRoomEvent(message), name='EnterRoomEvent')
 
     def _on_open_live_danmaku(self, client: blivedm.OpenLiveClient, message: open_models.DanmakuMessage):
-        loop = asyncio.get_event_loop()
-        asyncio.run_coroutine_threadsafe(self.EventHandler.DanmuEvent(message), loop)
+        Runtime.get().spawn(self.EventHandler.DanmuEvent(message), name='DanmuEvent')
 
     def _on_open_live_gift(self, client: blivedm.OpenLiveClient, message: open_models.GiftMessage):
-        loop = asyncio.get_event_loop()
-        asyncio.run_coroutine_threadsafe(self.EventHandler.GiftEvent(message), loop)
+        Runtime.get().spawn(self.EventHandler.GiftEvent(message), name='GiftEvent')
 
     def _on_open_live_buy_guard(self, client: blivedm.OpenLiveClient, message: open_models.GuardBuyMessage):
-        loop = asyncio.get_event_loop()
-        asyncio.run_coroutine_threadsafe(self.EventHandler.GuardBuyEvent(message), loop)
+        Runtime.get().spawn(self.EventHandler.GuardBuyEvent(message), name='GuardBuyEvent')
 
     def _on_open_live_super_chat(
         self, client: blivedm.OpenLiveClient, message: open_models.SuperChatMessage
     ):
-        loop = asyncio.get_event_loop()
-        asyncio.run_coroutine_threadsafe(self.EventHandler.SuperChatEvent(message), loop)
+        Runtime.get().spawn(self.EventHandler.SuperChatEvent(message), name='SuperChatEvent')
 
 class DanmuClient:
     def __init__(self, danmuhandler, webui = None):
         resource = Resources.get()
         self.config = resource.config
-        self.__client_process = False
-        self.loop = None
+        self.__stop_event: Optional[asyncio.Event] = None
         self.handler = danmuhandler
         self.webui = webui
 
     async def __run_client(self):
-        self.__client_process = True
+        self.__stop_event = asyncio.Event()
         self.client = blivedm.OpenLiveClient(
             access_key_id = self.config.DANMU_ACCESS_KEY_ID,
             access_key_secret = self.config.DANMU_ACCESS_KEY_SECRET,
@@ -61,29 +62,21 @@ class DanmuClient:
         self.client.set_handler(self.handler)
         self.client.start()
         try:
-            while self.__client_process:
-                await asyncio.sleep(0.5)
+            await self.__stop_event.wait()
             self.client.stop()
             await self.client.join()
         finally:
             await self.client.stop_and_close()
-
-    def __start_client(self):
-        self.loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(self.loop)  # 将事件循环设置为当前线程的默认事件循环
-        try:
-            self.loop.run_until_complete(self.__run_client())
-        finally:
-            self.loop.close()
+            self.__stop_event = None
 
     def start_client(self):
-        client_thread = threading.Thread(target=self.__start_client, name='Blivedm', daemon=True)
-        client_thread.start()
+        Runtime.get().spawn(self.__run_client(), name='Blivedm', critical=True)
         if self.webui:
             self.webui.change_blivedm_status(1)
 
     def close_client(self):
-        self.__client_process = False
-        time.sleep(1)
+        """断开 blivedm（可跨线程调用）"""
+        if self.__stop_event is not None:
+            Runtime.get().call_soon(self.__stop_event.set)
         if self.webui:
-            self.webui.change_blivedm_status(0)
\ No newline at end of file
+            self.webui.change_blivedm_status(0)
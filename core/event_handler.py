@@ -1,10 +1,14 @@
 from services.blivedm.blivedm.models.open_live import DanmakuMessage,GiftMessage,SuperChatMessage,GuardBuyMessage,RoomEnterMessage
 from models import MessageData
 from .resources import Resources
+from services.tts import CachedTTS, TTSPool
+from services.llm import ModelRouter
+from infra.runtime import Runtime
 from ui import WebUI
 from utils.utils import get_avatar_base64, message_precheck
 import tasks
 import logging
+import time
 
 logger = logging.getLogger('Muice.Event')
 
@@ -21,6 +25,48 @@ class WebUIEventHandler:
         self.realtimechat = realtimechat
         self.chat_history = []
 
+    def get_queue_status(self) -> str:
+        """
+        队列容量、处理速度与丢弃数，供 WebUI 展示
+        """
+        return self.queue.stats.summary()
+
+    def get_tts_cache_status(self) -> str:
+        """
+        TTS 缓存命中率与占用，未启用缓存时返回空字符串
+        """
+        tts = self.resources.tts
+        return f'TTS缓存 {tts.summary()}' if isinstance(tts, CachedTTS) else ''
+
+    def get_executor_status(self) -> str:
+        """
+        各线程池的忙碌与排队情况，运行时未启动时返回空字符串
+        """
+        return Runtime.get().executor_summary() if Runtime._instance else ''
+
+    def get_warmup_status(self) -> str:
+        """
+        启动预热各阶段的耗时，预热未完成时返回提示
+        """
+        return self.resources.warmup_summary() or '预热中...'
+
+    def get_tts_pool_status(self) -> str:
+        """
+        TTS 后端池各节点的状态与延迟，未使用后端池时返回空字符串
+        """
+        tts = self.resources.tts
+        pool = tts.backend if isinstance(tts, CachedTTS) else tts
+        return pool.summary() if isinstance(pool, TTSPool) else ''
+
+    def get_model_router_status(self) -> str:
+        """
+        各模型路由中每个配置的状态、延迟与错误率，未使用模型路由时返回空字符串
+        """
+        models = {'对话模型': self.resources.model, '闲时模型': self.resources.leisure_model, '多模态模型': self.resources.multimodal}
+        return '\n'.join(
+            f'{role}:\n{model.summary()}' for role, model in models.items() if isinstance(model, ModelRouter)
+        )
+
     async def start_all(self):
         self.connect_to_LLM()
         self.connect_to_captions()
@@ -87,12 +133,12 @@ class WebUIEventHandler:
         if self.queue.is_running:
             self.queue.stop()
 
-    def stop_realtime_chat(self):
+    async def stop_realtime_chat(self):
         if not self.webui.status.realtime_chat:
             self.webui.ui.notify('未启动！',type='negative')
             return False
         self.webui.change_realtime_chat_status(0)
-        self.realtimechat.unregister_keyboard()
+        await self.realtimechat.unregister_keyboard()
         if not self.queue.is_running:
             self.queue.start()
 
@@ -143,22 +189,24 @@ class DanmuEventHandler:
         await self.quene.put(3, task)
 
     async def SuperChatEvent(self, superchat:SuperChatMessage):
+        event_time = time.time()
         username = superchat.uname
         userid = superchat.open_id
         message = superchat.message
         userface = superchat.uface
         rmb = float(superchat.rmb)
         userface = await get_avatar_base64(userface + '@250x250')
-        data = MessageData(username, userid, userface, message, total_value=rmb)
+        data = MessageData(username, userid, userface, message, total_value=rmb, event_time=event_time)
         task = tasks.SuperChatTask(data)
         await self.quene.put(1, task)
 
     async def GuardBuyEvent(self, message:GuardBuyMessage):
+        event_time = time.time()
         username = message.user_info.uname
         userid = message.user_info.open_id
         guard_level = message.guard_level
         price = message.price / 1000
-        data = MessageData(username=username, userid=userid, guard_level=guard_level, total_value=price)
+        data = MessageData(username=username, userid=userid, guard_level=guard_level, total_value=price, event_time=event_time)
         task = tasks.BuyGuardTask(data)
         await self.quene.put(1, task)
 
@@ -1,21 +1,69 @@
-from typing import Tuple, List
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Tuple, List, Optional
 import tasks
 from tasks import BaseTask
-import random,asyncio
-from threading import Thread
+from task_heap import TaskHeap
+from config import Config
+from infra.runtime import Runtime
+from services.llm import ModelError
+import math,random,asyncio,time
 import logging
 
 logger = logging.getLogger("Muice.queue")
 
-class AsyncQueueThread(Thread):
-    def __init__(self, pretreat_queue: "PretreatQueue"):
-        super().__init__(daemon=True)
-        self.pretreat_queue = pretreat_queue
 
-    def run(self):
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(self.pretreat_queue.run_forever())
+def _call_threadsafe(loop: Optional[asyncio.AbstractEventLoop], callback: Callable, *args):
+    """
+    在 `loop` 中调用 `callback`，若当前线程不在 `loop` 中运行则通过 `call_soon_threadsafe` 转交
+    """
+    if loop is None or loop.is_closed():
+        return
+    try:
+        running_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        running_loop = None
+
+    if running_loop is loop:
+        callback(*args)
+    else:
+        loop.call_soon_threadsafe(callback, *args)
+
+
+def _set_event_threadsafe(loop: Optional[asyncio.AbstractEventLoop], event: asyncio.Event):
+    """
+    设置 `event`，可跨线程调用
+    """
+    _call_threadsafe(loop, event.set)
+
+@dataclass
+class QueueStats:
+    """队列统计"""
+    expired: int = 0
+    """超过截止时间、在预处理前被丢弃的任务数"""
+    cancelled: int = 0
+    """预处理（LLM/TTS）过程中被取消的任务数"""
+    fast_lane_latency: Deque[float] = field(default_factory=lambda: deque(maxlen=100))
+    """最近的付费事件从收到事件到开始播放的延迟（秒）"""
+    dropped_full: int = 0
+    """队列已满时被淘汰的任务数"""
+    dropped_stale: int = 0
+    """等待过久（动态优先数达到上限）被丢弃的任务数"""
+    filtered: int = 0
+    """入队或取出时优先数超过上限被过滤的任务数"""
+    capacity: int = 0
+    """当前的队列容量"""
+    drain_rate: float = 0.0
+    """估计的处理速度（个/秒），为 0 时表示尚无样本"""
+    pretreat_durations: Deque[float] = field(default_factory=lambda: deque(maxlen=20))
+    """最近的普通任务预处理耗时（秒）"""
+    playback_durations: Deque[float] = field(default_factory=lambda: deque(maxlen=20))
+    """最近的任务输出耗时（含间隔，秒）"""
+
+    def summary(self) -> str:
+        drain = f"{self.drain_rate * 60:.1f}/min" if self.drain_rate else "-"
+        return (f"容量 {self.capacity} | 处理速度 {drain} | 淘汰 {self.dropped_full} | "
+                f"过期 {self.expired + self.dropped_stale} | 过滤 {self.filtered} | 取消 {self.cancelled}")
 
 
 class PretreatQueue:
@@ -23,161 +71,425 @@ class PretreatQueue:
     预处理队列
     """
     def __init__(self ,first_run=True) -> None:
-        self._queue = asyncio.PriorityQueue(maxsize=7)
-        self.post_queue = PostProcessQueue()
-
-        self.DECAY_FACTOR = 0.5
-        """每事件衰减因子（每轮处理后添加多少优先数）"""
-        self.MAX_PRIORITY = 15
+        queue_config = Config().QUEUE_CONFIG
+
+        self._epoch = time.time()
+        """动态优先级的时间基准，避免与时间戳相乘时损失精度"""
+        self._queue = TaskHeap(
+            worst_key=lambda priority, task: (-self._decay_key(priority, task), task.time),
+        )
+        self.MIN_SIZE = queue_config.get('min_size', 3)
+        """队列容量下限"""
+        self.MAX_SIZE = max(self.MIN_SIZE, queue_config.get('max_size', 30))
+        """队列容量上限"""
+        self.TARGET_WAIT = queue_config.get('target_wait', 45)
+        """期望的最长排队时间（秒），队列容量 = 处理速度 × 该时间"""
+        self.MAXSIZE = min(max(queue_config.get('initial_size', 7), self.MIN_SIZE), self.MAX_SIZE)
+        """预处理队列当前容量，超出时淘汰最差的任务。在有处理耗时样本后按处理速度调整"""
+        self.stats = QueueStats(capacity=self.MAXSIZE)
+        """队列统计"""
+        self.post_queue = PostProcessQueue(
+            maxsize=queue_config.get('ready_size', 2),
+            gap=queue_config.get('gap', 0.5),
+            preempt=queue_config.get('preempt', False),
+            on_drain=self._notify,
+            stats=self.stats,
+        )
+
+        self.WORKERS = max(1, queue_config.get('workers', 2))
+        """同时进行预处理（LLM + TTS）的任务数"""
+        self.MAX_BUFFERED_AUDIO = queue_config.get('max_buffered_audio', 30)
+        """已就绪的音频（含正在播放的剩余部分）超过多少秒时暂停分发新任务"""
+        self.MERGE_WINDOW = queue_config.get('merge_window', 20)
+        """同一用户的弹幕在首条入队后多少秒内可以合并"""
+        self.MERGE_MAX_LENGTH = queue_config.get('merge_max_length', 100)
+        """合并后弹幕的最大长度，超出时作为新任务入队"""
+
+        self.DECAY_FACTOR = queue_config.get('decay_factor', 0.2)
+        """衰减因子（任务每等待一秒增加多少优先数）"""
+        self.MAX_PRIORITY = queue_config.get('max_priority', 15)
         """最大优先数限制，等于或大于此优先数的任务将被丢弃"""
+        self.LEISURE_IDLE_TIME = 50
+        """空闲多少秒后开始尝试发布闲时任务"""
+        self.LEISURE_MEAN_DELAY = 10
+        """达到空闲时间后，发布闲时任务前的平均随机等待秒数"""
 
         self.is_running = False
-        self.idle_time = 0
         self.first_run = first_run
+        self._run_token: Optional[object] = None
+        """当前一轮运行的标识。停止后重新启动时会重新初始化队列，上一轮的循环据此发现自己已过期并退出"""
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup = asyncio.Event()
+        """入队、正式队列取出任务、停止时触发"""
+        self._idle_deadline = 0.0
+        """发布闲时任务的截止时间（time.monotonic）"""
+        self._workers: Dict[int, asyncio.Task] = {}
+        """任务 ID（`id(task)`） -> 正在进行的预处理"""
+        self._fast_workers: Dict[int, asyncio.Task] = {}
+        """任务 ID（`id(task)`） -> 正在进行的快速通道预处理（不占用预处理名额）"""
+        self._pending_by_user: Dict[str, BaseTask] = {}
+        """用户 ID -> 该用户仍在队列中的弹幕任务，用于入队时合并"""
+        self._sweep_wakeup = asyncio.Event()
+        """入队、停止时触发，用于重新计算下一次过期清理的时间"""
+
+    def _notify(self):
+        """
+        唤醒主循环（可跨线程调用）
+        """
+        _set_event_threadsafe(self._loop, self._wakeup)
 
-    async def _queue_get(self) -> Tuple[float, BaseTask]:
-        return await self._queue.get()
-    
-    async def _queue_put(self, priority:float, task: BaseTask):
-        await self._queue.put((priority, task))
+    def _decay_key(self, priority: float, task: BaseTask) -> float:
+        """
+        与时间无关的淘汰排序键（越小动态优先数越大，越先被淘汰或清理）
+
+        动态优先数 = 优先数 + 衰减因子 * 等待时间 = 排序键 + 衰减因子 * (当前时间 - 时间基准)，
+        所有任务随时间增加相同的优先数，因此队列中的相对顺序不变，堆无需重排。
+
+        取出顺序不使用该键：同一优先数的任务按创建时间先后处理，等待更久的任务不会被新任务插队
+        """
+        return priority - self.DECAY_FACTOR * (task.time - self._epoch)
+
+    def _dynamic_priority(self, priority: float, task: BaseTask, now: Optional[float] = None) -> float:
+        """
+        计算任务当前的动态优先数
+        """
+        now = time.time() if now is None else now
+        return priority + self.DECAY_FACTOR * (now - task.time)
 
-    def _merge_tasks(self, queue_items:List[Tuple[float, BaseTask]]) -> List[Tuple[float, BaseTask]]:
+    def _reset_idle_deadline(self):
         """
-        合并队列中来自相同用户的任务
+        重置闲时任务截止时间
+        """
+        delay = self.LEISURE_IDLE_TIME + random.expovariate(1 / self.LEISURE_MEAN_DELAY)
+        self._idle_deadline = time.monotonic() + delay
 
-        请注意: tasks必须是已按时间顺序排序的
+    def _merge_task(self, task: BaseTask) -> bool:
         """
-        if len(queue_items) < 2:
-            return queue_items
+        若同一用户已有仍在队列中的弹幕任务，则将 `task` 合并到该任务中
 
-        merged_tasks:List[Tuple[float, BaseTask]] = [queue_items[0]]
+        :return: 是否已合并
+        """
+        if not isinstance(task, tasks.DanmuTask):
+            return False
 
-        for prioritiy, task in queue_items[1:]:
-            last_priority, last_task = merged_tasks[-1]
-            if task.data.userid == last_task.data.userid:
-                # 合并到上一个任务中（顺序保证前小于后）
-                merged_task = last_task + task
-                merged_tasks[-1] = (last_priority, merged_task)
-                logger.debug(f"合并任务 {last_task} + {task}")
-            else:
-                # 不同用户，直接加入列表
-                merged_tasks.append((prioritiy, task))
+        pending = self._pending_by_user.get(task.data.userid)
+        if pending is None or pending not in self._queue or type(pending) is not type(task):
+            return False
+        if task.time - pending.time > self.MERGE_WINDOW:
+            return False
+        if len(pending.data.message) + len(task.data.message) + 1 > self.MERGE_MAX_LENGTH:
+            return False
 
-        return merged_tasks
+        # 合并到已入队的任务中（顺序保证前小于后）
+        pending + task
+        logger.debug(f"合并任务 {pending} + {task}")
+        return True
 
-    async def _process_queue(self) -> List[Tuple[float, BaseTask]]:
+    def _forget_task(self, task: BaseTask):
         """
-        获取队列内容并过滤优先级超过阈值的任务
+        任务离开队列时移除其用户索引
+        """
+        if self._pending_by_user.get(task.data.userid) is task:
+            del self._pending_by_user[task.data.userid]
+
+    def _pop_task(self) -> Optional[Tuple[float, BaseTask]]:
+        """
+        取出最高优先级任务并过滤优先数超过阈值的任务
         """
-        # current_time = time.time()
-        queue_items:List[Tuple[float, BaseTask]] = []
-        
         while not self._queue.empty():
-            priority, task = await self._queue_get()
-            # priority += self.DECAY_FACTOR
+            priority, task = self._queue.pop_best()
+            self._forget_task(task)
+            priority = self._dynamic_priority(priority, task)
 
             # 动态优先级过滤
             if priority >= self.MAX_PRIORITY:
+                self.stats.filtered += 1
                 logger.warning(f"任务 {task} 被过滤(动态优先级={priority:.1f})")
+                task.cancel()
                 continue
 
-            queue_items.append((priority, task))
+            if task.is_expired:
+                self.stats.expired += 1
+                logger.warning(f"任务 {task} 已超过截止时间，不再处理")
+                task.cancel()
+                continue
 
-        queue_items = self._merge_tasks(queue_items)
-        
-        return queue_items
+            return priority, task
 
-    def get_priority_snapshot(self):
+        return None
+
+    def get_priority_snapshot(self) -> List[Tuple[float, BaseTask]]:
+        """
+        观察目前的队列情况（动态优先数）
+        """
+        now = time.time()
+        return [(self._dynamic_priority(priority, task, now), task) for priority, task in self._queue.snapshot()]
+
+    def __is_active(self, token: object) -> bool:
         """
-        观察目前的队列情况
+        `token` 所属的这一轮运行是否仍在进行
+        """
+        return self.is_running and self._run_token is token
+
+    async def __sweep_expired(self, token: object):
+        """
+        后台清理动态优先数达到上限的任务
+
+        由于队列的相对顺序不随时间改变，每次只需检查动态优先数最大的任务，
+        并等待到它预计达到上限的时刻，无需遍历整个队列
         """
-        snapshot = list(self._queue._queue)  # type:ignore
-        logger.debug([(item[0], item[1]) for item in snapshot])
+        while self.__is_active(token):
+            self._sweep_wakeup.clear()
+            timeout = None
+
+            while (worst := self._queue.peek_worst()):
+                priority = self._dynamic_priority(*worst)
+                if priority < self.MAX_PRIORITY:
+                    if self.DECAY_FACTOR > 0:
+                        timeout = (self.MAX_PRIORITY - priority) / self.DECAY_FACTOR
+                    break
+
+                task = worst[1]
+                self.cancel(task)
+                self.stats.dropped_stale += 1
+                logger.warning(f"任务 {task} 等待过久被丢弃(动态优先级={priority:.1f})")
+
+            try:
+                await asyncio.wait_for(self._sweep_wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
     
+    def _update_capacity(self):
+        """
+        根据最近的处理耗时估计处理速度，并据此调整队列容量
+
+        预处理可并行进行而输出只能串行，因此单个任务的平均处理间隔取
+        「预处理耗时 / 并行数」与「输出耗时」中的较大者
+        """
+        stats = self.stats
+        if not stats.pretreat_durations and not stats.playback_durations:
+            return
+
+        pretreat = sum(stats.pretreat_durations) / len(stats.pretreat_durations) if stats.pretreat_durations else 0.0
+        playback = sum(stats.playback_durations) / len(stats.playback_durations) if stats.playback_durations else 0.0
+        interval = max(pretreat / self.WORKERS, playback)
+        if interval <= 0:
+            return
+
+        stats.drain_rate = 1 / interval
+        capacity = min(max(math.floor(stats.drain_rate * self.TARGET_WAIT), self.MIN_SIZE), self.MAX_SIZE)
+        if capacity != self.MAXSIZE:
+            logger.info(f"队列容量调整: {self.MAXSIZE} -> {capacity} (处理速度={stats.drain_rate * 60:.1f}/min)")
+            self.MAXSIZE = capacity
+        stats.capacity = capacity
+
     async def _get_a_leisure_task(self):
         """
-        尝试发布一个空闲任务
+        发布一个空闲任务
         """
-        self.idle_time += 0.5
-        if self.idle_time >= 50 and random.random() < 0.05:
-            # 5% 概率决定任务类型
-            if random.random() < 0.05:
-                logger.info('发布一个读屏任务...')
-                await self.__create_a_read_screen_task()
-            else:
-                logger.info('发布一个闲时任务...')
-                await self.__create_a_leisure_task()
+        # 5% 概率决定任务类型
+        if random.random() < 0.05:
+            logger.info('发布一个读屏任务...')
+            await self.__create_a_read_screen_task()
+        else:
+            logger.info('发布一个闲时任务...')
+            await self.__create_a_leisure_task()
 
-            self.idle_time = 0  # 重置空闲时间
+        self._reset_idle_deadline()
 
-    async def __run(self):
-        """任务处理主循环"""
-        self.is_running = True
+    def _dispatch_delay(self) -> Optional[float]:
+        """
+        距离可以分发下一个预处理任务还需等待的时间
 
-        while self.is_running:
-            await asyncio.sleep(0.5)
+        :return: 0 表示可以立即分发；None 表示需等待预处理完成或正式队列取出任务；
+                 正数表示仅因就绪音频过多，需等待播放推进的秒数
+        """
+        if len(self._workers) >= self.WORKERS or self.post_queue.is_queue_full:
+            return None
+        return max(0.0, self.post_queue.buffered_duration - self.MAX_BUFFERED_AUDIO)
+
+    async def __wait_for_work(self, token: object) -> bool:
+        """
+        等待直到存在空闲的预处理名额且预处理队列中存在任务。
+        空闲超过截止时间时发布闲时任务
 
-            # 当主处理队列已满时，应继续等待
-            if self.post_queue.is_queue_full:
+        :return: 是否有任务可以处理（为 False 时表示队列已停止）
+        """
+        while self.__is_active(token):
+            # 先清除再检查，避免丢失检查与等待之间到达的唤醒
+            self._wakeup.clear()
+
+            # 当预处理名额已满或就绪音频过多时，等待预处理完成、正式队列取出任务或播放推进后再继续
+            if (delay := self._dispatch_delay()) != 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
                 continue
 
-            # 当队列为空时，尝试生成闲时任务
-            if self._queue.empty():
+            if not self._queue.empty():
+                return True
+
+            # 当队列为空时，等待入队或到达闲时任务截止时间
+            timeout = self._idle_deadline - time.monotonic()
+            if timeout <= 0:
                 await self._get_a_leisure_task()
                 continue
 
-            # 动态优先级算法
-            # 1. 取出所有任务，计算动态优先级并过滤优先数较大的任务
-            if not (items := await self._process_queue()):
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        return False
+
+    async def __run(self, token: object):
+        """任务处理主循环"""
+        self._reset_idle_deadline()
+
+        while await self.__wait_for_work(token):
+            # 1. 取出最高优先级任务（过滤优先数超过阈值的任务）
+            if not (item := self._pop_task()):
                 continue
 
-            # 2. 按动态优先级排序
-            items.sort(key=lambda x: (x[0], x[1]))
+            # 2. 分发任务，并在正式队列中按分发顺序预留位置
+            priority, task = item
+            seq = self.post_queue.reserve()
+            self.__start_worker(self._workers, seq, priority, task)
 
-            # 3. 处理最高优先级任务
-            priority, task = items[0]
+            self._reset_idle_deadline()
 
-            try:
-                logger.info(f"执行任务: {task} (动态优先级={priority})")
-                await task.pretreatment()
-                await self.post_queue.put(priority, task)
-                await asyncio.sleep(3)  # CD 缓冲
-            except Exception as e:
-                logger.error(f"任务执行失败: {e}", exc_info=True)
+    def __start_worker(self, workers: Dict[int, asyncio.Task], seq: Optional[int], priority: float, task: BaseTask):
+        worker = asyncio.create_task(self.__pretreat(seq, priority, task))
+        workers[id(task)] = worker
+        worker.add_done_callback(lambda _, task_id=id(task): workers.pop(task_id, None))
+
+    def __dispatch_fast(self, priority: float, task: BaseTask):
+        """
+        立即预处理快速通道任务，不经过排队也不占用预处理名额
+        """
+        if not self.is_running:
+            return
+        logger.info(f"付费事件进入快速通道: {task}")
+        self.__start_worker(self._fast_workers, None, priority, task)
+
+    async def __pretreat(self, seq: Optional[int], priority: float, task: BaseTask):
+        """
+        预处理任务，完成后交由正式队列按序输出
+
+        预处理超过任务截止时间或被 `cancel` 时，正在进行的 LLM/TTS 调用将被取消
 
-            # 4. 将剩余任务重新入队（保持原始格式）
-            for item in items[1:]:
-                await self._queue_put(item[0], item[1])
+        :param seq: 正式队列中预留的输出序号，为 None 时表示快速通道任务
+        """
+        # 停止后重新启动会替换正式队列，预留的序号只对分发时的正式队列有效
+        post_queue = self.post_queue
+        workers = self._fast_workers if seq is None else self._workers
+        start_time = time.monotonic()
+        try:
+            logger.info(f"执行任务: {task} (动态优先级={priority})")
+            await asyncio.wait_for(task.pretreatment(), task.remaining_time)
+        except asyncio.TimeoutError:
+            post_queue.stats.cancelled += 1
+            logger.warning(f"任务 {task} 预处理时超过截止时间，已取消")
+            task.cancel()
+            post_queue.skip(seq)
+        except asyncio.CancelledError:
+            post_queue.stats.cancelled += 1
+            logger.warning(f"任务 {task} 的预处理已被取消")
+            task.cancel()
+            post_queue.skip(seq)
+        except ModelError as e:
+            # 模型调用失败（已由请求调度器重试并记录），不把错误信息当作回复输出
+            logger.warning(f"任务 {task} 的模型调用失败，已跳过: {e}")
+            post_queue.skip(seq)
+        except Exception as e:
+            logger.error(f"任务执行失败: {e}", exc_info=True)
+            post_queue.skip(seq)
+        else:
+            task.load_audio_duration()
+            if seq is None:
+                post_queue.put_fast(priority, task)
+            else:
+                post_queue.put(seq, priority, task)
+        finally:
+            workers.pop(id(task), None)
+            if post_queue is self.post_queue:
+                if seq is not None:
+                    # 失败与取消同样占用了预处理名额，一并计入耗时样本
+                    self.stats.pretreat_durations.append(time.monotonic() - start_time)
+                    self._update_capacity()
+                # 先移除自身再唤醒，使主循环能立即看到空闲名额
+                self._notify()
+
+    def cancel(self, task: BaseTask) -> bool:
+        """
+        取消任务：若仍在队列中则将其移除，若正在预处理则中止其 LLM/TTS 调用，
+        若已就绪等待输出则将其从正式队列中移除，并停止其仍在后台进行的生成
 
-            self.idle_time = 0
+        须在队列所在的事件循环中调用
+
+        :return: 是否找到并取消了该任务
+        """
+        found = True
+        if self._queue.remove(task):
+            self._forget_task(task)
+        elif worker := self._workers.get(id(task)) or self._fast_workers.get(id(task)):
+            worker.cancel()
+        else:
+            found = self.post_queue.discard(task)
+
+        task.cancel()
+        return found
 
     async def run_forever(self):
-        """主运行循环（提供给线程运行）"""
+        """主运行循环（作为运行时中受监督的任务运行）"""
         self.is_running = True
-        await self.post_queue.start_async()  # 改为 await 启动
-        await self.__run()
+        self._loop = asyncio.get_running_loop()
+        token = self._run_token = object()
+        # 停止后重新启动时这些属性会被替换，收尾时须使用本轮的对象
+        post_queue, workers, fast_workers = self.post_queue, self._workers, self._fast_workers
+        await post_queue.start_async()  # 改为 await 启动
+        sweeper = asyncio.create_task(self.__sweep_expired(token))
+        await self.__run(token)
+        await sweeper
+        if workers or fast_workers:
+            await asyncio.gather(*workers.values(), *fast_workers.values(), return_exceptions=True)
+        await post_queue.join()
 
     async def put(self, priority: int, task: BaseTask):
         """入队方法"""
-        if not self._queue.full():
-            await self._queue_put(priority, task)
-            logger.debug(f"入队成功: {task} (优先级={priority})")
+        if task.FAST_LANE and self.is_running and self._loop:
+            _call_threadsafe(self._loop, self.__dispatch_fast, priority, task)
             return
 
-        # 队列已满时的替换策略
-        # 1. 取出所有任务，计算动态优先级并过滤优先数较大的任务
-        queue_items = await self._process_queue()
-
-        # 2. 添加新任务到临时列表
-        queue_items.append((priority, task))
-
-        # 3. 按动态优先级排序（优先级数值越小、时间越晚越优先）
-        queue_items.sort(key=lambda x: (x[0], -x[1].time))
+        if self._merge_task(task):
+            return
 
-        # 4. 抛弃优先级数值最大、时间最早的事件
-        queue_items.pop()
+        if priority >= self.MAX_PRIORITY:
+            self.stats.filtered += 1
+            logger.warning(f"任务 {task} 被过滤(优先级={priority})")
+            return
 
-        logger.debug(f"队列满处理后状态:\n{self.get_priority_snapshot()}")
+        self._queue.push(priority, task)
+        if isinstance(task, tasks.DanmuTask):
+            self._pending_by_user[task.data.userid] = task
+        logger.debug(f"入队成功: {task} (优先级={priority})")
+
+        # 队列已满时的替换策略：抛弃优先数最大、时间最早的任务（可能是新任务本身）
+        # 容量随处理速度变化，缩小后可能需要一次淘汰多个任务
+        self._update_capacity()
+        if len(self._queue) > self.MAXSIZE:
+            while len(self._queue) > self.MAXSIZE:
+                evicted_priority, evicted_task = self._queue.evict_worst()
+                self._forget_task(evicted_task)
+                evicted_task.cancel()
+                self.stats.dropped_full += 1
+                logger.warning(f"队列已满(容量={self.MAXSIZE})，丢弃任务 {evicted_task} (优先级={evicted_priority})")
+            logger.debug(f"队列满处理后状态:\n{self.get_priority_snapshot()}")
+
+        self._notify()
+        _set_event_threadsafe(self._loop, self._sweep_wakeup)
 
     def start(self):
         if self.is_running:
@@ -187,17 +499,27 @@ class PretreatQueue:
             self.__init__(False)
         self.is_running = True
 
-        # 启动后台线程，运行事件队列
-        AsyncQueueThread(self).start()
+        # 在统一的事件循环中运行事件队列
+        Runtime.get().spawn(self.run_forever(), name='PretreatQueue', critical=True)
 
         logger.info('事件队列已启动')
         return True
 
         
+    def __cancel_workers(self):
+        """
+        取消所有正在进行的预处理，中止其 LLM/TTS 调用
+        """
+        for worker in (*self._workers.values(), *self._fast_workers.values()):
+            worker.cancel()
+
     def stop(self):
         self.is_running = False
         self.first_run = False
-        self.post_queue.is_running = False
+        self.post_queue.stop()
+        _call_threadsafe(self._loop, self.__cancel_workers)
+        self._notify()
+        _set_event_threadsafe(self._loop, self._sweep_wakeup)
         logger.info('事件队列已停止')
 
     async def __create_a_leisure_task(self):
@@ -214,58 +536,193 @@ class PretreatQueue:
 
 class PostProcessQueue:
     """
-    正式处理队列
+    正式处理队列（就绪缓冲区）
+
+    预处理任务在分发时按顺序预留序号，预处理完成后按序号依次输出，
+    使得先分发的任务总是先播放，且播放时下一个已完成预处理的任务就在缓冲区中等待
     """
-    def __init__(self) -> None:
-        self._queue = asyncio.PriorityQueue(maxsize=1)  # 队列长度1
+    def __init__(
+        self,
+        maxsize: int = 1,
+        gap: float = 0.5,
+        preempt: bool = False,
+        on_drain: Optional[Callable[[], None]] = None,
+        stats: Optional[QueueStats] = None,
+    ) -> None:
+        self.maxsize = max(1, maxsize)
+        """最多可预留（预处理中 + 等待播放）的任务数"""
+        self.gap = gap
+        """每段输出播放结束后的间隔秒数"""
+        self.preempt = preempt
+        """快速通道任务就绪时，是否在句间停顿处中断当前播放的普通任务"""
+        self.stats = stats or QueueStats()
+        self._fast: Deque[Tuple[float, BaseTask]] = deque()
+        """已完成预处理的快速通道任务，优先于普通任务输出"""
+        self._fast_ready = asyncio.Event()
+        """快速通道中存在待输出任务时置位"""
+        self._current: Optional[Tuple[bool, BaseTask]] = None
+        """当前正在输出的任务：(是否为快速通道任务, 任务)"""
+        self._ready: Dict[int, Optional[Tuple[float, BaseTask]]] = {}
+        """已完成预处理的任务，值为 None 表示该序号的预处理失败"""
+        self._next_seq = 0
+        """下一个预留序号"""
+        self._play_seq = 0
+        """下一个输出序号"""
         self.is_running = False
         self.is_task_running = False
 
-    async def _queue_get(self) -> Tuple[float, BaseTask]:
-        return await self._queue.get()
-    
-    async def _queue_put(self, priority:float, task: BaseTask):
-        await self._queue.put((priority, task))
-    
+        self._on_drain = on_drain
+        """取出任务后的回调，用于唤醒预处理队列"""
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup = asyncio.Event()
+        """任务就绪、停止时触发"""
+        self._runner: Optional[asyncio.Task] = None
+        self._playing_until = 0.0
+        """当前输出预计结束（含间隔）的时间（time.monotonic）"""
+
     @property
     def is_queue_full(self) -> bool:
-        return self._queue.full()
+        return self._next_seq - self._play_seq >= self.maxsize
+
+    @property
+    def buffered_duration(self) -> float:
+        """已就绪待播放的音频时长与当前输出剩余时长之和（秒）"""
+        playing = max(0.0, self._playing_until - time.monotonic())
+        ready = sum(item[1].audio_duration + self.gap for item in self._ready.values() if item)
+        return playing + ready
+
+    def reserve(self) -> int:
+        """
+        预留一个输出位置
+
+        :return: 输出序号
+        """
+        seq = self._next_seq
+        self._next_seq += 1
+        return seq
 
     async def __run(self):
         """主处理循环"""
         self.is_running = True
         while self.is_running:
-            if self._queue.empty():
-                await asyncio.sleep(0.5)
+            self._wakeup.clear()
+            if self._fast:
+                item = self._fast.popleft()
+                is_fast = True
+                if not self._fast:
+                    self._fast_ready.clear()
+            elif self._play_seq in self._ready:
+                item = self._ready.pop(self._play_seq)
+                is_fast = False
+                self._play_seq += 1
+                if self._on_drain:
+                    self._on_drain()
+            else:
+                await self._wakeup.wait()
+                continue
+
+            if item is None:
                 continue
 
             self.is_task_running = True
 
+            priority, task = item
+            self._current = (is_fast, task)
+            self._playing_until = time.monotonic() + task.audio_duration + self.gap
+
+            start_time = time.monotonic()
             try:
-                priority, task = await self._queue_get()
-                logger.info(f"正式处理任务: {task}")
+                logger.info(f"正式处理任务: {task} (音频时长={task.audio_duration:.1f}s)")
                 await task.post_response()
             except Exception as e:
                 logger.error(f"正式处理失败: {e}", exc_info=True)
+            self.stats.playback_durations.append(time.monotonic() - start_time + self.gap)
+
+            if is_fast and task.play_time:
+                latency = task.play_time - (task.data.event_time or task.time)
+                self.stats.fast_lane_latency.append(latency)
+                logger.info(f"付费事件 {task} 从收到事件到开始播放耗时 {latency:.2f}s")
             
+            self._current = None
             self.is_task_running = False
 
-    async def put(self, priority: float, task:BaseTask):
-        """入队方法"""        
-        if self._queue.full():
-            # 队列满时直接替换
-            old_task = await self._queue_get()
-            logger.warning(f"正式队列替换旧任务: {old_task[1]} → {task}")
-        
-        await self._queue_put(priority, task)
+            # 以实际播放结束为准，间隔一段时间后再输出下一个任务（快速通道任务无需等待）
+            try:
+                await asyncio.wait_for(self._fast_ready.wait(), self.gap)
+            except asyncio.TimeoutError:
+                pass
+
+    def put(self, seq: int, priority: float, task:BaseTask):
+        """
+        放入已完成预处理的任务
+
+        :param seq: 通过 `reserve` 获得的输出序号
+        """
+        self._ready[seq] = (priority, task)
+        logger.debug(f"任务就绪: {task} (序号={seq}, 等待输出={len(self._ready)})")
+        _set_event_threadsafe(self._loop, self._wakeup)
+
+    def put_fast(self, priority: float, task: BaseTask):
+        """
+        放入已完成预处理的快速通道任务，它将在当前输出结束后立即输出
+        """
+        self._fast.append((priority, task))
+        self._fast_ready.set()
+        self._wakeup.set()
+
+        if self.preempt and self._current and not self._current[0]:
+            logger.info(f"快速通道任务 {task} 就绪，中断当前播放: {self._current[1]}")
+            self._current[1].interrupt()
+
+    def skip(self, seq: Optional[int]):
+        """
+        放弃一个已预留的输出位置（预处理失败时调用）
+        """
+        if seq is None:
+            return
+        self._ready[seq] = None
+        _set_event_threadsafe(self._loop, self._wakeup)
+
+    def discard(self, task: BaseTask) -> bool:
+        """
+        放弃一个已就绪但尚未输出的任务
+
+        :return: 是否找到了该任务
+        """
+        for seq, item in self._ready.items():
+            if item and item[1] is task:
+                self._ready[seq] = None
+                return True
+        for item in self._fast:
+            if item[1] is task:
+                self._fast.remove(item)
+                if not self._fast:
+                    self._fast_ready.clear()
+                return True
+        return False
+
+    def __cancel_waiting(self):
+        """
+        停止所有等待输出的任务仍在后台进行的生成（停止后它们不会再被输出）
+        """
+        for item in (*self._ready.values(), *self._fast):
+            if item:
+                item[1].cancel()
 
     async def start_async(self):
         """提供异步启动方法，供 PretreatQueue 调用"""
         if self.is_running:
             return
         self.is_running = True
-        asyncio.create_task(self.__run())
+        self._loop = asyncio.get_running_loop()
+        self._runner = asyncio.create_task(self.__run())
+
+    async def join(self):
+        """等待主处理循环在当前任务结束后退出"""
+        if self._runner:
+            await self._runner
 
     def stop(self):
         self.is_running = False
-
+        _call_threadsafe(self._loop, self.__cancel_waiting)
+        _set_event_threadsafe(self._loop, self._wakeup)
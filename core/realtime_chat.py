@@ -8,9 +8,8 @@ from models import MessageData
 from .resources import Resources
 from queues import PretreatQueue
 from tasks import DevMicrophoneTask
-from infra.database import Database
+from infra.runtime import Runtime, run_blocking
 from utils.audio_process import SpeechRecognitionPipeline
-import threading
 import pyaudio
 
 logger = logging.getLogger('Muice.RealtimeChat')
@@ -33,7 +32,7 @@ class RealtimeChat:
         self.frames = []
         self.configs = Config().config
         self.audio_name_or_path = self.configs['realtime']['path']
-        self.database = Database()
+        self.database = self.resources.database
 
         self.is_recording = False
         self.model_status = False
@@ -41,7 +40,10 @@ class RealtimeChat:
         if not os.path.exists('./audio_tmp'):
             os.makedirs('./audio_tmp')
         self.stream = None
-        
+        self.recording_future: asyncio.Future | None = None
+        self.hotkey_channel = None
+        """快捷键线程 -> 事件循环的有界通道"""
+        self.hotkey_consumer = None
 
     def __load(self):
         self.stream = self.p.open(format=FORMAT,
@@ -60,37 +62,46 @@ class RealtimeChat:
             wf.setframerate(RATE)
             wf.writeframes(b''.join(frames))
 
-    def start_record(self):
+    def __open_stream(self):
+        self.stream = self.p.open(format=FORMAT,
+            channels=CHANNELS,
+            rate=RATE,
+            input=True,
+            frames_per_buffer=CHUNK,
+            input_device_index=device_index)
+
+    def __close_stream(self):
+        if self.stream:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.stream = None
+
+    async def start_record(self):
         if not self.is_recording:
             self.is_recording = True
             self.frames = []
-            self.stream = self.p.open(format=FORMAT,
-                channels=CHANNELS,
-                rate=RATE,
-                input=True,
-                frames_per_buffer=CHUNK,
-                input_device_index=device_index)
-            
-            # 开启录音线程
-            self.recording_thread = threading.Thread(target=self.record, name='recording_thread', daemon=True)
-            self.recording_thread.start()
+            await run_blocking('audio', self.__open_stream)
+
+            # 录音循环在 audio 线程池中运行
+            self.recording_future = asyncio.ensure_future(run_blocking('audio', self.record))
             logger.info('开始录音')
 
     def record(self):
-        """ 录音逻辑，运行在独立线程 """
+        """ 录音逻辑，运行在 audio 线程池中 """
         while self.is_recording and self.stream:
             data = self.stream.read(CHUNK)
             self.frames.append(data)
         logger.info("录音线程结束")
         
-    def stop_record(self):
+    async def stop_record(self):
         if self.is_recording and self.stream:
             self.is_recording = False
-            self.recording_thread.join()
+            if self.recording_future:
+                await self.recording_future
+                self.recording_future = None
 
-            self.stream.stop_stream()
-            self.stream.close()
-            self.save_wav(self.frames, "./temp/stt_output.wav")
+            await run_blocking('audio', self.__close_stream)
+            await run_blocking('audio', self.save_wav, self.frames, "./temp/stt_output.wav")
             logger.info('结束录音')
     
     async def generate_reply(self):
@@ -104,26 +115,38 @@ class RealtimeChat:
         await self.queue.put(1, task)
 
         logger.info("录音结束.")
-        if self.stream:
-            self.stream.stop_stream()
-            self.stream.close()
 
         # self.p.terminate()
 
-    def toggle_recording(self):
+    async def toggle_recording(self):
         """ 切换录音状态 """
         if not self.model_status:
-            self.__load()
+            await run_blocking(SpeechRecognitionPipeline.EXECUTOR, self.__load)
         if self.is_recording:
-            self.stop_record()
-            asyncio.run(self.generate_reply())
+            await self.stop_record()
+            await self.generate_reply()
         else:
-            self.start_record()
+            await self.start_record()
+
+    async def __consume_hotkeys(self):
+        """
+        在事件循环中依次处理快捷键事件
+        """
+        while True:
+            await self.hotkey_channel.get()
+            await self.toggle_recording()
 
     def register_keyboard(self):
-        keyboard.add_hotkey('ctrl+alt+c', self.toggle_recording)
+        runtime = Runtime.get()
+        self.hotkey_channel = runtime.channel(maxsize=2)
+        self.hotkey_consumer = runtime.spawn(self.__consume_hotkeys(), name='RealtimeChat')
+        # 快捷键回调运行在 keyboard 的线程中，只向通道投递事件
+        keyboard.add_hotkey('ctrl+alt+c', self.hotkey_channel.put_threadsafe, args=('toggle',))
 
-    def unregister_keyboard(self):
+    async def unregister_keyboard(self):
         keyboard.remove_hotkey('ctrl+alt+c')
+        if self.hotkey_consumer:
+            self.hotkey_consumer.cancel()
+            self.hotkey_consumer = None
         if self.is_recording:
-            self.stop_record()
\ No newline at end of file
+            await self.stop_record()
\ No newline at end of file
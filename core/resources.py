@@ -1,26 +1,38 @@
-from services.tts import BaseTTS
+from services.tts import AudioPlayer, BaseTTS, CachedTTS, TemplateRenderer, TTSPool
 from config import Config
-from services.llm import BasicModel
+from services.llm import BasicModel, ModelConfig, ModelRouter
 from utils.utils import Captions
 from infra.database import Database
-from config import get_model_config
-from typing import Type, Optional
+from config import get_model_configs
+from typing import Awaitable, Dict, Type, Optional
 
+import asyncio
 import importlib
+import logging
+import time
 
-def _load_model(model_config_types:str = "default") -> BasicModel:
-    """
-    初始化模型类
-    """
-    model_config = get_model_config(model_config_types = model_config_types)
+logger = logging.getLogger("Muice.Resources")
+
+def _create_model(model_config:ModelConfig) -> BasicModel:
     module_name = f"services.llm.{model_config.loader}"
     module = importlib.import_module(module_name)
     ModelClass: Optional[Type[BasicModel]] = getattr(module, model_config.loader, None)
 
     if not ModelClass:
         raise ValueError(f"Model {model_config.loader} Not Found!")
-    
-    model = ModelClass(model_config)
+
+    return ModelClass(model_config)
+
+def _load_model(model_config_types:str = "default", route:bool = False, hedge:bool = False) -> BasicModel:
+    """
+    初始化模型类，启用模型路由（`router.enabled`）且同一用途配置了多个模型时组成模型路由，
+    否则只使用首个标记了该用途的配置（见 `get_model_config`）
+    """
+    model_configs = get_model_configs(model_config_types = model_config_types) if route else {}
+    if len(model_configs) <= 1:
+        model = _create_model(get_model_config(model_config_types = model_config_types))
+    else:
+        model = ModelRouter([(name, _create_model(model_config)) for name, model_config in model_configs.items()], hedge)
     model.load()
     return model
 
@@ -28,32 +40,97 @@ class Resources:
     """外部模块资源"""
     _instance: Optional["Resources"] = None
     
-    def __init__(self, config:Config, model:BasicModel, leisure_model:BasicModel, multimodal:BasicModel, tts:BaseTTS, captions:Captions, database:Database) -> None:
+    def __init__(self, config:Config, model:BasicModel, leisure_model:BasicModel, multimodal:BasicModel, tts:BaseTTS, captions:Captions, database:Database, tts_templates:Optional[TemplateRenderer] = None) -> None:
         self.config = config
         self.model = model
         self.leisure_model = leisure_model
         self.multimodal = multimodal
         self.tts = tts
+        self.tts_templates = tts_templates
+        """模板语音合成，未启用模板模式时为 None"""
         self.captions = captions
         self.database = database
+        self.warmup_timings: Dict[str, Optional[float]] = {}
+        """启动预热各阶段的耗时（秒），失败时为 None"""
 
     @classmethod
     def init(cls):
         if cls._instance is None:
             config = Config()
+            AudioPlayer.init(config.TTS_CONFIG.get('output_device'))
             tts_module = importlib.import_module("services.tts")
-            tts = getattr(tts_module, config.TTS_LOADER)(config.TTS_CONFIG)
+            tts_class: Type[BaseTTS] = getattr(tts_module, config.TTS_LOADER)
+            nodes = config.TTS_CONFIG.get('nodes')
+            if nodes:
+                # 多个服务器组成后端池，每个节点的配置覆盖公共配置
+                tts = TTSPool([
+                    (node.get('name') or f"{node.get('host')}:{node.get('port')}", tts_class({**config.TTS_CONFIG, **node}))
+                    for node in nodes
+                ])
+            else:
+                tts = tts_class(config.TTS_CONFIG)
+            cache_config = config.TTS_CONFIG.get('cache') or {}
+            if cache_config.get('enable', True):
+                tts = CachedTTS(tts, cache_config.get('path', './temp/tts_cache'), cache_config.get('max_size_mb', 200))
+            tts_templates = TemplateRenderer(tts) if config.TTS_CONFIG.get('template', True) else None
 
-            model = _load_model()
-            leisure_model = _load_model("leisure")
-            multimodal = _load_model("multimodal")
+            route = config.ROUTER_CONFIG.get('enabled', False)
+            model = _load_model(route=route, hedge=config.ROUTER_CONFIG.get('hedge', False))
+            leisure_model = _load_model("leisure", route=route)
+            multimodal = _load_model("multimodal", route=route)
             captions = Captions()
             database = Database()
 
-            cls._instance = cls(config, model, leisure_model, multimodal, tts, captions, database)
+            cls._instance = cls(config, model, leisure_model, multimodal, tts, captions, database, tts_templates)
     
     @classmethod
     def get(cls) -> "Resources":
         if cls._instance is None:
             raise RuntimeError("Resources not initialized. Call Resources.init() first.")
-        return cls._instance
\ No newline at end of file
+        return cls._instance
+
+    async def __timed(self, name: str, stage: Awaitable):
+        start = time.monotonic()
+        try:
+            await stage
+        except Exception as e:
+            logger.warning(f"{name} 预热失败: {e}")
+            self.warmup_timings[name] = None
+            return
+        self.warmup_timings[name] = time.monotonic() - start
+
+    async def warmup(self):
+        """
+        启动预热：并行建立各模型的连接、试合成一句语音并预先合成固定语句，
+        使第一条弹幕不必承担冷启动开销（`init` 在事件循环启动前调用，因此在事件循环启动时执行）
+        """
+        stages = {
+            "对话模型": self.model.warmup(),
+            "闲时模型": self.leisure_model.warmup(),
+            "多模态模型": self.multimodal.warmup(),
+            "TTS": self.tts.warmup(),
+        }
+        if self.tts_templates:
+            stages["固定语句"] = self.tts_templates.prepare()
+
+        start = time.monotonic()
+        await asyncio.gather(*(self.__timed(name, stage) for name, stage in stages.items()))
+        logger.info(f"启动预热完成，用时 {time.monotonic() - start:.2f}s: {self.warmup_summary()}")
+
+    async def close(self):
+        """
+        释放各模型与 TTS 后端的连接（程序退出时调用）
+        """
+        models = {id(model): model for model in (self.model, self.leisure_model, self.multimodal)}
+        results = await asyncio.gather(
+            *(model.close() for model in models.values()), self.tts.close(), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning(f"释放资源时出现异常: {result}")
+
+    def warmup_summary(self) -> str:
+        return " | ".join(
+            f"{name} {'失败' if elapsed is None else f'{elapsed * 1000:.0f}ms'}"
+            for name, elapsed in self.warmup_timings.items()
+        )
\ No newline at end of file
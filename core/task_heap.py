@@ -0,0 +1,164 @@
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from tasks import BaseTask
+
+Entry = Tuple[float, BaseTask]
+"""队列项：(优先数, 任务)"""
+
+
+class _IndexedHeap:
+    """
+    带位置索引的二叉最小堆，支持按 ID 在 O(log n) 内删除任意元素
+    """
+    def __init__(self) -> None:
+        self._keys: List[Any] = []
+        self._ids: List[int] = []
+        self._pos: Dict[int, int] = {}
+        """ID -> 堆中下标"""
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _swap(self, i: int, j: int):
+        self._keys[i], self._keys[j] = self._keys[j], self._keys[i]
+        self._ids[i], self._ids[j] = self._ids[j], self._ids[i]
+        self._pos[self._ids[i]] = i
+        self._pos[self._ids[j]] = j
+
+    def _sift_up(self, i: int):
+        while i > 0:
+            parent = (i - 1) >> 1
+            if not self._keys[i] < self._keys[parent]:
+                break
+            self._swap(i, parent)
+            i = parent
+
+    def _sift_down(self, i: int):
+        size = len(self._ids)
+        while True:
+            smallest = i
+            left, right = 2 * i + 1, 2 * i + 2
+            if left < size and self._keys[left] < self._keys[smallest]:
+                smallest = left
+            if right < size and self._keys[right] < self._keys[smallest]:
+                smallest = right
+            if smallest == i:
+                return
+            self._swap(i, smallest)
+            i = smallest
+
+    def push(self, item_id: int, key: Any):
+        self._keys.append(key)
+        self._ids.append(item_id)
+        self._pos[item_id] = len(self._ids) - 1
+        self._sift_up(len(self._ids) - 1)
+
+    def peek(self) -> int:
+        return self._ids[0]
+
+    def remove(self, item_id: int):
+        i = self._pos.pop(item_id)
+        last = len(self._ids) - 1
+        if i != last:
+            self._keys[i], self._ids[i] = self._keys[last], self._ids[last]
+            self._pos[self._ids[i]] = i
+        self._keys.pop()
+        self._ids.pop()
+        if i < len(self._ids):
+            self._sift_up(i)
+            self._sift_down(self._pos[self._ids[i]])
+
+
+class TaskHeap:
+    """
+    预处理队列使用的双端索引堆
+
+    同时维护「最优」与「最差」两个带索引的二叉堆，使入队、取出最优、淘汰最差、
+    按任务 ID 移除均为 O(log n)。
+
+    排序规则与原先的 `asyncio.PriorityQueue` 实现保持一致：
+    - 最优：优先数最小，其次创建时间最早
+    - 最差：优先数最大，其次创建时间最早
+    """
+    def __init__(
+        self,
+        best_key: Callable[[float, BaseTask], Any] = lambda priority, task: (priority, task.time),
+        worst_key: Callable[[float, BaseTask], Any] = lambda priority, task: (-priority, task.time),
+    ) -> None:
+        """
+        :param best_key: 最优堆的排序键，值越小越优先取出
+        :param worst_key: 最差堆的排序键，值越小越优先淘汰
+        """
+        self._best_key = best_key
+        self._worst_key = worst_key
+        self._best = _IndexedHeap()
+        self._worst = _IndexedHeap()
+        self._entries: Dict[int, Entry] = {}
+        """任务 ID（`id(task)`） -> 队列项"""
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, task: BaseTask) -> bool:
+        return id(task) in self._entries
+
+    def __iter__(self) -> Iterator[Entry]:
+        return iter(list(self._entries.values()))
+
+    def empty(self) -> bool:
+        return not self._entries
+
+    def push(self, priority: float, task: BaseTask):
+        """
+        入队一个任务，若任务已在队列中则更新其优先数
+        """
+        task_id = id(task)
+        if task_id in self._entries:
+            self.remove_by_id(task_id)
+        self._entries[task_id] = (priority, task)
+        self._best.push(task_id, self._best_key(priority, task))
+        self._worst.push(task_id, self._worst_key(priority, task))
+
+    def peek_best(self) -> Optional[Entry]:
+        return self._entries[self._best.peek()] if self._entries else None
+
+    def peek_worst(self) -> Optional[Entry]:
+        return self._entries[self._worst.peek()] if self._entries else None
+
+    def pop_best(self) -> Entry:
+        """
+        取出最优任务，队列为空时抛出 `IndexError`
+        """
+        if not self._entries:
+            raise IndexError("pop from an empty TaskHeap")
+        return self.remove_by_id(self._best.peek())
+
+    def evict_worst(self) -> Entry:
+        """
+        淘汰最差任务，队列为空时抛出 `IndexError`
+        """
+        if not self._entries:
+            raise IndexError("evict from an empty TaskHeap")
+        return self.remove_by_id(self._worst.peek())
+
+    def remove(self, task: BaseTask) -> Optional[Entry]:
+        """
+        移除指定任务，任务不在队列中时返回 None
+        """
+        if id(task) not in self._entries:
+            return None
+        return self.remove_by_id(id(task))
+
+    def remove_by_id(self, task_id: int) -> Entry:
+        """
+        按任务 ID 移除任务，ID 不存在时抛出 `KeyError`
+        """
+        entry = self._entries.pop(task_id)
+        self._best.remove(task_id)
+        self._worst.remove(task_id)
+        return entry
+
+    def snapshot(self) -> List[Entry]:
+        """
+        按出队顺序返回当前所有队列项（仅用于调试，复杂度 O(n log n)）
+        """
+        return sorted(self._entries.values(), key=lambda entry: self._best_key(*entry))
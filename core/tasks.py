@@ -4,8 +4,13 @@ from models import MessageData
 from utils.memory import generate_history
 from utils.utils import screenshot
 from services.llm.utils.auto_system_prompt import auto_system_prompt
-from typing import List, Type, Tuple, Optional
+from services.llm import ModelError
+from services.llm.utils.sentence import split_sentences
+from typing import AsyncIterator, List, Type, Tuple, Optional
 from plugin import get_tools
+from services.tts import AudioClip, register_template
+from infra.runtime import run_blocking
+import asyncio
 import logging
 import random
 import time
@@ -15,6 +20,18 @@ logger = logging.getLogger("Muice.task")
 @total_ordering
 class BaseTask(ABC):
     '''基本任务'''
+    TTL: Optional[float] = 60
+    """默认存活时间（秒），超过后不再处理，为 None 时永不过期。可通过配置 `queue.ttl.<任务类名>` 覆盖"""
+    FAST_LANE: bool = False
+    """是否走付费事件快速通道（跳过排队与输出间隔，可抢占当前播放）"""
+    TEMPLATE: Optional[str] = None
+    """固定回复模板，其中的固定片段在启动时预先合成"""
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        if cls.TEMPLATE:
+            register_template(cls.TEMPLATE)
+
     def __init__(self, data:Optional[MessageData] = None) -> None:
         from .resources import Resources
         self.resources = Resources.get()
@@ -34,16 +51,39 @@ class BaseTask(ABC):
         """Function Calls 工具列表"""
         self.time = time.time()
         """事件创建时间"""
+        ttl = self.resources.config.QUEUE_CONFIG.get('ttl', {}).get(self.__class__.__name__, self.TTL)
+        self.deadline: Optional[float] = self.time + ttl if ttl else None
+        """截止时间，超过后任务不再预处理，正在进行的预处理也会被取消"""
         self.response: str = ""
         """模型响应"""
-        self.tts_file: Optional[str] = None
-        """TTS输出文件路径"""
+        self.tts_audio: Optional[AudioClip] = None
+        """TTS输出音频"""
+        self.tts_stream: Optional[asyncio.Queue] = None
+        """流式 TTS 输出：按顺序排列的 (句子, 音频)，以 None 结束。一句分多段输出时，其后各段的句子为空字符串"""
+        self._stream_task: Optional[asyncio.Task] = None
+        """流式 TTS 的后台生成任务"""
+        self.audio_duration: float = 0.0
+        """TTS输出音频时长（秒）"""
+        self.play_time: Optional[float] = None
+        """开始播放音频的时间"""
+        self.interrupted: bool = False
+        """是否已被抢占（如付费事件就绪），被抢占后不再播放剩余的句子"""
         self.is_saved: bool = False
         """是否已经保存到数据库或是不需要保存"""
 
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}(time={self.time}, data={self.data})"
 
+    @property
+    def remaining_time(self) -> Optional[float]:
+        """距离截止时间的剩余秒数，无截止时间时为 None"""
+        return None if self.deadline is None else self.deadline - time.time()
+
+    @property
+    def is_expired(self) -> bool:
+        """是否已超过截止时间"""
+        return self.deadline is not None and time.time() >= self.deadline
+
     def __lt__(self, other: "BaseTask") -> bool:
         return self.time < other.time
     
@@ -65,6 +105,163 @@ class BaseTask(ABC):
     #         await self.post_response(self, "(已过滤)。啊这...要不要我们换一个话题聊？qwq", False)
     #     return wrapper
 
+    def load_audio_duration(self) -> float:
+        """
+        读取 TTS 输出的音频时长，供调度器安排输出节奏
+        """
+        if self.tts_audio:
+            self.audio_duration = self.tts_audio.duration
+        return self.audio_duration
+
+    async def _generate_template_tts(self, **fields: str) -> Optional[AudioClip]:
+        """
+        按 `TEMPLATE` 生成回复与语音：只合成变化的字段，固定片段使用预先合成的音频
+
+        未启用模板模式或模板合成失败时退回整句合成
+        """
+        self.response = self.TEMPLATE.format(**fields)  # type:ignore
+        renderer = self.resources.tts_templates
+        if renderer:
+            clip = await renderer.render(self.TEMPLATE, **fields)  # type:ignore
+            if clip:
+                return clip
+            logger.warning(f"{self} 模板语音合成失败，改为整句合成")
+        return await self.tts.synthesize(self.response)
+
+    async def _pretreat_stream(self, chunks: AsyncIterator[str], prefix: str = "") -> bool:
+        """
+        流式预处理：模型仍在生成时按句切分并逐句生成 TTS
+
+        首句音频就绪后即返回，使任务可以开始播放；其余句子在后台继续生成，按顺序追加到 `tts_stream`
+
+        :param chunks: 模型的流式输出
+        :param prefix: 插入在模型输出之前的固定内容
+        :return: 首句音频是否生成成功
+        """
+        async def prefixed():
+            if prefix:
+                yield prefix
+            async for chunk in chunks:
+                yield chunk
+
+        return await self.__start_render(split_sentences(prefixed()), collect=True)
+
+    async def _pretreat_text(self, text: str) -> bool:
+        """
+        完整回复的预处理：按句拆分后并发生成 TTS，按顺序播放
+
+        与流式预处理相同，首句音频就绪后即返回，长回复不必等待整段合成完毕
+
+        :param text: 模型回复
+        :return: 首句音频是否生成成功
+        """
+        self.response = text
+
+        async def whole():
+            yield text
+
+        return await self.__start_render(split_sentences(whole()), collect=False)
+
+    async def __start_render(self, sentences: AsyncIterator[str], collect: bool) -> bool:
+        self.tts_stream = asyncio.Queue()
+        first_ready = asyncio.get_running_loop().create_future()
+        self._stream_task = asyncio.create_task(self.__render_stream(sentences, collect, first_ready))
+        try:
+            if await first_ready:
+                return True
+        except asyncio.CancelledError:
+            self._stream_task.cancel()
+            raise
+
+        self.tts_stream = None
+        return False
+
+    async def __synthesize(self, sentence: str, limit: asyncio.Semaphore, clips: asyncio.Queue):
+        """
+        生成一句的 TTS，音频片段一到达就按顺序放入 `clips`，以 None 结束
+        """
+        try:
+            async for clip in self.tts.synthesize_stream(sentence):
+                clips.put_nowait(clip)
+        except Exception as e:
+            logger.warning(f"{self} 的句子 {sentence} TTS 生成出错: {e}")
+        finally:
+            limit.release()
+            clips.put_nowait(None)
+
+    async def __render_stream(self, sentences: AsyncIterator[str], collect: bool, first_ready: asyncio.Future):
+        """
+        并发生成各句的 TTS（同时进行的句数不超过 `tts.parallel`），按原顺序追加到 `tts_stream`
+
+        :param collect: 是否将句子追加到 `response`（流式输出时回复在此拼接）
+        """
+        limit = asyncio.Semaphore(self.resources.config.TTS_CONFIG.get('parallel', 3))
+        pending: asyncio.Queue = asyncio.Queue()
+        """按顺序排列的 (句子, 音频片段队列, 合成任务)，以 None 结束"""
+
+        async def produce():
+            try:
+                async for sentence in sentences:
+                    if collect:
+                        self.response += sentence
+                    await limit.acquire()
+                    clips: asyncio.Queue = asyncio.Queue()
+                    pending.put_nowait((sentence, clips, asyncio.create_task(self.__synthesize(sentence, limit, clips))))
+            finally:
+                pending.put_nowait(None)
+
+        producer = asyncio.create_task(produce())
+        synthesis: Optional[asyncio.Task] = None
+        """正在输出的句子的合成任务"""
+        try:
+            while (item := await pending.get()) is not None:
+                sentence, clips, synthesis = item
+                # 流式后端的音频片段到达后立即交给播放，不等待整句生成完毕
+                head = sentence
+                while (clip := await clips.get()) is not None:
+                    self.audio_duration += clip.duration
+                    self.tts_stream.put_nowait((head, clip))  # type:ignore
+                    head = ""
+                    if not first_ready.done():
+                        first_ready.set_result(True)
+                if head:
+                    logger.warning(f"{self} 的句子 {sentence} TTS 生成失败，已跳过")
+            await producer
+        except ModelError as e:
+            # 已播出的句子保留，不把错误信息当作回复输出
+            logger.warning(f"{self} 的模型输出中断: {e}")
+        except Exception as e:
+            logger.error(f"{self} 流式生成失败: {e}", exc_info=True)
+        finally:
+            # 被取消（如播放被抢占）时不再生成剩余的句子
+            producer.cancel()
+            if synthesis:
+                synthesis.cancel()
+            while not pending.empty():
+                if (item := pending.get_nowait()) is not None:
+                    item[2].cancel()
+            self.tts_stream.put_nowait(None)  # type:ignore
+            if not first_ready.done():
+                first_ready.set_result(False)
+            logger.info(f'{self} -> {self.response}')
+
+    def interrupt(self):
+        """
+        抢占当前输出：正在播放的句子在句间停顿处淡出，其余句子不再生成与播放
+
+        即使调用时恰好处于两句之间、播放器中没有音频，抢占也会在下一句播放前生效
+        """
+        self.interrupted = True
+        self.tts.interrupt()
+        self.cancel()
+
+    def cancel(self):
+        """
+        中止仍在后台进行的 LLM/TTS 生成（任务过期、被丢弃或队列停止时调用）
+        """
+        if self._stream_task:
+            self._stream_task.cancel()
+
     @abstractmethod
     async def pretreatment(self) -> bool:
         """
@@ -72,33 +269,96 @@ class BaseTask(ABC):
         """
         pass
 
-    async def post_response(self):
-        """
-        在直播间输出结果
-        """
-        if self.tts_file is None:
-            logger.warning("不存在 tts 输出！该任务不执行")
-            return
-
+    async def _post_captions(self, respond: str):
         if self.data.message:
             await self.resources.captions.post(
                 self.data.message, 
                 self.data.username, 
                 self.data.userface, 
-                self.response
+                respond
             )
         else:
-            await self.resources.captions.post(respond=self.response)
+            await self.resources.captions.post(respond=respond)
+
+    async def _play_stream(self) -> Optional[str]:
+        """
+        按顺序播放流式 TTS 输出，字幕随播放进度逐句更新
+
+        每一句在上一句播放时就写入播放缓冲区，句与句之间没有间隙
+
+        :return: 完整播放时返回 None，播放被中断时返回已播出的内容（一句都没有播出时为空字符串）
+        """
+        spoken = ""
+        previous: Optional[asyncio.Future] = None
+        """上一句的播放结果"""
+        while (segment := await self.tts_stream.get()) is not None:  # type:ignore
+            if self.interrupted:
+                # 等待已写入的句子在停顿处淡出，避免抢占者的音频随之被丢弃
+                if previous is not None:
+                    await previous
+                break
+
+            sentence, clip = segment
+            played = await self.resources.tts.enqueue_audio(clip)
+            if previous is not None and not await previous:
+                # 丢弃中断前刚写入缓冲区的下一句
+                self.resources.tts.stop()
+                break
+
+            if sentence:
+                spoken += sentence
+                await self._post_captions(spoken)
+            if self.play_time is None:
+                self.play_time = time.time()
+            previous = played
+        else:
+            completed = previous is None or await previous
+            # 在两句之间被抢占时，剩余的句子已不再生成，输出同样不完整
+            if completed and not self.interrupted:
+                return None
+
+        # 播放被中断（如被付费事件抢占），不再生成剩余的句子
+        if self._stream_task:
+            self._stream_task.cancel()
+        return spoken
+
+    async def save(self):
+        """
+        保存对话记录（仅在预处理中没有自行保存时调用）
+        """
+        await self.resources.database.add_item(
+            self.data.username, 
+            self.data.userid, 
+            self.data.message, 
+            self.response
+        )
+
+    async def post_response(self):
+        """
+        在直播间输出结果
+        """
+        if self.tts_stream is not None:
+            spoken = await self._play_stream()
+            if spoken == "":
+                logger.info(f"{self} 在开始播放前被抢占，不再输出")
+                return
+            if spoken is not None:
+                # 只记录实际播出的内容
+                self.response = spoken
+        elif self.tts_audio is None:
+            logger.warning("不存在 tts 输出！该任务不执行")
+            return
+        elif self.interrupted:
+            logger.info(f"{self} 在开始播放前被抢占，不再输出")
+            return
+        else:
+            await self._post_captions(self.response)
 
-        await self.resources.tts.play_audio(self.tts_file)
+            self.play_time = time.time()
+            await self.resources.tts.play_audio(self.tts_audio)
 
         if not self.is_saved:
-            await self.resources.database.add_item(
-                self.data.username, 
-                self.data.userid, 
-                self.data.message, 
-                self.response
-            )
+            await self.save()
 
 class DanmuTask(BaseTask):
     '''弹幕任务'''
@@ -109,12 +369,16 @@ class DanmuTask(BaseTask):
         
         prompt = f'<{self.data.username}> {self.data.message}'
         system = auto_system_prompt(self.data.message) if self.model_config.auto_system_prompt else self.model_config.system_prompt
-        self.response = await self.model.ask(prompt=prompt, history=history, stream=False, tools=self.tools, system=system) or '(已过滤)'
-        logger.info(f'[{self.data.username}] {self.data.message} -> {self.response}')
+        if self.model_config.stream:
+            logger.info(f'[{self.data.username}] 流式 TTS 处理...')
+            chunks = await self.model.ask(prompt=prompt, history=history, stream=True, tools=self.tools, system=system, hedge=True)
+            return await self._pretreat_stream(chunks)
+
+        response = await self.model.ask(prompt=prompt, history=history, stream=False, tools=self.tools, system=system, hedge=True) or '(已过滤)'
+        logger.info(f'[{self.data.username}] {self.data.message} -> {response}')
 
         logger.info(f'[{self.data.username}] TTS处理...')
-        self.tts_file = await self.tts.generate_tts(self.response)
-        if not self.tts_file:
+        if not await self._pretreat_text(response):
             return False
         
         logger.info(f'[{self.data.username}] 事件预处理结束')
@@ -122,14 +386,16 @@ class DanmuTask(BaseTask):
 
 class GiftTask(BaseTask):
     '''礼物任务'''
+    TTL = 120
+    TEMPLATE = "感谢 {username} 赠送的 {gift_name} 喵，雪雪最喜欢你了喵！"
+
     async def pretreatment(self) -> bool:
         logger.info(f'[{self.data.username}] 赠送了 {self.data.gift_name} x {self.data.gift_num} 总价值: {self.data.total_value}')
-        self.response = f"感谢 {self.data.username} 赠送的 {self.data.gift_name} 喵，雪雪最喜欢你了喵！"
-        logger.info(f'[{self.data.username}] {self.data.gift_name} -> {self.response}')
 
         logger.info(f'[{self.data.username}] TTS处理...')
-        self.tts_file = await self.tts.generate_tts(self.response)
-        if not self.tts_file:
+        self.tts_audio = await self._generate_template_tts(username=self.data.username, gift_name=self.data.gift_name)
+        logger.info(f'[{self.data.username}] {self.data.gift_name} -> {self.response}')
+        if not self.tts_audio:
             return False
 
         await self.database.add_gift(self.data.username, self.data.userid, self.data.gift_name, self.data.total_value)
@@ -140,19 +406,29 @@ class GiftTask(BaseTask):
 
 class SuperChatTask(BaseTask):
     '''醒目留言任务'''
+    TTL = None
+    FAST_LANE = True
+
     async def pretreatment(self) -> bool:
         logger.info(f'[{self.data.username}] 赠送了 ¥{self.data.total_value} 醒目留言：{self.data.message}')
         history = await generate_history(self.database, self.data.message, self.data.userid)
 
         prompt = f'<{self.data.username}> {self.data.message}'
         system = auto_system_prompt(self.data.message) if self.model_config.auto_system_prompt else self.model_config.system_prompt
+        thanks = f"感谢 {self.data.username} 的SuperChat。\n"
+        if self.model_config.stream:
+            logger.info(f'[{self.data.username}] 流式 TTS 处理...')
+            chunks = await self.model.ask(prompt=prompt, history=history, stream=True, tools=self.tools, system=system)
+            if not await self._pretreat_stream(chunks, prefix=thanks):
+                return False
+            await self.database.add_gift(self.data.username, self.data.userid, "醒目留言", self.data.total_value)
+            return True
+
         model_output = await self.model.ask(prompt=prompt, history=history, stream=False, tools=self.tools, system=system) or '(已过滤)'
-        self.response = f"感谢 {self.data.username} 的SuperChat。\n" + model_output
-        logger.info(f'[{self.data.username}] 醒目留言 -> {self.response}')
+        logger.info(f'[{self.data.username}] 醒目留言 -> {thanks + model_output}')
 
         logger.info(f'[{self.data.username}] TTS处理...')
-        self.tts_file = await self.tts.generate_tts(self.response)
-        if not self.tts_file:
+        if not await self._pretreat_text(thanks + model_output):
             return False
 
         await self.database.add_gift(self.data.username, self.data.userid, "醒目留言", self.data.total_value)
@@ -162,13 +438,16 @@ class SuperChatTask(BaseTask):
 
 class BuyGuardTask(BaseTask):
     '''上舰任务'''
+    TTL = None
+    FAST_LANE = True
+    TEMPLATE = "感谢 {username} 的舰长喵！会有什么神奇的事情发生呢？"
+
     async def pretreatment(self) -> bool:
         logger.info(f'{self.data.username} 购买了大航海等级 {self.data.guard_level}')
-        self.response = f'感谢 {self.data.username} 的舰长喵！会有什么神奇的事情发生呢？'
 
         logger.info(f'[{self.data.username}] TTS处理...')
-        self.tts_file = await self.tts.generate_tts(self.response)
-        if not self.tts_file:
+        self.tts_audio = await self._generate_template_tts(username=self.data.username)
+        if not self.tts_audio:
             return False
 
         await self.database.add_gift(self.data.username, self.data.userid, f'大航海等级{self.data.guard_level}', self.data.total_value)
@@ -184,10 +463,9 @@ class LeisureTask(BaseTask):
         prompt = random.choice(active_prompts)
 
         system = auto_system_prompt(prompt) if self.leisure_model.config.auto_system_prompt else self.leisure_model.config.system_prompt
-        self.response = await self.leisure_model.ask(prompt, history=[], system=system)
+        response = await self.leisure_model.ask(prompt, history=[], system=system)
 
-        self.tts_file = await self.tts.generate_tts(self.response)
-        if not self.tts_file:
+        if not await self._pretreat_text(response):
             return False
         
         await self.database.add_item('闲时任务', '0', prompt, self.response)
@@ -196,12 +474,14 @@ class LeisureTask(BaseTask):
         return True
 
 class EnterRoomTask(BaseTask):
+    TTL = 30
+    TEMPLATE = "欢迎 {username} 进入到直播间喵"
+
     async def pretreatment(self) -> bool:
         logger.info(f'{self.data.username} 进入房间')
-        self.response = f"欢迎 {self.data.username} 进入到直播间喵"
 
-        self.tts_file = await self.tts.generate_tts(self.response)
-        if not self.tts_file:
+        self.tts_audio = await self._generate_template_tts(username=self.data.username)
+        if not self.tts_audio:
             return False
 
         self.is_saved = True
@@ -217,12 +497,17 @@ class RefreshTask(BaseTask):
 
         prompt = history[-1].danmu
         history = history[:-1]
+        self.prompt = prompt
         system = auto_system_prompt(self.data.message) if self.model_config.auto_system_prompt else self.model.config.system_prompt
-        self.response = await self.model.ask(prompt, history=history, tools=self.tools, system=system) or '(已过滤)'
-        logger.info(f'[{self.data.username}] {prompt} -> {self.response}')
+        if self.model_config.stream:
+            # 流式输出时回复在播放结束后才完整，由 `save` 更新对话记录
+            chunks = await self.model.ask(prompt, history=history, stream=True, tools=self.tools, system=system)
+            return await self._pretreat_stream(chunks)
+
+        response = await self.model.ask(prompt, history=history, tools=self.tools, system=system) or '(已过滤)'
+        logger.info(f'[{self.data.username}] {prompt} -> {response}')
 
-        self.tts_file = await self.tts.generate_tts(self.response)
-        if not self.tts_file:
+        if not await self._pretreat_text(response):
             return False
 
         await self.database.remove_last_item(self.data.userid)
@@ -233,15 +518,22 @@ class RefreshTask(BaseTask):
 
         return True
 
+    async def save(self):
+        await self.database.remove_last_item(self.data.userid)
+        await self.database.add_item(self.data.username, self.data.userid, self.prompt, self.response)
+
 class CleanMemoryTask(BaseTask):
+    TTL = None
+    TEMPLATE = '对话历史已清空'
+
     async def pretreatment(self) -> bool:
         logger.info(f'{self.data.username} 请求清空对话历史')
         await self.database.unavailable_item(self.data.userid)
         logger.info(f'{self.data.username} 对话历史已清空')
-        self.response = '对话历史已清空'
 
         logger.info(f'{self.data.username} TTS处理...')
-        if not await self.tts.generate_tts(self.response): return False
+        self.tts_audio = await self._generate_template_tts()
+        if not self.tts_audio: return False
 
         self.is_saved = True
         logger.info(f'[{self.data.username}] 事件预处理结束')
@@ -249,25 +541,31 @@ class CleanMemoryTask(BaseTask):
         return True
 
 class ReadScreenTask(BaseTask):
+    TTL = None
+    TEMPLATE = '让我们看一下沐沐在干什么...'
+
     async def pretreatment(self) -> bool:
         logger.info('[读屏任务] 开始读取屏幕')
-        respond = '让我们看一下沐沐在干什么...'
-        if not await self.tts.generate_tts(respond): return False
-        await self.captions.post(respond=respond)
-        await self.tts.play_audio()
+        self.tts_audio = await self._generate_template_tts()
+        if not self.tts_audio: return False
 
-        screen_image = screenshot()
+        screen_image = await run_blocking('screen-capture', screenshot)
         image_info = await self.multimodal.ask(prompt="用简单的一段话描述一下这张图片", history=[], images=[screen_image], stream=False)
         system = auto_system_prompt(image_info) if self.model_config.auto_system_prompt else self.model_config.system_prompt
-        self.respond = await self.model.ask(f'<读屏任务-沐沐的屏幕内容: {image_info}>', history=[], system=system) or '(已过滤)'
-        logger.info(f'[读屏任务] <读屏任务-沐沐的屏幕内容: {image_info}> -> {respond}')
-
-        await self.database.add_item('Muice', '0', f'<读屏任务-沐沐的屏幕内容: {image_info}>', respond)
+        self.prompt = f'<读屏任务-沐沐的屏幕内容: {image_info}>'
+        self.respond = await self.model.ask(self.prompt, history=[], system=system) or '(已过滤)'
+        logger.info(f'[读屏任务] {self.prompt} -> {self.respond}')
 
         logger.info(f'[读屏任务] 事件处理结束')
         return True
 
+    async def save(self):
+        # 播放的是模板语句，记录的是模型对屏幕内容的回复
+        await self.database.add_item('Muice', '0', self.prompt, self.respond)
+
 class DevMicrophoneTask(BaseTask):
+    TTL = None
+
     async def pretreatment(self) -> bool:
         logger.info(f'[Dev] {self.data.message}')
 
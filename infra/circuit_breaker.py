@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger("Muice.CircuitBreaker")
+
+Probe = Callable[[], Awaitable[bool]]
+"""探测通路是否恢复的协程函数"""
+
+
+def tcp_probe(url: str, timeout: float = 3.0) -> Probe:
+    """
+    创建一个探测函数：能否与 `url` 的主机端口建立 TCP 连接
+    """
+    parts = urlsplit(url)
+    host = parts.hostname or "127.0.0.1"
+    port = parts.port or (443 if parts.scheme in ("https", "wss") else 80)
+
+    async def probe() -> bool:
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        except (OSError, asyncio.TimeoutError):
+            return False
+        writer.close()
+        return True
+
+    return probe
+
+
+class CircuitBreaker:
+    """
+    单条通路（代理、API 地址等）的熔断器
+
+    连续失败达到阈值后熔断，调用方应直接改走其他通路或快速失败，不再为必然失败的连接付出超时等待。
+    熔断期间在后台按指数退避探测通路，探测成功后进入半开状态放行请求，
+    请求成功才完全恢复，否则以更长的退避时间再次熔断
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 1,
+        backoff: float = 5.0,
+        max_backoff: float = 300.0,
+        probe: Optional[Probe] = None,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        """连续失败多少次后熔断"""
+        self.backoff = backoff
+        """首次熔断后的重试间隔（秒），每次连续熔断翻倍"""
+        self.max_backoff = max_backoff
+        """重试间隔上限（秒）"""
+        self.probe = probe
+        """后台探测函数，为 None 时在退避时间结束后直接放行请求作为试探"""
+
+        self.state = self.CLOSED
+        self.failures = 0
+        """连续失败次数"""
+        self.trips = 0
+        """自上次请求成功以来的熔断次数"""
+        self.retry_at = 0.0
+        """熔断状态下允许重试的时间"""
+        self._probe_task: Optional[asyncio.Future] = None
+
+    @property
+    def available(self) -> bool:
+        """当前是否应当使用该通路"""
+        if self.state == self.OPEN and self.probe is None and time.monotonic() >= self.retry_at:
+            self.state = self.HALF_OPEN
+        return self.state != self.OPEN
+
+    def summary(self) -> str:
+        if self.state == self.OPEN:
+            return f"{self.name}: 熔断中，{max(self.retry_at - time.monotonic(), 0):.0f}s 后重试"
+        return f"{self.name}: {'正常' if self.state == self.CLOSED else '试探中'}"
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info(f"{self.name} 已恢复")
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trips = 0
+
+    def record_failure(self, error: Optional[BaseException] = None):
+        self.failures += 1
+        if self.state == self.OPEN or (self.state == self.CLOSED and self.failures < self.failure_threshold):
+            return
+        self.trip(error)
+
+    def trip(self, reason: object = None):
+        """
+        立即熔断（如通路虽然可用但明显变慢）
+        """
+        if self.state == self.OPEN:
+            return
+        self.trips += 1
+        delay = min(self.backoff * 2 ** (self.trips - 1), self.max_backoff)
+        self.state = self.OPEN
+        self.retry_at = time.monotonic() + delay
+        logger.warning(f"{self.name} 不可用，已熔断 {delay:.0f}s: {reason}")
+        if self.probe is not None and (self._probe_task is None or self._probe_task.done()):
+            self._probe_task = self.__spawn(self.__probe_loop())
+
+    @staticmethod
+    def __spawn(coro) -> asyncio.Future:
+        from infra.runtime import Runtime
+        if Runtime._instance:
+            return Runtime.get().spawn(coro, name="CircuitBreakerProbe")
+        return asyncio.ensure_future(coro)
+
+    async def __probe_loop(self):
+        """
+        退避时间结束后探测通路，失败则加倍退避，直到探测成功
+        """
+        while self.state == self.OPEN:
+            await asyncio.sleep(max(self.retry_at - time.monotonic(), 0))
+            if self.state != self.OPEN:
+                return
+            if await self.probe():  # type:ignore
+                self.state = self.HALF_OPEN
+                logger.info(f"{self.name} 探测成功，恢复试用")
+                return
+            self.trips += 1
+            self.retry_at = time.monotonic() + min(self.backoff * 2 ** (self.trips - 1), self.max_backoff)
@@ -1,12 +1,12 @@
-import aiosqlite,os,time,asyncio
+import aiosqlite,time
 from services.llm import Message
 from typing import Optional
 
 class Database:
     def __init__(self) -> None:
         self.DB_PATH = 'database.db'
-        if not os.path.isfile(self.DB_PATH):
-            asyncio.run(self.__create_database())
+        self.__initialized = False
+        """数据表是否已创建（首次查询时在当前事件循环中惰性创建）"""
 
     def __connect(self) -> aiosqlite.Connection:
         return aiosqlite.connect(self.DB_PATH)
@@ -21,6 +21,8 @@ class Database:
         :param fetchall: 是否获取所有结果
         """
         async with self.__connect() as conn:
+            if not self.__initialized:
+                await self.__create_database(conn)
             cursor = await conn.cursor()
             await cursor.execute(query, params)
             if fetchone:
@@ -29,11 +31,11 @@ class Database:
                 return await cursor.fetchall()  # type: ignore
             await conn.commit()
 
-    async def __create_database(self) -> None:
+    async def __create_database(self, conn: aiosqlite.Connection) -> None:
         """
         初始化数据库
         """
-        await self.__execute('''CREATE TABLE CHAT(
+        await conn.execute('''CREATE TABLE IF NOT EXISTS CHAT(
             ID INTEGER PRIMARY KEY AUTOINCREMENT,
             TIME TEXT NOT NULL,
             USERNAME TEXT NOT NULL,
@@ -41,13 +43,15 @@ class Database:
             DANMU TEXT NOT NULL,
             RESPOND TEXT NOT NULL,
             AVAILABLE INT NOT NULL);''')
-        await self.__execute('''CREATE TABLE GIFT(
+        await conn.execute('''CREATE TABLE IF NOT EXISTS GIFT(
             ID INTEGER PRIMARY KEY AUTOINCREMENT,
             TIME TEXT NOT NULL,
             USERNAME TEXT NOT NULL,
             USERID TEXT NOT NULL,
             GIFTNAME TEXT NOT NULL,
             TOTALPRICE NUMERIC NOT NULL);''')
+        await conn.commit()
+        self.__initialized = True
     
     async def add_item(self, username: str, userid: str, danmu: str, respond: str):
         """
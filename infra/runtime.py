@@ -0,0 +1,309 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncGenerator, Callable, Coroutine, Dict, Generic, Iterable, Optional, Set, TypeVar
+
+logger = logging.getLogger("Muice.Runtime")
+
+T = TypeVar("T")
+
+EXECUTOR_SIZES: Dict[str, int] = {
+    "audio": 3,
+    "tts-io": 2,
+    "asr-cpu": 1,
+    "screen-capture": 1,
+    "llm-io": 4,
+}
+"""各线程池的默认大小，可通过配置 `runtime.executors.<名称>` 覆盖。
+audio: pyaudio 设备读写（播放 + 录音 + 设备开关）；tts-io: 语音解码与读写文件；asr-cpu: funasr 推理；screen-capture: 截图；
+llm-io: 同步 SDK 的模型请求（流式输出时每个流占用一个线程直到结束）"""
+
+
+class NamedExecutor(ThreadPoolExecutor):
+    """
+    带排队统计的命名线程池
+
+    线程全部忙碌、新任务需要排队时视为饱和，记录警告（每个线程池最多每 `WARN_INTERVAL` 秒一次）
+    """
+    WARN_INTERVAL = 30
+    """饱和警告的最短间隔（秒）"""
+
+    def __init__(self, name: str, size: int) -> None:
+        super().__init__(max_workers=size, thread_name_prefix=f"Muice-{name}")
+        self.name = name
+        self.size = size
+        self.active = 0
+        """正在执行的任务数"""
+        self.queued = 0
+        """已提交、尚未开始执行的任务数"""
+        self.peak_queued = 0
+        """因线程全部忙碌而排队的任务数峰值"""
+        self.completed = 0
+        self.wait_times: deque = deque(maxlen=100)
+        """最近任务的排队时间（秒）"""
+        self._lock = threading.Lock()
+        self._warned_at = 0.0
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        with self._lock:
+            self.queued += 1
+            waiting = self.active + self.queued - self.size
+            self.peak_queued = max(self.peak_queued, waiting)
+        if waiting > 0 and time.monotonic() - self._warned_at >= self.WARN_INTERVAL:
+            self._warned_at = time.monotonic()
+            logger.warning(f"线程池 {self.name} 已饱和: {self.active}/{self.size} 个线程忙碌，{waiting} 个任务排队")
+        return super().submit(self.__run, time.monotonic(), fn, args, kwargs)
+
+    def __run(self, submitted: float, fn: Callable, args: tuple, kwargs: dict):
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+            self.wait_times.append(time.monotonic() - submitted)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+
+    def summary(self) -> str:
+        wait = max(self.wait_times, default=0.0)
+        return f"{self.name} {self.active}/{self.size} 排队 {self.queued}（峰值 {self.peak_queued}，近期最长等待 {wait * 1000:.0f}ms）"
+
+
+class Channel(Generic[T]):
+    """
+    有界的线程安全通道
+
+    其他线程通过 `put_threadsafe` 投递数据（不阻塞），事件循环中通过 `get` 取出
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int = 16) -> None:
+        self._loop = loop
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._slots = threading.BoundedSemaphore(maxsize)
+        self.dropped = 0
+        """因通道已满被丢弃的数据数"""
+
+    def put_threadsafe(self, item: T) -> bool:
+        """
+        投递数据，通道已满时丢弃
+
+        :return: 是否投递成功
+        """
+        if not self._slots.acquire(blocking=False):
+            self.dropped += 1
+            logger.warning(f"通道已满，丢弃数据: {item}")
+            return False
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+        return True
+
+    async def get(self) -> T:
+        item = await self._queue.get()
+        self._slots.release()
+        return item
+
+
+class Runtime:
+    """
+    统一的异步运行时
+
+    整个应用只使用 WebUI 所在的事件循环：弹幕客户端、事件队列、实时对话均作为该循环中受监督的任务运行，
+    阻塞操作交由显式设定大小的线程池执行，其他线程只能通过 `call_soon` 或有界的 `Channel` 与事件循环交互
+    """
+    _instance: Optional["Runtime"] = None
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, executor_sizes: Optional[Dict[str, int]] = None) -> None:
+        self.loop = loop
+        """唯一的事件循环"""
+        self.on_error: Optional[Callable[[str, BaseException], None]] = None
+        """关键任务异常退出时的回调"""
+        self._tasks: Set[asyncio.Task] = set()
+        self._executors: Dict[str, NamedExecutor] = {
+            name: NamedExecutor(name, size)
+            for name, size in {**EXECUTOR_SIZES, **(executor_sizes or {})}.items()
+        }
+
+    @classmethod
+    def attach(cls, executor_sizes: Optional[Dict[str, int]] = None):
+        """
+        绑定到当前正在运行的事件循环（在 WebUI 启动时调用）
+
+        :param executor_sizes: 覆盖默认大小的线程池，参见 `EXECUTOR_SIZES`
+        """
+        if cls._instance is None:
+            cls._instance = cls(asyncio.get_running_loop(), executor_sizes)
+            logger.info("运行时已绑定到事件循环")
+
+    @classmethod
+    def get(cls) -> "Runtime":
+        if cls._instance is None:
+            raise RuntimeError("Runtime not attached. Call Runtime.attach() inside the event loop first.")
+        return cls._instance
+
+    @classmethod
+    async def shutdown(cls):
+        """
+        取消所有受监督的任务并关闭线程池
+        """
+        runtime = cls._instance
+        if runtime is None:
+            return
+        for task in list(runtime._tasks):
+            task.cancel()
+        await asyncio.gather(*runtime._tasks, return_exceptions=True)
+        for executor in runtime._executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        cls._instance = None
+
+    def _in_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    async def __supervise(self, coro: Coroutine[Any, Any, T], name: str, critical: bool) -> Optional[T]:
+        try:
+            return await coro
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"任务 {name} 发生了一个错误", exc_info=True)
+            if critical and self.on_error:
+                self.on_error(name, e)
+            return None
+
+    def spawn(self, coro: Coroutine[Any, Any, T], name: str = "", critical: bool = False):
+        """
+        在事件循环中启动一个受监督的任务，异常将被记录而不会被静默丢弃（可跨线程调用）
+
+        :param name: 任务名称
+        :param critical: 异常退出时是否触发 `on_error`
+        """
+        name = name or getattr(coro, "__qualname__", "task")
+        if self._in_loop():
+            return self.__track(coro, name, critical)
+
+        # 跨线程调用时同样在事件循环中创建并登记任务，使 `shutdown` 能够取消它
+        future: Future = Future()
+
+        def start():
+            if future.cancelled():
+                coro.close()
+                return
+            task = self.__track(coro, name, critical)
+            task.add_done_callback(partial(self.__resolve, future))
+            future.add_done_callback(lambda _: future.cancelled() and self.loop.call_soon_threadsafe(task.cancel))
+
+        self.loop.call_soon_threadsafe(start)
+        return future
+
+    def __track(self, coro: Coroutine[Any, Any, T], name: str, critical: bool) -> "asyncio.Task[Optional[T]]":
+        task = self.loop.create_task(self.__supervise(coro, name, critical), name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    @staticmethod
+    def __resolve(future: Future, task: asyncio.Task):
+        """
+        将任务的结果传递给跨线程调用方持有的 `Future`
+        """
+        if task.cancelled():
+            future.cancel()
+        elif future.set_running_or_notify_cancel():
+            future.set_result(task.result())
+
+    def call_soon(self, callback: Callable[..., Any], *args):
+        """
+        在事件循环中调用 `callback`（可跨线程调用）
+        """
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def channel(self, maxsize: int = 16) -> Channel:
+        """
+        创建一个从其他线程投递到事件循环的有界通道
+        """
+        return Channel(self.loop, maxsize)
+
+    def executor(self, name: str) -> NamedExecutor:
+        return self._executors[name]
+
+    def executor_summary(self) -> str:
+        """
+        各线程池的忙碌与排队情况
+        """
+        return "\n".join(executor.summary() for executor in self._executors.values())
+
+
+async def run_blocking(executor: str, func: Callable[..., T], *args, **kwargs) -> T:
+    """
+    在指定的线程池中执行阻塞函数，运行时未绑定时退回到事件循环的默认线程池
+
+    :param executor: 线程池名称，参见 `EXECUTOR_SIZES`
+    """
+    loop = asyncio.get_running_loop()
+    pool = Runtime._instance.executor(executor) if Runtime._instance else None
+    return await loop.run_in_executor(pool, partial(func, *args, **kwargs))
+
+
+_END = object()
+"""迭代结束的标记"""
+
+
+async def iterate_blocking(executor: str, iterable: Iterable[T], buffer: int = 64) -> AsyncGenerator[T, None]:
+    """
+    在指定的线程池中迭代同步迭代器（如同步 SDK 返回的流式响应），逐个交给事件循环
+
+    每次阻塞的网络读取都发生在线程池中，事件循环不会被阻塞；消费方提前退出时，迭代器在取得下一项后于线程池中关闭
+
+    :param executor: 线程池名称，参见 `EXECUTOR_SIZES`
+    :param buffer: 消费方跟不上时最多缓冲的项数，缓冲满时暂停读取
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    slots = threading.Semaphore(buffer)
+    stopped = threading.Event()
+
+    def handoff(item, error: Optional[BaseException] = None):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, (item, error))
+        except RuntimeError:
+            # 事件循环已关闭
+            stopped.set()
+
+    def pump():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                while not slots.acquire(timeout=0.1):
+                    if stopped.is_set():
+                        return
+                if stopped.is_set():
+                    return
+                handoff(item)
+        except BaseException as e:
+            handoff(_END, e)
+            return
+        finally:
+            close = getattr(iterator, "close", None)
+            if close:
+                close()
+        handoff(_END)
+
+    pool = Runtime._instance.executor(executor) if Runtime._instance else None
+    loop.run_in_executor(pool, pump)
+    try:
+        while True:
+            item, error = await queue.get()
+            if item is _END:
+                if error:
+                    raise error
+                return
+            slots.release()
+            yield item
+    finally:
+        stopped.set()
@@ -6,6 +6,8 @@ from ui import WebUI
 from infra.logger import init_logger
 from core.resources import Resources
 from core.realtime_chat import RealtimeChat
+from infra.runtime import Runtime
+from services.tts import AudioPlayer
 import signal
 import logging
 import sys
@@ -32,7 +34,12 @@ class App:
         self.web_ui_event_handler.danmu = self.danmu
 
         signal.signal(signal.SIGINT, self.shutdown)
-        threading.excepthook = self.error
+        threading.excepthook = self.thread_error
+        # 所有服务都运行在 WebUI 的事件循环中
+        self.ui.app.on_startup(self._attach_runtime)
+        self.ui.app.on_shutdown(self.resources.close)
+        self.ui.app.on_shutdown(AudioPlayer.get().close)
+        self.ui.app.on_shutdown(Runtime.shutdown)
 
         self._load_plugins()
 
@@ -46,9 +53,19 @@ class App:
         except Exception as e:
             logger.error(f"加载WebUI时出现了问题: {e}", exc_info=True)
 
-    def error(self, args):
-        logger.error(f"线程 {args.thread.name} 发生了一个错误", exc_info=True)
+    def _attach_runtime(self):
+        Runtime.attach(self.resources.config.RUNTIME_CONFIG.get('executors'))
+        Runtime.get().on_error = self.error
+        Runtime.get().spawn(self.resources.warmup(), name='Warmup')
 
+    def thread_error(self, args):
+        logger.error(f"线程 {args.thread.name} 发生了一个错误", exc_info=(args.exc_type, args.exc_value, args.exc_traceback))
+        self.error(args.thread.name, args.exc_value)
+
+    def error(self, name: str, exception: BaseException):
+        """
+        关键任务异常退出时暂停消息处理（异常详情已由运行时记录）
+        """
         self.queue.stop()
         self.danmu.close_client()
 
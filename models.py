@@ -25,6 +25,9 @@ class MessageData:
     fans_medal_level: int = 0
     """粉丝牌等级"""
 
+    event_time: float = 0
+    """收到事件的时间（time.time），用于统计付费事件从事件到首个音频的延迟"""
+
     def __add__(self, other: "MessageData") -> "MessageData":
         self.message += f"。{other.message}"
         return self
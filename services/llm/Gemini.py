@@ -13,7 +13,7 @@ from google.genai.types import (
 
 import logging
 
-from ._types import BasicModel, Message, ModelConfig, function_call_handler
+from ._types import BasicModel, Message, ModelConfig, ModelError, function_call_handler, parse_retry_after
 from .utils.images import get_image_base64
 
 logger = logging.getLogger("Muice.Gemini")
@@ -82,6 +82,10 @@ class Gemini(BasicModel):
 
         return messages
 
+    @staticmethod
+    def __translate_error(e: errors.APIError) -> ModelError:
+        return ModelError.from_status(e.code, str(e.message), parse_retry_after(getattr(e.response, "headers", None)))
+
     async def _ask_sync(self, messages: list[ContentOrDict], **kwargs) -> str:
         try:
             chat = self.client.aio.chats.create(model=self.model_name, config=self.gemini_config, history=messages[:-1])
@@ -110,14 +114,10 @@ class Gemini(BasicModel):
 
                 return await self._ask_sync(messages)
 
-            return "（警告：模型无输出！）"
+            raise ModelError("模型无输出")
 
         except errors.APIError as e:
-            error_message = f"API 状态异常: {e.code}({e.response})"
-            logger.error(error_message)
-            logger.error(e.message)
-            self.succeed = False
-            return error_message
+            raise self.__translate_error(e) from e
 
     async def _ask_stream(self, messages: list, **kwargs) -> AsyncGenerator[str, None]:
         try:
@@ -148,12 +148,7 @@ class Gemini(BasicModel):
                         yield chunk
 
         except errors.APIError as e:
-            error_message = f"API 状态异常: {e.code}({e.response})"
-            logger.error(error_message)
-            logger.error(e.message)
-            self.succeed = False
-            yield error_message
-            return
+            raise self.__translate_error(e) from e
 
     @overload
     async def ask(
@@ -189,7 +184,6 @@ class Gemini(BasicModel):
         system: Optional[str] = None,
         **kwargs,
     ) -> Union[AsyncGenerator[str, None], str]:
-        self.succeed = True
         self.__build_tools_list(tools)
         self.gemini_config.system_instruction = system
 
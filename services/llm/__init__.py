@@ -1,4 +1,5 @@
 from ._dependencies import MODEL_DEPENDENCY_MAP, get_missing_dependencies
-from ._types import BasicModel, ModelConfig, Message
+from ._types import BasicModel, ModelConfig, ModelError, Message
+from ._router import ModelRouter
 
-__all__ = ["BasicModel", "ModelConfig", "MODEL_DEPENDENCY_MAP", "get_missing_dependencies", "Message"]
+__all__ = ["BasicModel", "ModelConfig", "ModelError", "ModelRouter", "MODEL_DEPENDENCY_MAP", "get_missing_dependencies", "Message"]
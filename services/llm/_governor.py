@@ -0,0 +1,287 @@
+"""
+模型请求调度：并发上限、RPM/TPM 限流、限流感知的重试与单次请求超时
+"""
+
+import asyncio
+import logging
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import AsyncGenerator, AsyncIterator, Awaitable, Callable, Mapping, Optional
+
+logger = logging.getLogger("Muice.LLMGovernor")
+
+
+class ModelError(Exception):
+    """
+    模型调用失败
+
+    加载器应抛出该异常而不是把错误信息当作回复返回，避免错误信息被合成语音播出
+    """
+
+    RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+    """可重试的 HTTP 状态码"""
+
+    def __init__(self, message: str, retryable: bool = False, retry_after: Optional[float] = None) -> None:
+        super().__init__(message)
+        self.retryable = retryable
+        """是否为可重试的暂时性错误（连接失败、限流、服务端错误等）"""
+        self.retry_after = retry_after
+        """服务端要求的重试等待时间（秒）"""
+
+    @classmethod
+    def from_status(cls, status: Optional[int], message: str, retry_after: Optional[float] = None) -> "ModelError":
+        """
+        按 HTTP 状态码判断是否可重试
+        """
+        return cls(f"API 状态异常: {status}({message})", status in cls.RETRYABLE_STATUS, retry_after)
+
+
+def parse_retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """
+    从响应头中解析服务端要求的重试等待时间（`retry-after-ms`，或秒数/HTTP 日期形式的 `retry-after`）
+    """
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return max(float(headers["retry-after-ms"]) / 1000, 0.0)
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    令牌桶：容量为每分钟的配额，按配额匀速补充
+
+    允许透支（如请求结束后才知道实际输出了多少），透支后的请求需等待令牌补足
+    """
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        """每秒补充的令牌数"""
+        self.tokens = per_minute
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def consume(self, amount: float):
+        """
+        直接扣除令牌（可透支）
+        """
+        self._refill()
+        self.tokens -= amount
+
+    async def acquire(self, amount: float):
+        """
+        等待桶中有足够的令牌后取出（超过容量的请求按满桶计，避免永远等待）
+        """
+        amount = min(amount, self.capacity)
+        while True:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return
+            await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+class RequestGovernor:
+    """
+    单个模型的请求调度器
+
+    同时进行的请求不超过 `max_concurrency`，并按 RPM/TPM 令牌桶限流；收到 `Retry-After` 时该模型的新请求一并暂停。
+    连接失败、限流、服务端错误与单次请求超时按带抖动的指数退避重试，其余错误直接失败。
+    流式请求只在产出第一块内容之前重试，之后的失败直接结束输出
+    """
+
+    BACKOFF = 1.0
+    """首次重试的最大退避时间（秒），每次重试翻倍"""
+    MAX_BACKOFF = 30.0
+    """退避时间上限（秒）"""
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int = 4,
+        rpm: int = 0,
+        tpm: int = 0,
+        max_retries: int = 2,
+        timeout: float = 60.0,
+    ) -> None:
+        self.name = name
+        self.max_concurrency = max(max_concurrency, 1)
+        self.max_retries = max_retries
+        self.timeout = timeout
+        """单次请求的超时时间（秒），流式请求为等待每一块内容的超时时间"""
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._rpm = TokenBucket(rpm) if rpm > 0 else None
+        self._tpm = TokenBucket(tpm) if tpm > 0 else None
+        self._resume_at = 0.0
+        """收到 `Retry-After` 后恢复请求的时间"""
+
+        self.in_flight = 0
+        """正在进行的请求数"""
+        self.waiting = 0
+        """等待并发名额或限流配额的请求数"""
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+
+    def summary(self) -> str:
+        return (f"进行中 {self.in_flight}/{self.max_concurrency} | 等待 {self.waiting} | "
+                f"重试 {self.retries} | 失败 {self.failures}/{self.requests}")
+
+    async def _admit(self, cost: int):
+        """
+        等待并发名额与限流配额
+
+        :param cost: 估算的输入 Tokens
+        """
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+            try:
+                while (delay := self._resume_at - time.monotonic()) > 0:
+                    await asyncio.sleep(delay)
+                if self._rpm:
+                    await self._rpm.acquire(1)
+                if self._tpm:
+                    await self._tpm.acquire(cost)
+            except BaseException:
+                self._slots.release()
+                raise
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+
+    def _release(self, produced: int = 0):
+        """
+        :param produced: 实际输出的字符数，计入 TPM
+        """
+        self.in_flight -= 1
+        self._slots.release()
+        if self._tpm and produced:
+            self._tpm.consume(produced)
+
+    def _classify(self, error: Exception) -> ModelError:
+        if isinstance(error, ModelError):
+            return error
+        if isinstance(error, asyncio.TimeoutError):
+            wrapped = ModelError(f"单次请求超过 {self.timeout:g}s 未响应", retryable=True)
+        elif isinstance(error, OSError):
+            wrapped = ModelError(f"连接错误: {error}", retryable=True)
+        else:
+            wrapped = ModelError(f"{type(error).__name__}: {error}")
+        wrapped.__cause__ = error
+        return wrapped
+
+    async def _should_retry(self, error: ModelError, attempt: int) -> bool:
+        """
+        记录失败并在可重试时等待退避时间
+
+        :param attempt: 已重试的次数
+        """
+        if error.retry_after is not None:
+            self._resume_at = max(self._resume_at, time.monotonic() + error.retry_after)
+        if not error.retryable or attempt >= self.max_retries:
+            self.failures += 1
+            logger.error(f"{self.name} 请求失败: {error}")
+            return False
+
+        # 完全抖动：同时失败的请求不会在同一时刻一起重试
+        delay = random.uniform(0, min(self.BACKOFF * 2 ** attempt, self.MAX_BACKOFF))
+        delay = max(delay, self._resume_at - time.monotonic())
+        self.retries += 1
+        logger.warning(f"{self.name} 请求失败，{delay:.1f}s 后第 {attempt + 1} 次重试: {error}")
+        await asyncio.sleep(delay)
+        return True
+
+    async def call(self, request: Callable[[], Awaitable[str]], cost: int) -> str:
+        """
+        执行一次非流式请求
+
+        :param request: 发起请求的协程函数，每次重试都会重新调用
+        :param cost: 估算的输入 Tokens
+        :raise ModelError: 重试后仍然失败
+        """
+        self.requests += 1
+        attempt = 0
+        while True:
+            await self._admit(cost)
+            result = ""
+            try:
+                result = await asyncio.wait_for(request(), self.timeout)
+                return result
+            except Exception as e:
+                error = self._classify(e)
+            finally:
+                self._release(len(result or ""))
+
+            if not await self._should_retry(error, attempt):
+                raise error
+            attempt += 1
+
+    async def stream(
+        self, request: Callable[[], Awaitable[AsyncIterator[str]]], cost: int
+    ) -> AsyncGenerator[str, None]:
+        """
+        执行一次流式请求，在整个输出期间占用一个并发名额
+
+        :param request: 返回流式输出的协程函数，每次重试都会重新调用
+        :param cost: 估算的输入 Tokens
+        :raise ModelError: 产出第一块内容前重试后仍然失败，或输出中途失败
+        """
+        self.requests += 1
+        attempt = 0
+        while True:
+            await self._admit(cost)
+            chunks: Optional[AsyncIterator[str]] = None
+            try:
+                chunks = await asyncio.wait_for(request(), self.timeout)
+                first = await asyncio.wait_for(chunks.__anext__(), self.timeout)
+                break
+            except BaseException as e:
+                # 包括被取消（如对冲请求落败）时，都要归还并发名额
+                self._release()
+                if hasattr(chunks, "aclose"):
+                    await chunks.aclose()  # type:ignore
+                if isinstance(e, StopAsyncIteration):
+                    return
+                if not isinstance(e, Exception):
+                    raise
+                error = self._classify(e)
+
+            if not await self._should_retry(error, attempt):
+                raise error
+            attempt += 1
+
+        produced = len(first)
+        try:
+            yield first
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), self.timeout)
+                except StopAsyncIteration:
+                    return
+                except Exception as e:
+                    self.failures += 1
+                    error = self._classify(e)
+                    logger.error(f"{self.name} 流式输出中断: {error}")
+                    raise error
+                produced += len(chunk)
+                yield chunk
+        finally:
+            self._release(produced)
+            if hasattr(chunks, "aclose"):
+                await chunks.aclose()  # type:ignore
@@ -0,0 +1,259 @@
+"""
+同一用途的多个模型配置之间的延迟路由与对冲请求
+"""
+
+import asyncio
+import logging
+import statistics
+import time
+from collections import deque
+from typing import AsyncGenerator, AsyncIterator, Awaitable, Callable, Deque, List, Optional, Tuple, TypeVar, Union
+
+from infra.circuit_breaker import CircuitBreaker
+
+from ._types import BasicModel, Message, ModelError
+
+logger = logging.getLogger("Muice.ModelRouter")
+
+T = TypeVar("T")
+
+StreamHead = Tuple[str, Optional[AsyncIterator[str]]]
+"""流式输出的第一块内容与剩余的输出（输出为空时为 None）"""
+
+
+class Endpoint:
+    """路由中的一个模型配置"""
+    WINDOW = 50
+    """统计延迟与错误率的最近请求数"""
+
+    def __init__(self, name: str, model: BasicModel) -> None:
+        self.name = name
+        self.model = model
+        self.breaker = CircuitBreaker(f"模型 {name}", failure_threshold=2)
+        """连续失败时将该配置移出路由，退避时间结束后放行一次请求作为试探"""
+        self.outstanding = 0
+        """正在进行的请求数"""
+        self.requests = 0
+        self.latencies: Deque[float] = deque(maxlen=self.WINDOW)
+        """最近成功请求的耗时（秒），流式输出为首块内容的耗时"""
+        self.outcomes: Deque[bool] = deque(maxlen=self.WINDOW)
+        """最近请求是否成功"""
+
+    @property
+    def p50(self) -> Optional[float]:
+        return statistics.median(self.latencies) if self.latencies else None
+
+    @property
+    def p95(self) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+
+    @property
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def summary(self) -> str:
+        latency = f"p50 {self.p50 * 1000:.0f}ms p95 {self.p95 * 1000:.0f}ms" if self.latencies else "暂无数据"  # type:ignore
+        return (f"{self.breaker.summary()} | 进行中 {self.outstanding} | {latency} | "
+                f"错误率 {self.error_rate:.0%} | 请求 {self.requests}")
+
+
+class ModelRouter(BasicModel, governed=False):
+    """
+    模型路由
+
+    同一用途配置了多个模型时（如两个 OpenAI 兼容接口加一个本地 Ollama 兜底），将请求路由到延迟最低的健康配置，
+    失败时换一个配置重试一次。连续失败的配置会被熔断移出，退避时间结束后重新试用。
+
+    启用对冲时，调用方可以传入 `hedge=True`：首个请求超过该配置的 p95 延迟仍未返回时，
+    向次优配置再发出一个请求，采用先返回的结果并取消另一个
+
+    各配置自身的并发、限流与重试仍由其请求调度器负责，路由本身不再经过调度
+    """
+    MIN_SAMPLES = 5
+    """启用对冲所需的最少延迟样本数"""
+    MAX_ERROR_RATE = 0.5
+    """最近错误率超过该值的配置视为不健康，仅在没有其他可用配置时使用"""
+
+    def __init__(self, endpoints: List[Tuple[str, BasicModel]], hedge: bool = False) -> None:
+        if not endpoints:
+            raise ValueError("模型路由至少需要一个模型配置")
+        super().__init__(endpoints[0][1].config)
+        self.endpoints = [Endpoint(name, model) for name, model in endpoints]
+        self.hedge = hedge
+        """是否允许调用方发出对冲请求"""
+        self.hedges = 0
+        """发出的对冲请求数"""
+        self.hedge_wins = 0
+        """对冲请求先于首个请求返回的次数"""
+
+    def load(self) -> bool:
+        loaded = [endpoint.model.load() for endpoint in self.endpoints]
+        self.is_running = any(loaded)
+        return self.is_running
+
+    async def warmup(self):
+        results = await asyncio.gather(*(endpoint.model.warmup() for endpoint in self.endpoints), return_exceptions=True)
+        for endpoint, result in zip(self.endpoints, results):
+            if isinstance(result, Exception):
+                endpoint.breaker.record_failure(result)
+        if all(isinstance(result, Exception) for result in results):
+            raise RuntimeError("所有模型配置预热均失败")
+
+    async def close(self):
+        await asyncio.gather(*(endpoint.model.close() for endpoint in self.endpoints), return_exceptions=True)
+
+    def summary(self) -> str:
+        lines = [f"{endpoint.name}: {endpoint.summary()}" for endpoint in self.endpoints]
+        if self.hedge:
+            lines.append(f"对冲请求 {self.hedges} 次，胜出 {self.hedge_wins} 次")
+        return "\n".join(lines)
+
+    def __pick(self, exclude: List[Endpoint] = []) -> Optional[Endpoint]:
+        """
+        选择延迟最低的健康配置（尚无数据的配置优先试用），所有配置均不可用时仍从中选择
+        """
+        candidates = [endpoint for endpoint in self.endpoints if endpoint not in exclude]
+        available = [endpoint for endpoint in candidates if endpoint.breaker.available]
+        healthy = [endpoint for endpoint in available if endpoint.error_rate <= self.MAX_ERROR_RATE]
+        if not candidates:
+            return None
+        return min(healthy or available or candidates, key=lambda endpoint: (endpoint.p50 or 0.0, endpoint.outstanding))
+
+    @staticmethod
+    async def __discard(result):
+        """
+        关闭被丢弃的流式输出，释放其占用的连接与并发名额
+        """
+        if isinstance(result, tuple) and result[1] is not None:
+            await result[1].aclose()  # type:ignore
+
+    async def __attempt(self, endpoint: Endpoint, start: Callable[[BasicModel], Awaitable[T]]) -> T:
+        endpoint.outstanding += 1
+        endpoint.requests += 1
+        begin = time.monotonic()
+        try:
+            result = await start(endpoint.model)
+        except Exception as e:
+            endpoint.outcomes.append(False)
+            endpoint.breaker.record_failure(e)
+            raise
+        finally:
+            endpoint.outstanding -= 1
+
+        endpoint.latencies.append(time.monotonic() - begin)
+        endpoint.outcomes.append(True)
+        endpoint.breaker.record_success()
+        return result
+
+    async def __hedged(self, primary: Endpoint, start: Callable[[BasicModel], Awaitable[T]], tried: List[Endpoint]) -> T:
+        """
+        向 `primary` 发出请求，超过其 p95 延迟仍未返回时向次优配置发出对冲请求
+        """
+        first = asyncio.ensure_future(self.__attempt(primary, start))
+        backup = self.__pick(exclude=tried) if len(primary.latencies) >= self.MIN_SAMPLES else None
+        if backup is None:
+            return await first
+
+        delay: float = primary.p95  # type:ignore
+        begin = time.monotonic()
+        racers = [first]
+        winner: Optional[asyncio.Future] = None
+        try:
+            done, _ = await asyncio.wait(racers, timeout=delay)
+            if not done:
+                tried.append(backup)
+                self.hedges += 1
+                logger.info(f"模型 {primary.name} 超过 p95 ({delay * 1000:.0f}ms) 仍未返回，向 {backup.name} 发出对冲请求")
+                racers.append(asyncio.ensure_future(self.__attempt(backup, start)))
+
+            error: Optional[BaseException] = None
+            pending = set(racers)
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for racer in done:
+                    if racer.exception() is None:
+                        winner = racer
+                        break
+                    error = racer.exception()
+            if winner is None:
+                raise error  # type:ignore
+
+            if winner is not first:
+                self.hedge_wins += 1
+                # 首个请求至少耗时这么久，计入其延迟样本，避免 p95 只记住更快的请求
+                primary.latencies.append(time.monotonic() - begin)
+            return winner.result()
+        finally:
+            losers = [racer for racer in racers if racer is not winner]
+            for racer in losers:
+                racer.cancel()
+            # 两个请求几乎同时返回时，落败的流式输出需要关闭
+            for result in await asyncio.gather(*losers, return_exceptions=True):
+                if not isinstance(result, BaseException):
+                    await self.__discard(result)
+
+    async def __route(self, start: Callable[[BasicModel], Awaitable[T]], hedge: bool) -> T:
+        """
+        路由到最优配置，失败时换一个配置重试一次
+        """
+        tried: List[Endpoint] = []
+        endpoint = self.__pick()
+        while True:
+            tried.append(endpoint)  # type:ignore
+            try:
+                if hedge:
+                    return await self.__hedged(endpoint, start, tried)  # type:ignore
+                return await self.__attempt(endpoint, start)  # type:ignore
+            except ModelError as e:
+                next_endpoint = self.__pick(exclude=tried) if len(tried) < 2 else None
+                if next_endpoint is None:
+                    raise
+                logger.warning(f"模型 {endpoint.name} 请求失败，换用 {next_endpoint.name}: {e}")  # type:ignore
+                endpoint = next_endpoint
+
+    async def __stream(self, start: Callable[[BasicModel], Awaitable[StreamHead]], hedge: bool) -> AsyncGenerator[str, None]:
+        first, chunks = await self.__route(start, hedge)
+        if chunks is None:
+            return
+        try:
+            yield first
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()  # type:ignore
+
+    async def ask(
+        self,
+        prompt: str,
+        history: List[Message],
+        images: Optional[List[str]] = [],
+        tools: Optional[List[dict]] = [],
+        stream: Optional[bool] = False,
+        system: Optional[str] = None,
+        **kwargs,
+    ) -> Union[AsyncGenerator[str, None], str]:
+        """
+        :param hedge: 是否允许对冲请求（仅在路由启用对冲时生效）
+        """
+        hedge = bool(kwargs.pop("hedge", False)) and self.hedge
+
+        if not stream:
+            return await self.__route(
+                lambda model: model.ask(prompt, history, images, tools, False, system, **kwargs), hedge
+            )
+
+        async def start(model: BasicModel) -> StreamHead:
+            # 流式输出以首块内容返回作为请求完成，路由与对冲都只比较首块内容的延迟
+            chunks = await model.ask(prompt, history, images, tools, True, system, **kwargs)
+            try:
+                return await chunks.__anext__(), chunks
+            except StopAsyncIteration:
+                return "", None
+            except BaseException:
+                await chunks.aclose()
+                raise
+
+        return self.__stream(start, hedge)
@@ -3,12 +3,19 @@ from typing import AsyncGenerator, List, Literal, Optional, Union, overload
 from dataclasses import dataclass
 from datetime import datetime
 from abc import ABCMeta, abstractmethod
-from typing import Any, AsyncGenerator, List, Literal, Optional, Union, overload
+from typing import Any, AsyncGenerator, Callable, Iterable, List, Literal, Optional, TypeVar, Union, overload
+import functools
 
 from pydantic import BaseModel
 
+from infra.circuit_breaker import CircuitBreaker, tcp_probe
+from infra.runtime import iterate_blocking, run_blocking
 from plugin import get_function_calls
 
+from ._governor import ModelError, RequestGovernor, parse_retry_after
+
+T = TypeVar("T")
+
 
 @dataclass
 class Message:
@@ -114,6 +121,17 @@ class ModelConfig(BaseModel):
     multimodal: bool = False
     """是否为多模态模型（注意：对应的加载器必须实现 `ask_vision` 方法）"""
 
+    max_concurrency: int = 4
+    """同时进行的最大请求数"""
+    rpm: int = 0
+    """每分钟最大请求数，0 表示不限制"""
+    tpm: int = 0
+    """每分钟最大 Tokens（按字符数估算），0 表示不限制"""
+    max_retries: int = 2
+    """连接失败、限流、服务端错误或超时后的最大重试次数"""
+    request_timeout: float = 60.0
+    """单次请求的超时时间（秒），流式输出时为等待每一块内容的超时时间"""
+
 
 
 class BasicModel(metaclass=ABCMeta):
@@ -121,8 +139,22 @@ class BasicModel(metaclass=ABCMeta):
     模型基类，所有模型加载器都必须继承于该类
 
     推荐使用该基类中定义的方法构建模型加载器类，但无论如何都必须实现 `ask` 方法
+
+    加载器实现的 `ask` 会自动经过请求调度（并发上限、限流、重试与超时），
+    调用失败时应抛出 `ModelError`（可重试的错误需标明），不要把错误信息作为回复返回
     """
 
+    def __init_subclass__(cls, governed: bool = True, **kwargs) -> None:
+        """
+        :param governed: `ask` 是否经过请求调度（组合多个模型的类应设为 False，由各模型自行调度）
+        """
+        super().__init_subclass__(**kwargs)
+        if governed and "ask" in cls.__dict__:
+            cls.ask = _governed(cls.__dict__["ask"])
+
+    EXECUTOR = "llm-io"
+    """执行同步 SDK 调用的线程池"""
+
     def __init__(self, model_config: ModelConfig) -> None:
         """
         统一在此处声明变量
@@ -131,8 +163,17 @@ class BasicModel(metaclass=ABCMeta):
         """模型配置"""
         self.is_running = False
         """模型状态"""
-        self.succeed = True
-        """模型是否成功返回结果"""
+        self.governor = RequestGovernor(
+            f"{model_config.loader}({model_config.model_name})",
+            model_config.max_concurrency,
+            model_config.rpm,
+            model_config.tpm,
+            model_config.max_retries,
+            model_config.request_timeout,
+        )
+        """请求调度器"""
+        self.breaker: Optional[CircuitBreaker] = None
+        """API 地址的熔断器，由加载器通过 `_guard_host` 启用"""
 
     def _require(self, *require_fields: str):
         """
@@ -144,6 +185,27 @@ class BasicModel(metaclass=ABCMeta):
         if missing_fields:
             raise ValueError(f"对于 {self.config.loader} 以下配置是必需的: {', '.join(missing_fields)}")
 
+    async def _run_blocking(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """
+        在 `EXECUTOR` 线程池中执行同步 SDK 的阻塞调用
+        """
+        return await run_blocking(self.EXECUTOR, func, *args, **kwargs)
+
+    def _iterate_blocking(self, iterable: Iterable[T]) -> AsyncGenerator[T, None]:
+        """
+        在 `EXECUTOR` 线程池中迭代同步 SDK 返回的流式响应
+        """
+        return iterate_blocking(self.EXECUTOR, iterable)
+
+    def _guard_host(self, url: str, failure_threshold: int = 3):
+        """
+        为 API 地址启用熔断：连续连接失败后快速失败，并在后台探测地址是否恢复
+
+        :param url: API 地址
+        :param failure_threshold: 连续失败多少次后熔断
+        """
+        self.breaker = CircuitBreaker(f"{self.config.loader} {url}", failure_threshold, probe=tcp_probe(url))
+
     def _build_messages(self, prompt: str, history: List[Message]):
         """
         构建对话上下文历史的函数
@@ -159,6 +221,18 @@ class BasicModel(metaclass=ABCMeta):
         self.is_running = True
         return True
 
+    async def warmup(self):
+        """
+        启动预热：提前建立连接池与 TLS 连接等（在线模型可重写，默认不做任何事）
+        """
+        pass
+
+    async def close(self):
+        """
+        释放连接池等资源（程序退出时调用，持有长连接的加载器应重写）
+        """
+        pass
+
     async def _ask_sync(self, messages: list, *args, **kwargs):
         """
         同步模型调用
@@ -217,10 +291,36 @@ class BasicModel(metaclass=ABCMeta):
         :param system: 系统提示
 
         :return: 模型回复
+        :raise ModelError: 重试后仍然调用失败（流式输出时在迭代中抛出）
         """
         pass
 
 
+def _governed(ask):
+    """
+    为加载器实现的 `ask` 套上请求调度，每次重试都会重新构建请求
+    """
+
+    @functools.wraps(ask)
+    async def wrapper(
+        self: BasicModel,
+        prompt: str,
+        history: List[Message],
+        images: Optional[List[str]] = [],
+        tools: Optional[List[dict]] = [],
+        stream: Optional[bool] = False,
+        system: Optional[str] = None,
+        **kwargs,
+    ):
+        cost = len(prompt) + len(system or "") + sum(len(item.danmu) + len(item.respond) for item in history)
+        request = functools.partial(ask, self, prompt, history, images, tools, stream, system, **kwargs)
+        if stream:
+            return self.governor.stream(request, cost)
+        return await self.governor.call(request, cost)
+
+    return wrapper
+
+
 class FunctionCallRequest(BaseModel):
     """
     模型 FunctionCall 请求
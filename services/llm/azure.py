@@ -22,9 +22,9 @@ from azure.ai.inference.models import (
     UserMessage,
 )
 from azure.core.credentials import AzureKeyCredential
-from azure.core.exceptions import HttpResponseError
+from azure.core.exceptions import HttpResponseError, ServiceRequestError, ServiceResponseError
 
-from ._types import BasicModel, Message, ModelConfig, function_call_handler
+from ._types import BasicModel, Message, ModelConfig, ModelError, function_call_handler, parse_retry_after
 
 logger = logging.getLogger("Muice.Azure")
 
@@ -107,8 +107,19 @@ class Azure(BasicModel):
 
         return False
 
+    def __create_client(self) -> ChatCompletionsClient:
+        # 重试由请求调度器统一处理
+        return ChatCompletionsClient(endpoint=self.endpoint, credential=AzureKeyCredential(self.token), retry_total=0)
+
+    @staticmethod
+    def __translate_error(e: Exception) -> ModelError:
+        if isinstance(e, HttpResponseError):
+            headers = e.response.headers if e.response is not None else None
+            return ModelError.from_status(e.status_code, f"{e.reason}: {e.message}", parse_retry_after(headers))
+        return ModelError(f"API 连接错误: {e}", retryable=True)
+
     async def _ask_sync(self, messages: List[ChatRequestMessage]) -> str:
-        client = ChatCompletionsClient(endpoint=self.endpoint, credential=AzureKeyCredential(self.token))
+        client = self.__create_client()
 
         try:
             response = await client.complete(
@@ -128,16 +139,16 @@ class Azure(BasicModel):
                 return response.choices[0].message.content  # type: ignore
 
             elif finish_reason == CompletionsFinishReason.CONTENT_FILTERED:
-                return "(模型内部错误: 被内容过滤器阻止)"
+                raise ModelError("模型内部错误: 被内容过滤器阻止")
 
             elif finish_reason == CompletionsFinishReason.TOKEN_LIMIT_REACHED:
-                return "(模型内部错误: 达到了最大 token 限制)"
+                raise ModelError("模型内部错误: 达到了最大 token 限制")
 
             elif finish_reason == CompletionsFinishReason.TOOL_CALLS:
                 tool_calls = response.choices[0].message.tool_calls
                 messages.append(AssistantMessage(tool_calls=tool_calls))
                 if not self._tool_messages_precheck(tool_calls=tool_calls):
-                    return "(模型内部错误: tool_calls 内容为空)"
+                    raise ModelError("模型内部错误: tool_calls 内容为空")
 
                 tool_call = tool_calls[0]  # type:ignore
                 function_args = json.loads(tool_call.function.arguments.replace("'", '"'))
@@ -150,18 +161,15 @@ class Azure(BasicModel):
 
                 return await self._ask_sync(messages)
 
-            return "(模型内部错误: 未知错误)"
+            raise ModelError("模型内部错误: 未知错误")
 
-        except HttpResponseError as e:
-            logger.error(f"模型响应失败: {e.status_code} ({e.reason})")
-            logger.error(f"{e.message}")
-            self.succeed = False
-            return f"模型响应失败: {e.status_code} ({e.reason})"
+        except (HttpResponseError, ServiceRequestError, ServiceResponseError) as e:
+            raise self.__translate_error(e) from e
         finally:
             await client.close()
 
     async def _ask_stream(self, messages: List[ChatRequestMessage]) -> AsyncGenerator[str, None]:
-        client = ChatCompletionsClient(endpoint=self.endpoint, credential=AzureKeyCredential(self.token))
+        client = self.__create_client()
 
         try:
             response = await client.complete(
@@ -198,10 +206,10 @@ class Azure(BasicModel):
                     continue
 
                 elif finish_reason == CompletionsFinishReason.CONTENT_FILTERED:
-                    yield "(模型内部错误: 被内容过滤器阻止)"
+                    raise ModelError("模型内部错误: 被内容过滤器阻止")
 
                 elif finish_reason == CompletionsFinishReason.TOKEN_LIMIT_REACHED:
-                    yield "(模型内部错误: 达到了最大 token 限制)"
+                    raise ModelError("模型内部错误: 达到了最大 token 限制")
 
                 elif finish_reason == CompletionsFinishReason.TOOL_CALLS:
                     messages.append(
@@ -227,11 +235,8 @@ class Azure(BasicModel):
 
                     return
 
-        except HttpResponseError as e:
-            logger.error(f"模型响应失败: {e.status_code} ({e.reason})")
-            logger.error(f"{e.message}")
-            yield f"模型响应失败: {e.status_code} ({e.reason})"
-            self.succeed = False
+        except (HttpResponseError, ServiceRequestError, ServiceResponseError) as e:
+            raise self.__translate_error(e) from e
         finally:
             await client.close()
 
@@ -269,8 +274,6 @@ class Azure(BasicModel):
         system: Optional[str] = None,
         **kwargs,
     ) -> Union[AsyncGenerator[str, None], str]:
-        self.succeed = True
-
         messages = self._build_messages(prompt, history, images, system)
 
         self._tools = self.__build_tools_definition(tools) if tools else []
@@ -1,7 +1,5 @@
-import asyncio
 import json
 import pathlib
-from functools import partial
 from typing import (
     AsyncGenerator,
     Generator,
@@ -19,7 +17,7 @@ from dashscope.api_entities.dashscope_response import (
 )
 import logging
 
-from ._types import BasicModel, Message, ModelConfig, function_call_handler
+from ._types import BasicModel, Message, ModelConfig, ModelError, function_call_handler
 
 logger = logging.getLogger("Muice.Dashscope")
 
@@ -80,34 +78,25 @@ class Dashscope(BasicModel):
         return messages
 
     async def _ask_sync(self, messages: list) -> str:
-        loop = asyncio.get_event_loop()
-
-        response = await loop.run_in_executor(
-            None,
-            partial(
-                dashscope.Generation.call,
-                api_key=self.api_key,
-                model=self.model,
-                messages=messages,
-                tools=self._tools,
-                max_tokens=self.max_tokens,
-                temperature=self.temperature,
-                top_p=self.top_p,
-                repetition_penalty=self.repetition_penalty,
-                stream=False,
-                enable_search=self.enable_search,
-            ),
+        response = await self._run_blocking(
+            dashscope.Generation.call,
+            api_key=self.api_key,
+            model=self.model,
+            messages=messages,
+            tools=self._tools,
+            max_tokens=self.max_tokens,
+            temperature=self.temperature,
+            top_p=self.top_p,
+            repetition_penalty=self.repetition_penalty,
+            stream=False,
+            enable_search=self.enable_search,
         )
 
         if not isinstance(response, GenerationResponse):
-            self.succeed = False
-            return "(模型内部错误：在流关闭的情况下返回了 Generator)"
+            raise ModelError("模型内部错误：在流关闭的情况下返回了 Generator")
 
         if response.status_code != 200:
-            self.succeed = False
-            logger.error(f"模型调用失败: {response.status_code}({response.code})")
-            logger.error(f"{response.message}")
-            return f"模型调用失败: {response.status_code}({response.code})"
+            raise ModelError.from_status(response.status_code, f"{response.code}: {response.message}")
 
         if response.output.text:
             return response.output.text
@@ -131,29 +120,23 @@ class Dashscope(BasicModel):
         return await self._ask_sync(messages)
 
     async def _ask_stream(self, messages: list) -> AsyncGenerator[str, None]:
-        loop = asyncio.get_event_loop()
-
-        response = await loop.run_in_executor(
-            None,
-            partial(
-                dashscope.Generation.call,
-                api_key=self.api_key,
-                model=self.model,
-                messages=messages,
-                max_tokens=self.max_tokens,
-                temperature=self.temperature,
-                top_p=self.top_p,
-                repetition_penalty=self.repetition_penalty,
-                stream=True,
-                tools=self._tools,
-                parallel_tool_calls=True,
-                enable_search=self.enable_search,
-                incremental_output=True,
-            ),
+        response = await self._run_blocking(
+            dashscope.Generation.call,
+            api_key=self.api_key,
+            model=self.model,
+            messages=messages,
+            max_tokens=self.max_tokens,
+            temperature=self.temperature,
+            top_p=self.top_p,
+            repetition_penalty=self.repetition_penalty,
+            stream=True,
+            tools=self._tools,
+            parallel_tool_calls=True,
+            enable_search=self.enable_search,
+            incremental_output=True,
         )
 
         if isinstance(response, GenerationResponse):
-            self.succeed = False
             logger.warning("模型内部错误：在流开启的情况下返回了 GenerationResponse")
             yield response.output.text
             return
@@ -165,15 +148,11 @@ class Dashscope(BasicModel):
         function_name: str = ""
         function_args_delta: str = ""
 
-        for chunk in response:
+        async for chunk in self._iterate_blocking(response):
             logger.debug(chunk)
 
             if chunk.status_code != 200:
-                logger.error(f"模型调用失败: {chunk.status_code}({chunk.code})")
-                logger.error(f"{chunk.message}")
-                yield f"模型调用失败: {chunk.status_code}({chunk.code})"
-                self.succeed = False
-                return
+                raise ModelError.from_status(chunk.status_code, f"{chunk.code}: {chunk.message}")
 
             if chunk.output.choices and chunk.output.choices[0].message.get("tool_calls", []):
                 tool_calls = chunk.output.choices[0].message.tool_calls
@@ -245,28 +224,19 @@ class Dashscope(BasicModel):
         return
 
     async def _ask_vision_sync(self, messages: list) -> str:
-        loop = asyncio.get_event_loop()
-
-        response = await loop.run_in_executor(
-            None,
-            partial(
-                dashscope.MultiModalConversation.call,
-                api_key=self.api_key,
-                model=self.model,
-                messages=messages,
-                stream=False,
-            ),
+        response = await self._run_blocking(
+            dashscope.MultiModalConversation.call,
+            api_key=self.api_key,
+            model=self.model,
+            messages=messages,
+            stream=False,
         )
 
         if isinstance(response, Generator):
-            self.succeed = False
-            return "(模型内部错误: 在流关闭的情况下返回了 Generator)"
+            raise ModelError("模型内部错误: 在流关闭的情况下返回了 Generator")
 
         if response.status_code != 200:
-            self.succeed = False
-            logger.error(f"模型调用失败: {response.status_code}({response.code})")
-            logger.error(f"{response.message}")
-            return f"模型调用失败: {response.status_code}({response.code})"
+            raise ModelError.from_status(response.status_code, f"{response.code}: {response.message}")
 
         if isinstance(response.output.choices[0].message.content, str):
             return response.output.choices[0].message.content
@@ -274,21 +244,15 @@ class Dashscope(BasicModel):
         return response.output.choices[0].message.content[0]["text"]  # type: ignore
 
     async def _ask_vision_stream(self, messages: list) -> AsyncGenerator[str, None]:
-        loop = asyncio.get_event_loop()
-
-        response = await loop.run_in_executor(
-            None,
-            partial(
-                dashscope.MultiModalConversation.call,
-                api_key=self.api_key,
-                model=self.model,
-                messages=messages,
-                stream=True,
-            ),
+        response = await self._run_blocking(
+            dashscope.MultiModalConversation.call,
+            api_key=self.api_key,
+            model=self.model,
+            messages=messages,
+            stream=True,
         )
 
         if isinstance(response, MultiModalConversationResponse):
-            self.succeed = False
             logger.warning("模型内部错误：在流开启的情况下返回了 MultiModalConversationResponse")
             if isinstance(response.output.choices[0].message.content, str):
                 yield response.output.choices[0].message.content
@@ -298,14 +262,10 @@ class Dashscope(BasicModel):
 
         size = 0
 
-        for chunk in response:
+        async for chunk in self._iterate_blocking(response):
             logger.debug(chunk)
             if chunk.status_code != 200:
-                self.succeed = False
-                logger.error(f"模型调用失败: {chunk.status_code}({chunk.code})")
-                logger.error(f"{chunk.message}")
-                yield f"模型调用失败: {chunk.status_code}({chunk.code})"
-                return
+                raise ModelError.from_status(chunk.status_code, f"{chunk.code}: {chunk.message}")
 
             content_body = chunk.output.choices[0].message.content
             if isinstance(content_body, str):
@@ -352,8 +312,6 @@ class Dashscope(BasicModel):
         """
         因为 Dashscope 对于多模态模型的接口不同，所以这里不能统一函数
         """
-        self.succeed = True
-
         self._tools = tools if tools else []
         messages = self._build_messages(prompt, history, images, system)
 
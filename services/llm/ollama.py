@@ -4,7 +4,7 @@ import ollama
 import logging
 from ollama import ResponseError
 
-from ._types import BasicModel, Message, ModelConfig, function_call_handler
+from ._types import BasicModel, Message, ModelConfig, ModelError, function_call_handler
 from .utils.images import get_image_base64
 
 logger = logging.getLogger("Muice.Ollama")
@@ -91,7 +91,9 @@ class Ollama(BasicModel):
             tool_calls = response.message.tool_calls
 
             if not tool_calls:
-                return response.message.content if response.message.content else "(警告：模型无返回)"
+                if not response.message.content:
+                    raise ModelError("模型无输出")
+                return response.message.content
 
             for tool in tool_calls:
                 function_name = tool.function.name
@@ -106,12 +108,9 @@ class Ollama(BasicModel):
                 return await self._ask_sync(messages)
 
         except ollama.ResponseError as e:
-            logger.error(f"模型调用错误: {e.error}")
-            self.succeed = False
-            return f"模型调用错误: {e.error}"
+            raise ModelError.from_status(e.status_code, e.error) from e
 
-        self.succeed = False
-        return "模型调用错误: 未知错误"
+        raise ModelError("模型调用错误: 未知错误")
 
     async def _ask_stream(self, messages: list) -> AsyncGenerator[str, None]:
         try:
@@ -157,10 +156,7 @@ class Ollama(BasicModel):
                         yield content
 
         except ollama.ResponseError as e:
-            logger.error(f"模型调用错误: {e.error}")
-            yield f"模型调用错误: {e.error}"
-            self.succeed = False
-            return
+            raise ModelError.from_status(e.status_code, e.error) from e
 
     @overload
     async def ask(
@@ -196,7 +192,6 @@ class Ollama(BasicModel):
         system: Optional[str] = None,
         **kwargs,
     ) -> Union[AsyncGenerator[str, None], str]:
-        self.succeed = True
         self._tools = tools if tools else []
         messages = self._build_messages(prompt, history, images, system)
 
@@ -5,7 +5,7 @@ import openai
 import logging
 from openai.types.chat import ChatCompletionMessage, ChatCompletionToolParam
 
-from ._types import BasicModel, Message, ModelConfig, function_call_handler
+from ._types import BasicModel, Message, ModelConfig, ModelError, function_call_handler, parse_retry_after
 from .utils.images import get_image_base64
 
 logger = logging.getLogger("Muice.Openai")
@@ -21,9 +21,26 @@ class Openai(BasicModel):
         self.temperature = self.config.temperature
         self.stream = self.config.stream
 
-        self.client = openai.AsyncOpenAI(api_key=self.api_key, base_url=self.api_base, timeout=30)
+        # 重试与超时由请求调度器统一处理
+        self.client = openai.AsyncOpenAI(
+            api_key=self.api_key, base_url=self.api_base, timeout=self.config.request_timeout, max_retries=0
+        )
+        self._guard_host(self.api_base)
         self._tools: List[ChatCompletionToolParam] = []
 
+    async def warmup(self):
+        # 轻量请求，建立连接池中的 TLS 长连接（部分兼容服务没有该接口，返回错误同样能建立连接）
+        try:
+            await self.client.models.list()
+        except openai.APIStatusError:
+            pass
+        except openai.APIConnectionError as e:
+            self.breaker.record_failure(e)  # type:ignore
+            raise
+
+    async def close(self):
+        await self.client.close()
+
     def __build_image_message(self, prompt: str, image_paths: List[str]) -> dict:
         user_content: List[dict] = [{"type": "text", "text": prompt}]
 
@@ -74,7 +91,22 @@ class Openai(BasicModel):
 
         return True
 
+    def _translate_error(self, e: openai.APIError) -> ModelError:
+        """
+        将 SDK 异常转换为 `ModelError`，连接失败计入熔断器
+        """
+        if isinstance(e, openai.APIStatusError):
+            return ModelError.from_status(e.status_code, e.message, parse_retry_after(e.response.headers))
+        if isinstance(e, openai.APIConnectionError):
+            logger.error(e.__cause__)
+            self.breaker.record_failure(e)  # type:ignore
+            return ModelError(f"API 连接错误: {e}", retryable=True)
+        return ModelError(f"API 错误: {e}")
+
     async def _ask_sync(self, messages: list, **kwargs) -> str:
+        if not self.breaker.available:  # type:ignore
+            raise ModelError(f"API 连接错误: {self.breaker.summary()}")  # type:ignore
+
         try:
             response = await self.client.chat.completions.create(
                 model=self.model,
@@ -84,6 +116,7 @@ class Openai(BasicModel):
                 stream=False,
                 tools=self._tools,
             )
+            self.breaker.record_success()  # type:ignore
 
             result = ""
             message = response.choices[0].message  # type:ignore
@@ -116,22 +149,17 @@ class Openai(BasicModel):
             if message.content:  # type:ignore
                 result += message.content  # type:ignore
 
-            return result if result else "（警告：模型无输出！）"
-
-        except openai.APIConnectionError as e:
-            error_message = f"API 连接错误: {e}"
-            logger.error(error_message)
-            logger.error(e.__cause__)
-            self.succeed = False
-
-        except openai.APIStatusError as e:
-            error_message = f"API 状态异常: {e.status_code}({e.response})"
-            logger.error(error_message)
-            self.succeed = False
+            if not result:
+                raise ModelError("模型无输出")
+            return result
 
-        return error_message
+        except openai.APIError as e:
+            raise self._translate_error(e) from e
 
     async def _ask_stream(self, messages: list, **kwargs) -> AsyncGenerator[str, None]:
+        if not self.breaker.available:  # type:ignore
+            raise ModelError(f"API 连接错误: {self.breaker.summary()}")  # type:ignore
+
         try:
             response = await self.client.chat.completions.create(
                 model=self.model,
@@ -141,6 +169,7 @@ class Openai(BasicModel):
                 stream=True,
                 tools=self._tools,
             )
+            self.breaker.record_success()  # type:ignore
 
             is_insert_think_label = False
             final_tool_calls = {}
@@ -209,16 +238,8 @@ class Openai(BasicModel):
                 async for chunk in self._ask_stream(messages):
                     yield chunk
 
-        except openai.APIConnectionError as e:
-            error_message = f"API 连接错误: {e}"
-            logger.error(error_message)
-            logger.error(e.__cause__)
-            yield error_message
-
-        except openai.APIStatusError as e:
-            error_message = f"API 状态异常: {e.status_code}({e.response})"
-            logger.error(error_message)
-            yield error_message
+        except openai.APIError as e:
+            raise self._translate_error(e) from e
 
     @overload
     async def ask(
@@ -254,7 +275,6 @@ class Openai(BasicModel):
         system: Optional[str] = None,
         **kwargs,
     ) -> Union[AsyncGenerator[str, None], str]:
-        self.succeed = True
         self._tools = tools  # type:ignore
 
         messages = self._build_messages(prompt, history, images, system)
@@ -0,0 +1,135 @@
+from typing import AsyncGenerator, AsyncIterator, List
+
+SENTENCE_END = "。！？!?；;…\n"
+"""句末标点"""
+CLOSING = "”’\"'」』）)】》~～"
+"""可以紧跟在句末标点之后、仍属于本句的符号"""
+SOFT_BREAK = "，,、：:"
+"""句子过长时的次选切分点"""
+
+THINK_START = "<think>"
+THINK_END = "</think>"
+
+
+def _partial_suffix(text: str, tag: str) -> int:
+    """
+    返回 `text` 结尾与 `tag` 开头重合的最大长度（用于保留被分块截断的标签）
+    """
+    for length in range(min(len(text), len(tag) - 1), 0, -1):
+        if text.endswith(tag[:length]):
+            return length
+    return 0
+
+
+def _content_length(text: str) -> int:
+    """
+    不计标点与空白的字符数
+    """
+    return sum(1 for char in text if char.isalnum())
+
+
+class SentenceSegmenter:
+    """
+    流式分句器
+
+    将模型的流式输出在中文句末标点处切分为句子，并去除 `<think>` 思考过程，
+    使得模型仍在生成时即可将已完成的句子交给 TTS
+    """
+    def __init__(self, min_length: int = 4, max_length: int = 50) -> None:
+        self.min_length = min_length
+        """有效字符数少于此值的句子与下一句合并，避免生成过碎的语音"""
+        self.max_length = max_length
+        """缓冲超过此长度仍没有句末标点时，在最后一个逗号等处切分"""
+        self._raw = ""
+        """尚未确认是否属于思考标签的原始文本"""
+        self._inside_think = False
+        self._buffer = ""
+        """已去除思考过程、尚未成句的文本"""
+
+    def _strip_thoughts(self, chunk: str) -> str:
+        """
+        去除思考过程，返回可以确认不属于思考过程的文本（标签可能被截断在两个分块之间）
+        """
+        self._raw += chunk
+        output = ""
+        while self._raw:
+            tag = THINK_END if self._inside_think else THINK_START
+            index = self._raw.find(tag)
+            if index >= 0:
+                if not self._inside_think:
+                    output += self._raw[:index]
+                self._raw = self._raw[index + len(tag):]
+                self._inside_think = not self._inside_think
+                continue
+
+            keep = _partial_suffix(self._raw, tag)
+            if not self._inside_think:
+                output += self._raw[:len(self._raw) - keep]
+            self._raw = self._raw[len(self._raw) - keep:]
+            break
+        return output
+
+    def _find_boundary(self) -> int:
+        """
+        查找第一个满足最短长度的句子结尾，返回切分位置，找不到时返回 0
+
+        句末标点恰好位于缓冲末尾时不切分，因为下一个分块可能还有连续的标点或闭合符号
+        """
+        buffer = self._buffer
+        index = 0
+        while index < len(buffer):
+            if buffer[index] not in SENTENCE_END:
+                index += 1
+                continue
+
+            end = index + 1
+            while end < len(buffer) and (buffer[end] in SENTENCE_END or buffer[end] in CLOSING):
+                end += 1
+            if end >= len(buffer):
+                return 0
+            if _content_length(buffer[:end]) >= self.min_length:
+                return end
+            index = end
+
+        if len(buffer) > self.max_length:
+            head = buffer[:self.max_length]
+            soft = max(head.rfind(char) for char in SOFT_BREAK) + 1
+            if soft > 0 and _content_length(buffer[:soft]) >= self.min_length:
+                return soft
+        return 0
+
+    def feed(self, chunk: str) -> List[str]:
+        """
+        输入一个分块，返回其中已完成的句子
+        """
+        self._buffer += self._strip_thoughts(chunk)
+        sentences = []
+        while (end := self._find_boundary()):
+            sentence, self._buffer = self._buffer[:end].strip(), self._buffer[end:]
+            if sentence:
+                sentences.append(sentence)
+        return sentences
+
+    def flush(self) -> List[str]:
+        """
+        输出结束，返回剩余的内容（若有）
+        """
+        if not self._inside_think:
+            self._buffer += self._raw
+        self._raw = ""
+        sentence, self._buffer = self._buffer.strip(), ""
+        return [sentence] if _content_length(sentence) else []
+
+
+async def split_sentences(chunks: AsyncIterator[str], min_length: int = 4, max_length: int = 50) -> AsyncGenerator[str, None]:
+    """
+    将模型的流式输出切分为句子
+
+    :param chunks: 模型的流式输出
+    """
+    segmenter = SentenceSegmenter(min_length, max_length)
+    async for chunk in chunks:
+        for sentence in segmenter.feed(chunk):
+            yield sentence
+    for sentence in segmenter.flush():
+        yield sentence
@@ -1,29 +1,24 @@
-import asyncio
 import base64
 import hashlib
 import hmac
 import json
-import ssl
-import threading
-import time
 from datetime import datetime
-from functools import partial
 from time import mktime
 from typing import (
     AsyncGenerator,
-    Generator,
     List,
     Literal,
     Optional,
+    Tuple,
     Union,
     overload,
 )
 from urllib.parse import urlencode, urlparse
 from wsgiref.handlers import format_date_time
 
-import websocket
+import aiohttp
 import logging
-from ._types import BasicModel, Message, ModelConfig
+from ._types import BasicModel, Message, ModelConfig, ModelError
 
 logger = logging.getLogger("Muice.Xfyun")
 
@@ -51,33 +46,46 @@ class Xfyun(BasicModel):
         self.host = urlparse(self.url).netloc
         self.path = urlparse(self.url).path
 
-        self.stream_queue: asyncio.Queue = asyncio.Queue()
-        self.response = ""
-        self.is_insert_think_label = False
+        self._session: Optional[aiohttp.ClientSession] = None
 
-    def _add_think_tag(self, text_body: dict) -> str:
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        获取复用的 HTTP 会话（须在事件循环中调用）
+        """
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    @staticmethod
+    def _add_think_tag(text_body: dict, in_think: bool, stream: bool) -> Tuple[str, bool]:
         """
         添加思考过程标签
+
+        :param in_think: 之前的输出是否停留在思考过程中
+        :return: 添加标签后的内容，以及此后是否处于思考过程中
         """
         answer_content = text_body["content"]
         reasoning_content = text_body.get("reasoning_content", "")
 
-        if reasoning_content and answer_content and not self.stream:
-            return f"<think>{reasoning_content}</think>{answer_content}"
+        if reasoning_content and answer_content and not stream:
+            return f"<think>{reasoning_content}</think>{answer_content}", False
 
         elif reasoning_content != "" and answer_content == "":
-            if not self.is_insert_think_label:
-                self.is_insert_think_label = True
+            if not in_think:
                 reasoning_content = "<think>" + reasoning_content
-            return reasoning_content
+            return reasoning_content, True
 
         elif answer_content != "":
-            if self.is_insert_think_label:
-                self.is_insert_think_label = False
+            if in_think:
                 answer_content = "</think>" + answer_content
-            return answer_content
+            return answer_content, False
 
-        return ""
+        return "", in_think
 
     def _create_url(self) -> str:
         now = datetime.now()
@@ -108,57 +116,6 @@ class Xfyun(BasicModel):
         url = self.url + "?" + urlencode(v)
         return url
 
-    def __on_message(self, ws, message):
-        response = json.loads(message)
-        # logger.debug(f"Spark返回数据: {response}")
-
-        if response["header"]["code"] != 0:  # 不合规时该值为10013
-            error_message = f"调用Spark在线模型时发生错误: {response['header']['message']}"
-            logger.warning(error_message)
-            self.response = error_message
-            if self.stream:
-                self.stream_queue.put_nowait(error_message)
-                self.stream_queue.put_nowait(None)  # 表示流结束
-            ws.close()
-            self.succeed = False
-            return
-
-        text_body = response["payload"]["choices"]["text"][0]
-
-        if response["header"]["status"] in [0, 1, 2]:
-            content = self._add_think_tag(text_body)
-            self.response += content
-            if self.stream:
-                self.stream_queue.put_nowait(content)
-
-        if response["header"]["status"] == 2:
-            if self.stream:
-                self.stream_queue.put_nowait(None)  # 表示流结束
-            ws.close()
-
-    def __on_error(self, ws, error):
-        logger.error(f"调用Spark在线模型时发生错误: {error}")
-        self.succeed = False
-        ws.close()
-
-    def __on_close(self, ws, close_status_code, close_msg):
-        pass
-
-    def __on_open(self, ws):
-        request_data = {
-            "header": {"app_id": self.app_id, "patch_id": [self.resource_id]},
-            "parameter": {
-                "chat": {
-                    "domain": self.service_id,
-                    "temperature": self.temperature,
-                    "top_k": self.top_k,
-                    "max_tokens": self.max_tokens,
-                }
-            },
-            "payload": {"message": {"text": self.messages}},
-        }
-        ws.send(json.dumps(request_data))
-
     def _build_messages(
         self, prompt: str, history: List[Message], images_path: Optional[List[str]] = None, system: Optional[str] = None
     ) -> list:
@@ -189,49 +146,59 @@ class Xfyun(BasicModel):
 
         return messages
 
-    def _ask(self, messages: list) -> Generator[str, None, None]:
-        self.response = ""
-        self.stream_queue = asyncio.Queue()
+    async def _ask(self, messages: list, stream: bool) -> AsyncGenerator[str, None]:
+        """
+        建立一次 websocket 会话，逐块产出模型输出
 
-        self.messages = messages
+        每次请求的状态都是局部的，多个请求可以并发进行
+        """
+        request_data = {
+            "header": {"app_id": self.app_id, "patch_id": [self.resource_id]},
+            "parameter": {
+                "chat": {
+                    "domain": self.service_id,
+                    "temperature": self.temperature,
+                    "top_k": self.top_k,
+                    "max_tokens": self.max_tokens,
+                }
+            },
+            "payload": {"message": {"text": messages}},
+        }
+        in_think = False
 
-        ws = websocket.WebSocketApp(
-            self._create_url(),
-            on_message=self.__on_message,
-            on_error=self.__on_error,
-            on_close=self.__on_close,
-        )
-        ws.on_open = self.__on_open
-
-        if self.stream:
-            threading.Thread(
-                target=ws.run_forever, kwargs={"sslopt": {"cert_reqs": ssl.CERT_NONE}, "ping_timeout": 10}, daemon=True
-            ).start()
-            while True:
-                try:
-                    content = self.stream_queue.get_nowait()
-                    if content is None:  # 流结束
+        try:
+            async with self._get_session().ws_connect(self._create_url(), ssl=False, heartbeat=10) as ws:
+                await ws.send_str(json.dumps(request_data))
+                async for message in ws:
+                    if message.type != aiohttp.WSMsgType.TEXT:
                         break
-                    yield content
-                except asyncio.QueueEmpty:
-                    time.sleep(0.01)
-        else:
-            ws.run_forever(sslopt={"cert_reqs": ssl.CERT_NONE}, ping_timeout=10)
-            yield self.response
+                    response = json.loads(message.data)
+                    # logger.debug(f"Spark返回数据: {response}")
+
+                    if response["header"]["code"] != 0:  # 不合规时该值为10013
+                        raise ModelError(f"调用Spark在线模型时发生错误: {response['header']['message']}")
+
+                    text_body = response["payload"]["choices"]["text"][0]
+                    if response["header"]["status"] in [0, 1, 2]:
+                        content, in_think = self._add_think_tag(text_body, in_think, stream)
+                        if content:
+                            yield content
+
+                    if response["header"]["status"] == 2:
+                        return
+
+        except (aiohttp.ClientError, OSError) as e:
+            raise ModelError(f"调用Spark在线模型时发生错误: {e}", retryable=True) from e
+        except ValueError as e:
+            raise ModelError(f"调用Spark在线模型时发生错误: {e}") from e
+
+        raise ModelError("Spark 连接在输出完成前断开", retryable=True)
 
     async def _ask_sync(self, messages: list) -> str:
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(None, partial(self._ask, messages=messages))
-        return "".join(result)  # 转换生成器结果为字符串
+        return "".join([chunk async for chunk in self._ask(messages, stream=False)])
 
     async def _ask_stream(self, messages: list) -> AsyncGenerator[str, None]:
-        async def sync_to_async_generator():
-            loop = asyncio.get_event_loop()
-            generator = await loop.run_in_executor(None, partial(self._ask, messages=messages))
-            for chunk in generator:
-                yield chunk
-
-        return sync_to_async_generator()
+        return self._ask(messages, stream=True)
 
     @overload
     async def ask(
@@ -267,8 +234,6 @@ class Xfyun(BasicModel):
         system: Optional[str] = None,
         **kwargs,
     ) -> Union[AsyncGenerator[str, None], str]:
-        self.succeed = True
-
         if tools:
             logger.warning("该模型加载器不支持 Function Call!")
         messages = self._build_messages(prompt, history, images, system)
@@ -1,3 +1,7 @@
 from ._base import BaseTTS
+from .cache import CachedTTS
+from .player import AudioClip, AudioPlayer
+from .pool import TTSPool
+from .template import TemplateRenderer, register_template
 
-__all__ = ["BaseTTS"]
\ No newline at end of file
+__all__ = ["BaseTTS", "CachedTTS", "AudioClip", "AudioPlayer", "TemplateRenderer", "TTSPool", "register_template"]
\ No newline at end of file
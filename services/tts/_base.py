@@ -1,13 +1,24 @@
 from abc import abstractmethod, ABC
-from typing import Optional
-import wave
-import pyaudio
+from typing import AsyncGenerator, Callable, Optional, TypeVar
+from .player import AudioClip, AudioPlayer, AudioSource
+from infra.runtime import run_blocking
 import asyncio
 
+T = TypeVar("T")
+
 class BaseTTS(ABC):
-    def __init__(self):
-        self.is_playing = False
-        
+    INTERRUPT_GRACE = 2.0
+    """请求中断后，最多再播放多少秒以等待句间停顿"""
+    WARMUP_TEXT = "你好"
+    """启动预热时试合成的文本"""
+    EXECUTOR = "tts-io"
+    """执行解码、读写文件等阻塞操作的线程池"""
+
+    @property
+    def is_playing(self) -> bool:
+        """是否有尚未播放完的音频"""
+        return AudioPlayer.get().is_active
+
     @abstractmethod
     async def generate_tts(self, text:str) -> Optional[str]:
         """
@@ -15,29 +26,83 @@ class BaseTTS(ABC):
         """
         pass
 
-    async def play_audio(self, file_path:str = './temp/tts_output.wav'):
-        self.is_playing = True
-        wf = wave.open(file_path, 'rb')
-        p = pyaudio.PyAudio()
-
-        # 打开音频流
-        stream = p.open(format=p.get_format_from_width(wf.getsampwidth()),
-                        channels=wf.getnchannels(),
-                        rate=wf.getframerate(),
-                        output=True,
-                        output_device_index=7)
-
-        # 读取音频文件并播放
-        data = wf.readframes(1024)
-        while data and self.is_playing:
-            stream.write(data)
-            data = wf.readframes(1024)
-            # 让出控制权给其他协程
-            await asyncio.sleep(0.01)
-
-        # 停止并关闭流
-        stream.stop_stream()
-        stream.close()
-        wf.close()
-        p.terminate()
-        self.is_playing = False
\ No newline at end of file
+    async def synthesize(self, text:str) -> Optional[AudioClip]:
+        """
+        生成内存中的 TTS 音频，供直接播放
+
+        默认读取 `generate_tts` 生成的文件，能直接得到音频数据的后端应重写此方法以避免读写磁盘
+        """
+        tts_file = await self.generate_tts(text)
+        if not tts_file:
+            return None
+        return await self._run_blocking(AudioClip.from_wav, tts_file)
+
+    async def synthesize_stream(self, text:str) -> AsyncGenerator[AudioClip, None]:
+        """
+        流式生成 TTS 音频，按顺序产出若干片段，首个片段就绪即可开始播放
+
+        默认在整句生成完毕后一次产出，支持流式输出的后端应重写此方法。生成失败时不产出任何片段，
+        已产出片段后才失败时抛出异常（已产出的音频不完整）
+        """
+        clip = await self.synthesize(text)
+        if clip is not None:
+            yield clip
+
+    async def _run_blocking(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """
+        在 `EXECUTOR` 线程池中执行阻塞操作
+        """
+        return await run_blocking(self.EXECUTOR, func, *args, **kwargs)
+
+    async def close(self):
+        """
+        释放连接等资源
+        """
+        pass
+
+    async def warmup(self):
+        """
+        试合成一句语音，提前付出连接建立、首次推理等冷启动开销
+        """
+        if not await self.synthesize(self.WARMUP_TEXT):
+            raise RuntimeError("试合成失败")
+
+    async def health_check(self) -> bool:
+        """
+        检查后端是否可用（供后端池剔除与恢复节点）
+        """
+        return True
+
+    def cache_params(self) -> dict:
+        """
+        影响生成结果的参数（音色等），用作 TTS 缓存键的一部分
+        """
+        return {}
+
+    def interrupt(self):
+        """
+        请求在下一个句间停顿处停止当前播放
+        """
+        AudioPlayer.get().interrupt(self.INTERRUPT_GRACE)
+
+    def stop(self):
+        """
+        立即淡出并停止当前播放
+        """
+        AudioPlayer.get().cancel()
+
+    async def enqueue_audio(self, source: AudioSource) -> asyncio.Future:
+        """
+        将音频追加到播放队列，在前一段结束后无缝播放
+
+        :return: 播放结束时完成的 Future，值为是否完整播放
+        """
+        return await AudioPlayer.get().enqueue(source)
+
+    async def play_audio(self, source: AudioSource = './temp/tts_output.wav') -> bool:
+        """
+        播放音频（WAV 文件路径或内存中的音频）
+
+        :return: 是否完整播放（被中断或停止时为 False）
+        """
+        return await AudioPlayer.get().play(source)
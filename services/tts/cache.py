@@ -0,0 +1,364 @@
+from ._base import BaseTTS
+from .player import AudioClip
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncGenerator, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+import wave
+
+logger = logging.getLogger("Muice.tts")
+
+
+@dataclass
+class CacheEntry:
+    file: str
+    """缓存文件名（相对于缓存目录）"""
+    size: int
+    """文件大小（字节）"""
+    last_used: float
+    """最后一次使用的时间"""
+
+
+class CachedTTS(BaseTTS):
+    """
+    TTS 磁盘缓存
+
+    包装任意 `BaseTTS` 实现，以 (后端, 音色与参数, 文本) 的哈希为键缓存生成的语音。
+    后端在内存中生成音频，只有写入缓存时才落盘为 WAV 文件。
+    缓存总大小超出预算时按最近最少使用淘汰，索引保存在缓存目录中，重启后依然有效
+    """
+    INDEX_FILE = "index.json"
+    EVICT_GRACE = 300
+    """最近多少秒内使用过的文件不会被淘汰（可能仍在等待播放）"""
+    HARD_LIMIT_FACTOR = 1.5
+    """总大小超过预算的多少倍时，最近使用过的文件也会被淘汰，避免短时间内大量新句子使缓存无限增长"""
+    FALLBACK_PATH = Path("./temp/tts")
+    """写入缓存失败时，`generate_tts` 将音频保存到的临时目录"""
+    INDEX_SAVE_DELAY = 5
+    """索引变更后延迟多少秒保存，期间的多次变更合并为一次写入"""
+
+    def __init__(self, backend: BaseTTS, path: str = "./temp/tts_cache", max_size_mb: float = 200) -> None:
+        super().__init__()
+        self.backend = backend
+        """实际生成语音的 TTS 后端"""
+        self.path = Path(path)
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        """缓存大小预算（字节）"""
+        self.hard_limit = int(self.max_bytes * self.HARD_LIMIT_FACTOR)
+        """缓存大小上限（字节）"""
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        """键 -> 缓存项，按最近使用时间从旧到新排列"""
+        self._total_bytes = 0
+        self._dirty = False
+        """索引是否有尚未保存的变更"""
+        self._save_task: Optional[asyncio.Task] = None
+        """等待保存索引的后台任务"""
+        self._save_now = asyncio.Event()
+        """关闭时触发，使等待中的保存立即进行"""
+        self._inflight: Dict[str, asyncio.Future] = {}
+        """键 -> 正在进行的生成，同一句的并发未命中共享同一次生成"""
+        self._waiters: Dict[str, int] = {}
+        """键 -> 等待该次生成的请求数，全部离开时取消生成"""
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.__load_index()
+
+    def __getattr__(self, name: str):
+        # 其余方法（如 GPT-SoVITS 的权重切换）直接交给后端
+        if name == "backend":
+            raise AttributeError(name)
+        return getattr(self.backend, name)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def summary(self) -> str:
+        return (f"命中率 {self.hit_rate:.0%} ({self.hits}/{self.hits + self.misses}) | "
+                f"{len(self._entries)} 条 {self._total_bytes / 1024 / 1024:.1f}/{self.max_bytes / 1024 / 1024:.0f} MB")
+
+    async def close(self):
+        if self._save_task and not self._save_task.done():
+            self._save_now.set()
+            await self._save_task
+        await self.backend.close()
+
+    async def warmup(self):
+        # 绕过缓存，确保请求真正到达后端
+        await self.backend.warmup()
+
+    def cache_params(self) -> dict:
+        return self.backend.cache_params()
+
+    def _key(self, text: str) -> str:
+        params = json.dumps(
+            {"backend": type(self.backend).__name__, "params": self.backend.cache_params(), "text": text},
+            ensure_ascii=False, sort_keys=True,
+        )
+        return hashlib.sha256(params.encode("utf-8")).hexdigest()
+
+    def __load_index(self):
+        index_path = self.path / self.INDEX_FILE
+        if not index_path.is_file():
+            return
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"TTS 缓存索引损坏，已重建: {e}")
+            return
+
+        for key, item in sorted(index.items(), key=lambda kv: kv[1]["last_used"]):
+            entry = CacheEntry(**item)
+            if not (self.path / entry.file).is_file():
+                continue
+            self._entries[key] = entry
+            self._total_bytes += entry.size
+        logger.info(f"已加载 TTS 缓存: {self.summary()}")
+
+    def __write_index(self, index: Dict[str, dict]):
+        """
+        写入索引文件（在线程池中调用）
+        """
+        index_path = self.path / self.INDEX_FILE
+        temp_path = index_path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(temp_path, index_path)
+
+    async def __flush_index(self):
+        """
+        在线程池中保存索引（索引快照在事件循环中取得，写入期间的变更留到下一次保存）
+        """
+        try:
+            await self._run_blocking(self.__write_index, {key: vars(entry).copy() for key, entry in self._entries.items()})
+        except OSError as e:
+            logger.warning(f"无法保存 TTS 缓存索引: {e}")
+
+    async def __save_later(self):
+        while self._dirty:
+            try:
+                await asyncio.wait_for(self._save_now.wait(), self.INDEX_SAVE_DELAY)
+            except asyncio.TimeoutError:
+                pass
+            self._dirty = False
+            await self.__flush_index()
+
+    def __mark_dirty(self):
+        """
+        索引发生变更，延迟一段时间后保存
+        """
+        self._dirty = True
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.create_task(self.__save_later())
+
+    @staticmethod
+    def __remove_files(paths: List[Path]):
+        """
+        删除被淘汰的缓存文件（在线程池中调用）
+        """
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def __save_clip(clip: AudioClip, path: Path) -> int:
+        """
+        写入缓存文件，返回文件大小（在线程池中调用）
+
+        先写入临时文件再替换，同一句被并发写入时读取方不会读到写了一半的文件
+        """
+        temp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            clip.save(str(temp_path))
+            size = os.stat(temp_path).st_size
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        return size
+
+    @classmethod
+    def __save_fallback(cls, clip: AudioClip) -> str:
+        """
+        将音频保存到临时目录（在线程池中调用）
+        """
+        cls.FALLBACK_PATH.mkdir(parents=True, exist_ok=True)
+        output_file = str(cls.FALLBACK_PATH / f"{time.time_ns()}.wav")
+        clip.save(output_file)
+        return output_file
+
+    async def __evict(self):
+        """
+        按最近最少使用淘汰缓存，直到总大小不超过预算
+
+        最近使用过的文件受保护，但总大小超过上限时同样会被淘汰
+        """
+        protect_after = time.time() - self.EVICT_GRACE
+        evicted: List[Path] = []
+        while self._total_bytes > self.max_bytes and self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.last_used > protect_after and self._total_bytes <= self.hard_limit:
+                break
+            del self._entries[key]
+            self._total_bytes -= entry.size
+            evicted.append(self.path / entry.file)
+        if evicted:
+            await self._run_blocking(self.__remove_files, evicted)
+
+    def __lookup(self, key: str, text: str) -> Optional[Path]:
+        """
+        查找缓存文件，命中时更新使用记录
+
+        不检查文件是否存在（避免在事件循环中访问磁盘），文件丢失时由调用方通过 `__forget` 移除
+        """
+        entry = self._entries.get(key)
+        if not entry:
+            return None
+
+        self.hits += 1
+        entry.last_used = time.time()
+        self._entries.move_to_end(key)
+        self.__mark_dirty()
+        logger.debug(f"TTS 缓存命中: {text} ({self.summary()})")
+        return self.path / entry.file
+
+    def __forget(self, key: str):
+        """
+        移除文件已丢失的缓存项，本次查找按未命中处理
+        """
+        if key in self._entries:
+            self._total_bytes -= self._entries.pop(key).size
+            self.hits -= 1
+            self.__mark_dirty()
+
+    async def __store(self, key: str, clip: AudioClip) -> Optional[Path]:
+        """
+        将音频写入缓存，写入失败时返回 None
+        """
+        file_name = key + ".wav"
+        try:
+            size = await self._run_blocking(self.__save_clip, clip, self.path / file_name)
+        except OSError as e:
+            logger.warning(f"无法写入 TTS 缓存: {e}")
+            return None
+
+        if key in self._entries:
+            # 同一句被流式与非流式请求同时生成时，文件已被替换为后写入的版本
+            self._total_bytes -= self._entries.pop(key).size
+        self._entries[key] = CacheEntry(file_name, size, time.time())
+        self._total_bytes += size
+        await self.__evict()
+        self.__mark_dirty()
+        return self.path / file_name
+
+    async def __read(self, key: str, path: Path) -> Optional[AudioClip]:
+        """
+        读取命中的缓存文件，文件已丢失或损坏时返回 None
+        """
+        try:
+            return await self._run_blocking(AudioClip.from_wav, str(path))
+        except (OSError, EOFError, wave.Error) as e:
+            logger.warning(f"TTS 缓存文件不可用，重新生成: {e}")
+            self.__forget(key)
+            return None
+
+    async def __miss(self, key: str, text: str) -> Tuple[Optional[AudioClip], Optional[Path]]:
+        """
+        由后端生成音频并写入缓存
+
+        :return: (音频, 缓存文件)，生成失败时音频为 None，写入失败时缓存文件为 None
+        """
+        clip = await self.backend.synthesize(text)
+        if clip is None:
+            return None, None
+        return clip, await self.__store(key, clip)
+
+    async def __shared_miss(self, key: str, text: str) -> Tuple[Optional[AudioClip], Optional[Path]]:
+        """
+        同一句的并发未命中只生成一次，所有请求共享结果；所有请求都被取消时才取消生成
+        """
+        self.misses += 1
+        future = self._inflight.get(key)
+        if future is None:
+            future = self._inflight[key] = asyncio.ensure_future(self.__miss(key, text))
+            future.add_done_callback(lambda done: self._inflight.get(key) is done and self._inflight.pop(key))
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(future)
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+                future.cancel()
+
+    async def synthesize(self, text: str) -> Optional[AudioClip]:
+        key = self._key(text)
+        cached = self.__lookup(key, text)
+        if cached:
+            clip = await self.__read(key, cached)
+            if clip:
+                return clip
+
+        clip, _ = await self.__shared_miss(key, text)
+        return clip
+
+    async def synthesize_stream(self, text: str) -> AsyncGenerator[AudioClip, None]:
+        key = self._key(text)
+        cached = self.__lookup(key, text)
+        if cached:
+            clip = await self.__read(key, cached)
+            if clip:
+                yield clip
+                return
+
+        if key in self._inflight:
+            clip, _ = await self.__shared_miss(key, text)
+            if clip:
+                yield clip
+            return
+
+        self.misses += 1
+        clips = []
+        async for clip in self.backend.synthesize_stream(text):
+            clips.append(clip)
+            yield clip
+        # 只缓存完整生成的音频（提前停止消费时不会执行到这里）
+        if clips:
+            await self.__store(key, AudioClip(*clips[0].params, memoryview(b''.join(clip.pcm for clip in clips))))
+
+    async def generate_tts(self, text: str) -> Optional[str]:
+        key = self._key(text)
+        cached = self.__lookup(key, text)
+        if cached:
+            if await self._run_blocking(cached.is_file):
+                return str(cached)
+            self.__forget(key)
+
+        clip, cached = await self.__shared_miss(key, text)
+        if clip is None:
+            return None
+        if cached:
+            return str(cached)
+        # 写入缓存失败时仍使用已生成的音频，不再重新生成
+        try:
+            return await self._run_blocking(self.__save_fallback, clip)
+        except OSError as e:
+            logger.warning(f"无法保存 TTS 语音文件: {e}")
+            return None
@@ -1,40 +1,86 @@
 from ._base import BaseTTS
+from .player import AudioClip
+from infra.circuit_breaker import CircuitBreaker, tcp_probe
 from pathlib import Path
 from typing import Optional
-from pydub import AudioSegment
+import subprocess
 import time
 import edge_tts
 import logging
-import os
 
 logger = logging.getLogger("Muice.tts")
 
 class EdgeTTS(BaseTTS):
+    CHANNELS = 1
+    SAMPLE_WIDTH = 2
+    RATE = 24000
+    """Edge TTS 默认输出 24kHz 单声道 MP3，按此参数解码为 16bit PCM"""
+
     def __init__(self, config:dict) -> None:
+        super().__init__()
         self.__VOICE = "zh-CN-XiaoyiNeural"
         self.__OUTPUT_PATH = Path("./temp/tts")
         self.text = None
         self.result = True
+        self.proxy: Optional[str] = config.get('proxy', 'http://127.0.0.1:7890')
+        """优先使用的代理，为空时直连"""
+        self.proxy_breaker = CircuitBreaker(f"EdgeTTS 代理 {self.proxy}", probe=tcp_probe(self.proxy)) if self.proxy else None
+        """代理不可用时熔断，直接走直连"""
 
         self.__OUTPUT_PATH.mkdir(exist_ok=True)
 
-    async def generate_tts(self, text:str, proxy:str|None = 'http://127.0.0.1:7890') -> Optional[str]:
-        output_file = str(self.__OUTPUT_PATH / f"{time.time_ns()}.mp3")
+    def cache_params(self) -> dict:
+        return {"voice": self.__VOICE}
+
+    def __decode(self, mp3: bytes) -> Optional[AudioClip]:
+        """
+        通过管道将 MP3 交给 ffmpeg 解码为 PCM，不经过磁盘（在 tts-io 线程池中调用）
+        """
+        process = subprocess.run(
+            ["ffmpeg", "-loglevel", "error", "-f", "mp3", "-i", "pipe:0",
+             "-f", "s16le", "-ac", str(self.CHANNELS), "-ar", str(self.RATE), "pipe:1"],
+            input=mp3, capture_output=True,
+        )
+        if process.returncode != 0 or not process.stdout:
+            logger.warning(f"解码TTS语音时出现了问题: {process.stderr.decode(errors='ignore').strip()}")
+            return None
+        return AudioClip(self.CHANNELS, self.SAMPLE_WIDTH, self.RATE, memoryview(process.stdout))
+
+    async def __stream(self, text:str, proxy:Optional[str]) -> bytes:
+        mp3 = bytearray()
+        communicate = edge_tts.Communicate(text, self.__VOICE, proxy = proxy)
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                mp3 += chunk["data"]
+        return bytes(mp3)
 
-        try:
-            communicate = edge_tts.Communicate(text, self.__VOICE, proxy = proxy)
-            await communicate.save(output_file)
-        except Exception as e:
-            if proxy:
-                return await self.generate_tts(text, proxy = None)
-            logger.warning(f"尝试生成TTS语音文件时出现了问题: {e}")
+    async def synthesize(self, text:str) -> Optional[AudioClip]:
+        mp3 = b""
+        if self.proxy_breaker and self.proxy_breaker.available:
+            try:
+                mp3 = await self.__stream(text, self.proxy)
+                self.proxy_breaker.record_success()
+            except Exception as e:
+                self.proxy_breaker.record_failure(e)
+
+        if not mp3:
+            try:
+                mp3 = await self.__stream(text, None)
+            except Exception as e:
+                logger.warning(f"尝试生成TTS语音时出现了问题: {e}")
+                return None
+
+        if not mp3:
+            logger.warning("生成的TTS语音为空")
             return None
 
-        if os.stat(output_file).st_size == 0:
-            logger.warning("生成的TTS语音文件为空")
+        return await self._run_blocking(self.__decode, mp3)
+
+    async def generate_tts(self, text:str) -> Optional[str]:
+        clip = await self.synthesize(text)
+        if clip is None:
             return None
-        
-        sound = AudioSegment.from_mp3(output_file)
-        sound.export(output_file.replace(".mp3", ".wav"), format="wav")
-        
-        return output_file.replace(".mp3", ".wav")
\ No newline at end of file
+
+        output_file = str(self.__OUTPUT_PATH / f"{time.time_ns()}.wav")
+        await self._run_blocking(clip.save, output_file)
+        return output_file
@@ -1,14 +1,28 @@
-import requests
 from ._base import BaseTTS
+from .player import AudioClip
+from pathlib import Path
+from typing import AsyncGenerator, Optional
+import aiohttp
+import logging
+import struct
+import time
 # from utils.utils import filter_parentheses
 
+logger = logging.getLogger("Muice.tts")
+
 class GPTSoVITS(BaseTTS):
+    WAV_HEADER_SIZE = 44
+    """流式模式下服务器先发送的 WAV 头长度"""
+    STREAM_CHUNK_SECONDS = 0.2
+    """流式模式下每次交给播放器的最短音频时长（秒），避免过碎的写入"""
+
     def __init__(self, config: dict):
         """
         初始化 TTS 类，配置服务器地址、端口和配置文件路径。
         
         :param config: 配置字典
         """
+        super().__init__()
         self.host = config.get('host', '127.0.0.1')
         self.port = config.get('port', 9880)
         self.config_path = config.get('config_path', 'GPT_SoVITS/configs/tts_infer.yaml')
@@ -30,18 +44,60 @@ class GPTSoVITS(BaseTTS):
         self.parallel_infer = config.get('parallel_infer', False)
         self.repetition_penalty = config.get('repetition_penalty', 1.35)
 
-    
-    def generate_tts(self, text, text_lang='zh', ref_audio_path=None, prompt_text="", prompt_lang="zh"):
+        self.max_connections = config.get('max_connections', 4)
+        """连接池大小"""
+        self.timeout = config.get('timeout', 60)
+        """单次合成的超时时间（秒）"""
+        self.__OUTPUT_PATH = Path("./temp/tts")
+        self.__OUTPUT_PATH.mkdir(parents=True, exist_ok=True)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def cache_params(self) -> dict:
+        return {
+            "ref_audio_path": self.ref_audio_path,
+            "prompt_text": self.prompt_text,
+            "prompt_lang": self.prompt_lang,
+            "text_split_method": self.text_split_method,
+            "media_type": self.media_type,
+            "top_k": self.top_k,
+            "top_p": self.top_p,
+            "temperature": self.temperature,
+            "speed_factor": self.speed_factor,
+            "seed": self.seed,
+            "repetition_penalty": self.repetition_penalty,
+        }
+
+    def _get_session(self) -> aiohttp.ClientSession:
         """
-        进行 TTS 推理请求，生成音频流。
+        获取复用的 HTTP 会话（须在事件循环中调用，连接保持长连接）
+        """
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
 
-        :param text: 输入的文本内容
-        :param text_lang: 文本的语言，例如 "zh"
-        :param ref_audio_path: 参考音频文件路径
-        :param prompt_text: 提示文本，默认为空
-        :param prompt_lang: 提示文本语言，默认为 "zh"
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
 
-        :return: 返回生成的音频流（wav 格式）
+    async def health_check(self) -> bool:
+        """
+        服务器能够响应 HTTP 请求即视为可用（api_v2 没有专门的健康检查接口）
+        """
+        try:
+            async with self._get_session().get(self.base_url, timeout=aiohttp.ClientTimeout(total=3)):
+                return True
+        except Exception:
+            return False
+
+    async def __post(self, text: str, text_lang='zh', ref_audio_path=None, prompt_text="", prompt_lang="zh") -> AsyncGenerator[bytes, None]:
+        """
+        进行 TTS 推理请求，按到达顺序产出服务器输出的音频数据
+
+        :raise RuntimeError: 服务器返回错误
         """
         url = f'{self.base_url}/tts'
 
@@ -71,78 +127,170 @@ class GPTSoVITS(BaseTTS):
             "parallel_infer": self.parallel_infer,
             "repetition_penalty": self.repetition_penalty
         }
-        
+
+        async with self._get_session().post(url, json=payload) as response:
+            if response.status != 200:
+                raise RuntimeError(f"GPT-SoVITS 请求失败: {response.status}, 错误信息: {await response.text()}")
+            # 流式模式下服务器分块返回音频
+            async for chunk in response.content.iter_any():
+                yield chunk
+
+    async def __request(self, text: str, text_lang='zh', ref_audio_path=None, prompt_text="", prompt_lang="zh") -> Optional[bytes]:
+        """
+        进行 TTS 推理请求，返回服务器输出的完整音频数据，失败时返回 None
+        """
+        data = bytearray()
+        try:
+            async for chunk in self.__post(text, text_lang, ref_audio_path, prompt_text, prompt_lang):
+                data += chunk
+        except Exception as e:
+            logger.warning(f"GPT-SoVITS 请求过程中出现异常: {e}")
+            return None
+        return bytes(data)
+
+    def __parse_header(self, header: bytes) -> AudioClip:
+        """
+        解析流式模式下的 WAV 头，返回不含音频数据的片段（仅音频参数）
+
+        流式模式下 WAV 头在音频生成前发送，其中的长度字段无效，其后的数据均为 PCM
+        """
+        if header[:4] != b'RIFF':
+            raise ValueError("缺少 WAV 头")
+        channels, rate = struct.unpack_from('<HI', header, 22)
+        bits = struct.unpack_from('<H', header, 34)[0]
+        return AudioClip(channels, bits // 8, rate, memoryview(b''))
+
+    async def synthesize_stream(self, text: str) -> AsyncGenerator[AudioClip, None]:
+        """
+        流式模式下边接收边产出音频，首块到达即可开始播放，不必等待整句合成完毕
+
+        :raise Exception: 已产出片段后连接中断或出错（已产出的音频不完整，调用方不应将其视为整句）
+        """
+        if self.media_type != 'wav' or not self.streaming_mode:
+            async for clip in super().synthesize_stream(text):
+                yield clip
+            return
+
+        header = bytearray()
+        params: Optional[AudioClip] = None
+        min_size = 0
+        pending = bytearray()
+        """已收到但尚未产出的 PCM 数据"""
+        yielded = False
         try:
-            # 发起POST请求进行推理
-            response = requests.post(url, json=payload)
-            if response.status_code == 200:
-                audio_data = response.content  # 返回音频流
-                self.__save_wav(audio_data)  # Save the audio to a WAV file
-                return audio_data
-            else:
-                print(f"请求失败: {response.status_code}, 错误信息: {response.json()}")
+            async for chunk in self.__post(text):
+                if params is None:
+                    header += chunk
+                    if len(header) < self.WAV_HEADER_SIZE:
+                        continue
+                    params = self.__parse_header(bytes(header))
+                    min_size = max(int(params.rate * self.STREAM_CHUNK_SECONDS), 1) * params.frame_size
+                    chunk = header[self.WAV_HEADER_SIZE:]
+                pending += chunk
+                if len(pending) < min_size:
+                    continue
+                # 按帧对齐切分，不完整的帧留到下一块
+                usable = len(pending) - len(pending) % params.frame_size
+                yield AudioClip(*params.params, memoryview(bytes(pending[:usable])))
+                yielded = True
+                del pending[:usable]
+        except Exception as e:
+            logger.warning(f"GPT-SoVITS 流式请求过程中出现异常: {e}")
+            if yielded:
+                raise
+            return
+
+        usable = len(pending) - len(pending) % params.frame_size if params else 0
+        if usable:
+            yield AudioClip(*params.params, memoryview(bytes(pending[:usable])))  # type:ignore
+
+    async def synthesize(self, text: str) -> Optional[AudioClip]:
+        if self.media_type != 'wav':
+            return await super().synthesize(text)
+
+        if self.streaming_mode:
+            try:
+                clips = [clip async for clip in self.synthesize_stream(text)]
+            except Exception:
+                # 中途中断的音频不完整，不作为生成结果
+                return None
+            if not clips:
                 return None
+            return AudioClip(*clips[0].params, memoryview(b''.join(clip.pcm for clip in clips)))
+
+        data = await self.__request(text)
+        if data is None:
+            return None
+        try:
+            return AudioClip.from_wav(data)
         except Exception as e:
-            print(f"请求过程中出现异常: {e}")
+            logger.warning(f"GPT-SoVITS 返回的音频无法解析: {e}")
             return None
-    
-    def control_server(self, command):
+
+    async def generate_tts(self, text: str, text_lang='zh', ref_audio_path=None, prompt_text="", prompt_lang="zh") -> Optional[str]:
         """
-        向控制接口发送命令，重新启动或退出服务器。
+        进行 TTS 推理请求，生成语音文件。
 
-        :param command: 控制命令，可选 'restart' 或 'exit'
-        :return: 无返回值，成功或失败取决于服务器响应
+        :param text: 输入的文本内容
+        :param text_lang: 文本的语言，例如 "zh"
+        :param ref_audio_path: 参考音频文件路径
+        :param prompt_text: 提示文本，默认为空
+        :param prompt_lang: 提示文本语言，默认为 "zh"
+
+        :return: 生成的语音文件路径，失败时返回 None
         """
-        url = f'{self.base_url}/control'
-        payload = {"command": command}
-        
+        data = await self.__request(text, text_lang, ref_audio_path, prompt_text, prompt_lang)
+        if data is None:
+            return None
+
+        output_file = self.__OUTPUT_PATH / f"{time.time_ns()}.{self.media_type}"
+        if self.media_type == 'wav' and self.streaming_mode:
+            # 流式模式下 WAV 头中的长度字段无效，按实际长度重新写入
+            try:
+                clip = self.__parse_header(data[:self.WAV_HEADER_SIZE])
+            except Exception as e:
+                logger.warning(f"GPT-SoVITS 返回的音频无法解析: {e}")
+                return None
+            usable = len(data) - self.WAV_HEADER_SIZE
+            clip.pcm = memoryview(data)[self.WAV_HEADER_SIZE:self.WAV_HEADER_SIZE + usable - usable % clip.frame_size]
+            await self._run_blocking(clip.save, str(output_file))
+        else:
+            await self._run_blocking(output_file.write_bytes, data)
+        return str(output_file)
+
+    async def __get(self, path: str, params: dict) -> bool:
         try:
-            response = requests.post(url, json=payload)
-            if response.status_code == 200:
-                print("命令执行成功")
-            else:
-                print(f"命令执行失败: {response.status_code}, 错误信息: {response.json()}")
+            async with self._get_session().get(f'{self.base_url}/{path}', params=params) as response:
+                if response.status == 200:
+                    return True
+                logger.warning(f"GPT-SoVITS 请求 {path} 失败: {response.status}, 错误信息: {await response.text()}")
         except Exception as e:
-            print(f"控制命令请求过程中出现异常: {e}")
+            logger.warning(f"GPT-SoVITS 请求 {path} 过程中出现异常: {e}")
+        return False
+
+    async def control_server(self, command) -> bool:
+        """
+        向控制接口发送命令，重新启动或退出服务器。
+
+        :param command: 控制命令，可选 'restart' 或 'exit'
+        :return: 是否执行成功
+        """
+        return await self.__get('control', {"command": command})
     
-    def set_gpt_weights(self, weights_path):
+    async def set_gpt_weights(self, weights_path) -> bool:
         """
         切换GPT模型的权重。
 
         :param weights_path: 权重文件路径
-        :return: 无返回值，成功或失败取决于服务器响应
+        :return: 是否切换成功
         """
-        url = f'{self.base_url}/set_gpt_weights'
-        params = {"weights_path": weights_path}
-        
-        try:
-            response = requests.get(url, params=params)
-            if response.status_code == 200:
-                print("GPT模型权重切换成功")
-            else:
-                print(f"切换失败: {response.status_code}, 错误信息: {response.json()}")
-        except Exception as e:
-            print(f"切换GPT模型过程中出现异常: {e}")
+        return await self.__get('set_gpt_weights', {"weights_path": weights_path})
     
-    def set_sovits_weights(self, weights_path):
+    async def set_sovits_weights(self, weights_path) -> bool:
         """
         切换SoVits模型的权重。
 
         :param weights_path: 权重文件路径
-        :return: 无返回值，成功或失败取决于服务器响应
+        :return: 是否切换成功
         """
-        url = f'{self.base_url}/set_sovits_weights'
-        params = {"weights_path": weights_path}
-        
-        try:
-            response = requests.get(url, params=params)
-            if response.status_code == 200:
-                print("SoVits模型权重切换成功")
-            else:
-                print(f"切换失败: {response.status_code}, 错误信息: {response.json()}")
-        except Exception as e:
-            print(f"切换SoVits模型过程中出现异常: {e}")
-
-    def __save_wav(self, audio_data, file_path="./temp/tts_output.wav"):
-        with open(file_path, 'wb') as f:
-            f.write(audio_data)
\ No newline at end of file
+        return await self.__get('set_sovits_weights', {"weights_path": weights_path})
@@ -0,0 +1,338 @@
+from array import array
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Optional, Tuple, Union
+from infra.runtime import run_blocking
+import asyncio
+import io
+import logging
+import threading
+import wave
+
+logger = logging.getLogger("Muice.player")
+
+SILENCE_THRESHOLD = 0.02
+"""判定为静音（句间停顿）的峰值幅度比例"""
+
+
+def is_silent(data: bytes, sample_width: int, threshold: float = SILENCE_THRESHOLD) -> bool:
+    """
+    判断一段 PCM 数据是否近似静音（仅支持 16bit，其余位深视为静音以便立即停止）
+    """
+    if sample_width != 2:
+        return True
+    usable = len(data) - len(data) % 2
+    peak = max(map(abs, memoryview(data)[:usable].cast('h')), default=0)
+    return peak < threshold * 32768
+
+
+@dataclass
+class AudioClip:
+    """内存中的 PCM 音频"""
+    channels: int
+    sample_width: int
+    rate: int
+    pcm: memoryview
+
+    @property
+    def params(self) -> Tuple[int, int, int]:
+        return self.channels, self.sample_width, self.rate
+
+    @property
+    def frame_size(self) -> int:
+        return self.channels * self.sample_width
+
+    @property
+    def duration(self) -> float:
+        return len(self.pcm) / self.frame_size / self.rate
+
+    @classmethod
+    def from_wav(cls, source: Union[str, bytes, bytearray, memoryview]) -> "AudioClip":
+        """
+        从 WAV 文件路径或内存中的 WAV 数据读取
+        """
+        handle = source if isinstance(source, str) else io.BytesIO(source)
+        with wave.open(handle, 'rb') as wf:
+            return cls(wf.getnchannels(), wf.getsampwidth(), wf.getframerate(), memoryview(wf.readframes(wf.getnframes())))
+
+    def save(self, path: str):
+        """
+        写入 WAV 文件
+        """
+        with wave.open(path, 'wb') as wf:
+            wf.setnchannels(self.channels)
+            wf.setsampwidth(self.sample_width)
+            wf.setframerate(self.rate)
+            wf.writeframes(self.pcm)
+
+
+AudioSource = Union[str, bytes, bytearray, memoryview, AudioClip]
+"""可播放的音频：WAV 文件路径、内存中的 WAV 数据或 `AudioClip`"""
+
+
+class _RingBuffer:
+    """
+    定长环形缓冲区（非线程安全，由 `AudioPlayer` 加锁访问）
+    """
+    def __init__(self, capacity: int) -> None:
+        self._data = bytearray(capacity)
+        self._view = memoryview(self._data)
+        self._read = 0
+        self.size = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self._data)
+
+    @property
+    def free(self) -> int:
+        return self.capacity - self.size
+
+    def write(self, data: memoryview) -> int:
+        """
+        写入尽可能多的数据，返回写入的字节数
+        """
+        length = min(len(data), self.free)
+        start = (self._read + self.size) % self.capacity
+        first = min(length, self.capacity - start)
+        self._view[start:start + first] = data[:first]
+        self._view[:length - first] = data[first:length]
+        self.size += length
+        return length
+
+    def read(self, length: int) -> bytes:
+        """
+        读出至多 `length` 字节
+        """
+        length = min(length, self.size)
+        first = min(length, self.capacity - self._read)
+        data = bytes(self._view[self._read:self._read + first]) + bytes(self._view[:length - first])
+        self._read = (self._read + length) % self.capacity
+        self.size -= length
+        return data
+
+    def clear(self):
+        self._read = 0
+        self.size = 0
+
+
+class AudioPlayer:
+    """
+    常驻的音频输出引擎
+
+    整个进程只打开一次输出设备，以回调模式从环形缓冲区读取 PCM 数据，
+    连续写入的音频片段之间没有设备开关的开销与间隙。缓冲区为空时输出静音
+    """
+    _instance: Optional["AudioPlayer"] = None
+
+    BUFFER_SECONDS = 5
+    """环形缓冲区可容纳的音频时长（秒）"""
+    BLOCK_SECONDS = 0.02
+    """每次回调输出的音频时长（秒）"""
+    FADE_SECONDS = 0.03
+    """取消播放时的淡出时长（秒）"""
+
+    def __init__(self, device_index: Optional[int] = None) -> None:
+        self.device_index = device_index
+        """输出设备序号，为 None 时使用系统默认设备"""
+        self._pa = None
+        self._stream = None
+        self._params: Optional[Tuple[int, int, int]] = None
+        """当前输出流的 (声道数, 位深字节数, 采样率)"""
+        self._buffer: Optional[_RingBuffer] = None
+        self._cond = threading.Condition()
+        """保护缓冲区与播放进度，写入方在缓冲区满时在此等待"""
+        self._written = 0
+        """累计写入的字节数"""
+        self._played = 0
+        """累计输出的字节数"""
+        self._pending: Deque[Tuple[int, asyncio.Future]] = deque()
+        """尚未播放完的片段：(结束位置, 完成时置位的 Future)"""
+        self._generation = 0
+        """每次取消时递增，使正在写入的片段停止写入"""
+        self._fade_remaining: Optional[int] = None
+        """淡出剩余的字节数，为 None 时表示没有在淡出"""
+        self._interrupt_at: Optional[int] = None
+        """请求在停顿处中断时，最晚的中断位置"""
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._write_lock = asyncio.Lock()
+
+    @classmethod
+    def init(cls, device_index: Optional[int] = None):
+        if cls._instance is None:
+            cls._instance = cls(device_index)
+
+    @classmethod
+    def get(cls) -> "AudioPlayer":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @property
+    def is_active(self) -> bool:
+        """是否有尚未播放完的音频"""
+        return bool(self._pending)
+
+    def _resolve(self, future: asyncio.Future, completed: bool):
+        if self._loop and not future.done():
+            self._loop.call_soon_threadsafe(lambda: future.done() or future.set_result(completed))
+
+    def _open(self, params: Tuple[int, int, int]):
+        """
+        按音频参数打开输出流，参数变化时等待缓冲区播放完再重新打开（在 audio 线程池中调用）
+        """
+        if params == self._params:
+            return
+
+        import pyaudio
+        with self._cond:
+            while self._buffer and self._buffer.size:
+                self._cond.wait(0.1)
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+        if self._pa is None:
+            self._pa = pyaudio.PyAudio()
+
+        channels, sample_width, rate = params
+        with self._cond:
+            self._buffer = _RingBuffer(int(rate * self.BUFFER_SECONDS) * channels * sample_width)
+            self._params = params
+        self._stream = self._pa.open(
+            format=self._pa.get_format_from_width(sample_width),
+            channels=channels,
+            rate=rate,
+            output=True,
+            output_device_index=self.device_index,
+            frames_per_buffer=int(rate * self.BLOCK_SECONDS),
+            stream_callback=self._callback,
+        )
+        logger.info(f"音频输出设备已打开: 设备={self.device_index}, 参数={params}")
+
+    def _apply_fade(self, data: bytes, sample_width: int) -> bytes:
+        total = int(self.FADE_SECONDS * self._params[2]) * self._params[0] * sample_width  # type:ignore
+        if sample_width != 2 or total <= 0:
+            return b""
+        samples = array('h', data[:len(data) - len(data) % 2])
+        offset = (total - self._fade_remaining) // 2  # type:ignore
+        for i in range(len(samples)):
+            samples[i] = int(samples[i] * max(0.0, 1 - (offset + i) * 2 / total))
+        return samples.tobytes()
+
+    def _cancel_locked(self):
+        """
+        丢弃缓冲区中的音频，未播放完的片段均以「未完整播放」结束（须持有锁）
+        """
+        self._generation += 1
+        self._buffer.clear()  # type:ignore
+        self._written = self._played
+        self._fade_remaining = None
+        self._interrupt_at = None
+        while self._pending:
+            self._resolve(self._pending.popleft()[1], False)
+        self._cond.notify_all()
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        import pyaudio
+        channels, sample_width, _ = self._params  # type:ignore
+        length = frame_count * channels * sample_width
+        with self._cond:
+            data = self._buffer.read(length)  # type:ignore
+
+            if self._interrupt_at is not None and data and (
+                self._played >= self._interrupt_at or is_silent(data, sample_width)
+            ):
+                # 已到句间停顿或超过等待时间，从这一块开始淡出
+                self._interrupt_at = None
+                self._fade_remaining = int(self.FADE_SECONDS * self._params[2]) * channels * sample_width  # type:ignore
+
+            if self._fade_remaining is not None:
+                data = self._apply_fade(data[:self._fade_remaining], sample_width)
+                self._fade_remaining -= length
+                if self._fade_remaining <= 0 or not data:
+                    self._cancel_locked()
+            else:
+                self._played += len(data)
+                while self._pending and self._pending[0][0] <= self._played:
+                    self._resolve(self._pending.popleft()[1], True)
+
+            self._cond.notify_all()
+        return data + b"\0" * (length - len(data)), pyaudio.paContinue
+
+    def _write(self, clip: AudioClip, future: asyncio.Future):
+        """
+        将片段写入缓冲区，缓冲区满时等待（在 audio 线程池中调用）
+        """
+        self._open(clip.params)
+        with self._cond:
+            generation = self._generation
+            self._written += len(clip.pcm)
+            self._pending.append((self._written, future))
+
+        data = clip.pcm
+        while data:
+            with self._cond:
+                if generation != self._generation:
+                    return
+                written = self._buffer.write(data)  # type:ignore
+                if not written:
+                    self._cond.wait(0.1)
+            data = data[written:]
+
+    async def enqueue(self, source: AudioSource) -> asyncio.Future:
+        """
+        将音频追加到播放缓冲区，在其前一段播放结束后无缝播放
+
+        返回时片段已全部写入缓冲区（过长的片段会等待缓冲区腾出空间）
+
+        :return: 该片段播放结束时完成的 Future，值为是否完整播放（被取消或中断时为 False）
+        """
+        self._loop = asyncio.get_running_loop()
+        clip = source if isinstance(source, AudioClip) else await run_blocking('tts-io', AudioClip.from_wav, source)
+        future = self._loop.create_future()
+        if not len(clip.pcm):
+            future.set_result(True)
+            return future
+
+        async with self._write_lock:
+            await run_blocking('audio', self._write, clip, future)
+        return future
+
+    async def play(self, source: AudioSource) -> bool:
+        """
+        播放音频直到结束
+
+        :return: 是否完整播放
+        """
+        return await (await self.enqueue(source))
+
+    def cancel(self):
+        """
+        淡出并丢弃所有尚未播放的音频（可跨线程调用）
+        """
+        with self._cond:
+            if self._pending and self._fade_remaining is None and self._params:
+                channels, sample_width, rate = self._params
+                self._fade_remaining = int(self.FADE_SECONDS * rate) * channels * sample_width
+
+    def interrupt(self, grace: float):
+        """
+        在下一个句间停顿处（最多再播放 `grace` 秒）淡出并丢弃所有尚未播放的音频
+        """
+        with self._cond:
+            if self._pending and self._interrupt_at is None and self._params:
+                channels, sample_width, rate = self._params
+                self._interrupt_at = self._played + int(grace * rate) * channels * sample_width
+
+    def close(self):
+        with self._cond:
+            if self._buffer:
+                self._cancel_locked()
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+            self._stream = None
+        if self._pa is not None:
+            self._pa.terminate()
+            self._pa = None
+        self._params = None
@@ -0,0 +1,206 @@
+from ._base import BaseTTS
+from .player import AudioClip
+from collections import deque
+from infra.circuit_breaker import CircuitBreaker
+from typing import AsyncGenerator, Deque, List, Optional, Tuple
+import asyncio
+import logging
+import statistics
+import time
+
+logger = logging.getLogger("Muice.tts")
+
+
+class PoolNode:
+    """后端池中的一个节点"""
+    WINDOW = 50
+    """统计延迟的最近请求数"""
+
+    def __init__(self, name: str, backend: BaseTTS) -> None:
+        self.name = name
+        self.backend = backend
+        self.breaker = CircuitBreaker(f"TTS 节点 {name}", failure_threshold=2, probe=backend.health_check)
+        """失败或明显变慢时将节点移出池，健康检查通过后重新加入"""
+        self.outstanding = 0
+        """正在进行的请求数"""
+        self.requests = 0
+        self.failures = 0
+        self.latencies: Deque[float] = deque(maxlen=self.WINDOW)
+        """最近成功请求的耗时（秒）"""
+
+    @property
+    def p50(self) -> Optional[float]:
+        return statistics.median(self.latencies) if self.latencies else None
+
+    @property
+    def p95(self) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+
+    def summary(self) -> str:
+        latency = f"p50 {self.p50 * 1000:.0f}ms p95 {self.p95 * 1000:.0f}ms" if self.latencies else "暂无数据"  # type:ignore
+        return (f"{self.breaker.summary()} | 进行中 {self.outstanding} | {latency} | "
+                f"失败 {self.failures}/{self.requests}")
+
+
+class TTSPool(BaseTTS):
+    """
+    TTS 后端池
+
+    将请求路由到进行中请求最少的可用节点（相同时选延迟较低者），失败时换一个节点重试一次。
+    连续失败或明显慢于其他节点的节点会被熔断移出，后台健康检查通过后重新加入
+    """
+    SLOW_FACTOR = 3.0
+    """p50 延迟超过最快节点的多少倍时视为过慢"""
+    MIN_SAMPLES = 5
+    """判断节点是否过慢所需的最少样本数"""
+    HEALTH_INTERVAL = 30
+    """空闲节点的健康检查间隔（秒）"""
+
+    def __init__(self, nodes: List[Tuple[str, BaseTTS]]) -> None:
+        super().__init__()
+        if not nodes:
+            raise ValueError("TTS 后端池至少需要一个节点")
+        self.nodes = [PoolNode(name, backend) for name, backend in nodes]
+        self._health_task: Optional[asyncio.Task] = None
+
+    def cache_params(self) -> dict:
+        return self.nodes[0].backend.cache_params()
+
+    def summary(self) -> str:
+        return "\n".join(f"{node.name}: {node.summary()}" for node in self.nodes)
+
+    async def close(self):
+        if self._health_task:
+            self._health_task.cancel()
+        await asyncio.gather(*(node.backend.close() for node in self.nodes), return_exceptions=True)
+
+    async def warmup(self):
+        results = await asyncio.gather(*(node.backend.warmup() for node in self.nodes), return_exceptions=True)
+        for node, result in zip(self.nodes, results):
+            if isinstance(result, Exception):
+                node.breaker.record_failure(result)
+        if all(isinstance(result, Exception) for result in results):
+            raise RuntimeError("所有节点试合成均失败")
+
+    async def generate_tts(self, text: str) -> Optional[str]:
+        return await self.__route(text, lambda backend: backend.generate_tts(text))
+
+    async def synthesize(self, text: str) -> Optional[AudioClip]:
+        return await self.__route(text, lambda backend: backend.synthesize(text))
+
+    async def synthesize_stream(self, text: str) -> AsyncGenerator[AudioClip, None]:
+        """
+        流式生成只在产出首个片段之前换节点重试，节点延迟以首个片段的耗时计。
+        产出首个片段后中断时记为节点失败，并将异常抛给调用方
+        """
+        streams: List[Tuple[BaseTTS, AsyncGenerator[AudioClip, None]]] = []
+
+        async def first_clip(backend: BaseTTS) -> Optional[AudioClip]:
+            stream = backend.synthesize_stream(text)
+            streams.append((backend, stream))
+            return await stream.__anext__()
+
+        first = await self.__route(text, first_clip)
+        if first is None:
+            for _, stream in streams:
+                await stream.aclose()
+            return
+
+        backend, stream = streams[-1]
+        try:
+            yield first
+            async for clip in stream:
+                yield clip
+        except Exception as e:
+            node = next(node for node in self.nodes if node.backend is backend)
+            logger.warning(f"TTS 节点 {node.name} 流式生成中断: {e}")
+            node.failures += 1
+            node.breaker.record_failure(e)
+            raise
+        finally:
+            for _, stream in streams:
+                await stream.aclose()
+
+    def __pick(self, exclude: Optional[PoolNode] = None) -> Optional[PoolNode]:
+        """
+        选择进行中请求最少的可用节点，所有节点均不可用时仍从中选择（不让请求直接失败）
+        """
+        candidates = [node for node in self.nodes if node is not exclude]
+        available = [node for node in candidates if node.breaker.available]
+        if not candidates:
+            return None
+        return min(available or candidates, key=lambda node: (node.outstanding, node.p50 or 0.0))
+
+    async def __route(self, text: str, request):
+        if self._health_task is None:
+            from infra.runtime import Runtime
+            self._health_task = Runtime.get().spawn(self.__health_loop(), name="TTSPoolHealth") if Runtime._instance else None
+
+        node = self.__pick()
+        for attempt in range(2):
+            if node is None:
+                return None
+            result = await self.__request(node, request)
+            if result:
+                return result
+            if attempt == 0 and len(self.nodes) > 1:
+                logger.warning(f"TTS 节点 {node.name} 生成失败，换用其他节点: {text}")
+            node = self.__pick(exclude=node)
+        return None
+
+    async def __request(self, node: PoolNode, request):
+        node.outstanding += 1
+        node.requests += 1
+        start = time.monotonic()
+        try:
+            result = await request(node.backend)
+        except Exception as e:
+            logger.warning(f"TTS 节点 {node.name} 出现异常: {e}")
+            result = None
+        finally:
+            node.outstanding -= 1
+
+        if not result:
+            node.failures += 1
+            node.breaker.record_failure("生成失败")
+            return None
+
+        node.latencies.append(time.monotonic() - start)
+        self.__judge(node)
+        return result
+
+    def __judge(self, node: PoolNode):
+        """
+        请求成功后判断节点是否明显慢于其他可用节点
+        """
+        if len(node.latencies) < self.MIN_SAMPLES:
+            if node.breaker.state == CircuitBreaker.CLOSED:
+                node.breaker.record_success()
+            return
+
+        peers = [
+            other.p50 for other in self.nodes
+            if other is not node and other.breaker.available and len(other.latencies) >= self.MIN_SAMPLES
+        ]
+        fastest = min(peers, default=None)
+        if fastest is not None and node.p50 > fastest * self.SLOW_FACTOR:  # type:ignore
+            node.breaker.trip(f"p50 {node.p50 * 1000:.0f}ms，最快节点 {fastest * 1000:.0f}ms")  # type:ignore
+            # 重新加入后以新的样本重新评估
+            node.latencies.clear()
+            return
+        node.breaker.record_success()
+
+    async def __health_loop(self):
+        """
+        定期检查空闲节点，及早发现掉线的节点（已熔断的节点由熔断器自行探测）
+        """
+        while True:
+            await asyncio.sleep(self.HEALTH_INTERVAL)
+            for node in self.nodes:
+                if node.outstanding or not node.breaker.available:
+                    continue
+                if not await node.backend.health_check():
+                    node.breaker.trip("健康检查失败")
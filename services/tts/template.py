@@ -0,0 +1,113 @@
+from ._base import BaseTTS
+from .player import AudioClip, is_silent
+from string import Formatter
+from typing import Dict, List, Optional, Set, Tuple
+import asyncio
+import logging
+
+logger = logging.getLogger("Muice.tts")
+
+TEMPLATES: Set[str] = set()
+"""已注册的回复模板，启动时预先生成其中的固定片段"""
+
+AudioParams = Tuple[int, int, int]
+"""(声道数, 位深字节数, 采样率)"""
+
+
+def register_template(template: str):
+    """
+    注册回复模板（如 `"欢迎 {username} 进入到直播间喵"`）
+    """
+    TEMPLATES.add(template)
+
+
+class TemplateRenderer:
+    """
+    模板语音合成
+
+    回复模板中的固定片段只合成一次并常驻内存，每次事件只需合成变化的片段（用户名、礼物名），
+    再在内存中拼接为完整的音频
+    """
+    EDGE_SILENCE = 0.08
+    """裁剪片段首尾静音时保留的静音时长（秒）"""
+
+    def __init__(self, tts: BaseTTS) -> None:
+        self.tts = tts
+        self._segments: Dict[str, Tuple[AudioParams, bytes]] = {}
+        """固定片段 -> 音频参数与 PCM 数据"""
+
+    @staticmethod
+    def _parse(template: str) -> List[Tuple[str, Optional[str]]]:
+        """
+        拆分模板，返回 [(固定片段, 其后的字段名)]
+        """
+        return [(literal, field) for literal, field, _, _ in Formatter().parse(template)]
+
+    @classmethod
+    def _trim(cls, params: AudioParams, frames: bytes) -> bytes:
+        """
+        裁剪首尾静音，避免拼接处出现过长的停顿
+        """
+        channels, sample_width, rate = params
+        block = channels * sample_width * int(rate * 0.01)
+        if not block:
+            return frames
+        blocks = [frames[i:i + block] for i in range(0, len(frames), block)]
+        voiced = [i for i, data in enumerate(blocks) if not is_silent(data, sample_width)]
+        if not voiced:
+            return frames
+        keep = int(cls.EDGE_SILENCE / 0.01)
+        start, end = max(voiced[0] - keep, 0), voiced[-1] + keep + 1
+        return b"".join(blocks[start:end])
+
+    async def _synthesize(self, text: str) -> Optional[Tuple[AudioParams, bytes]]:
+        clip = await self.tts.synthesize(text)
+        if clip is None:
+            return None
+        return clip.params, self._trim(clip.params, bytes(clip.pcm))
+
+    async def _segment(self, text: str) -> Optional[Tuple[AudioParams, bytes]]:
+        if text not in self._segments:
+            segment = await self._synthesize(text)
+            if segment is None:
+                return None
+            self._segments[text] = segment
+        return self._segments[text]
+
+    async def prepare(self):
+        """
+        预先生成所有已注册模板中的固定片段
+        """
+        literals = {
+            literal.strip()
+            for template in TEMPLATES
+            for literal, _ in self._parse(template)
+            if any(char.isalnum() for char in literal)
+        }
+        results = await asyncio.gather(*(self._segment(literal) for literal in literals), return_exceptions=True)
+        failed = sum(1 for result in results if not isinstance(result, tuple))
+        logger.info(f"模板语音片段已就绪: {len(literals) - failed}/{len(literals)}")
+
+    async def render(self, template: str, **fields: str) -> Optional[AudioClip]:
+        """
+        按模板生成语音
+
+        :param fields: 模板中各字段的值
+        :return: 拼接后的音频，片段生成失败或音频参数不一致时返回 None（调用方应退回整句合成）
+        """
+        parts: List[Tuple[AudioParams, bytes]] = []
+        for literal, field in self._parse(template):
+            texts = [(literal.strip(), True), (str(fields[field]).strip() if field else "", False)]
+            for text, is_fixed in texts:
+                if not any(char.isalnum() for char in text):
+                    continue
+                segment = await (self._segment(text) if is_fixed else self._synthesize(text))
+                if segment is None:
+                    return None
+                parts.append(segment)
+
+        if not parts or any(params != parts[0][0] for params, _ in parts):
+            return None
+
+        channels, sample_width, rate = parts[0][0]
+        return AudioClip(channels, sample_width, rate, memoryview(b"".join(frames for _, frames in parts)))
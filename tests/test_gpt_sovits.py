@@ -0,0 +1,180 @@
+"""
+GPT-SoVITS 客户端测试：在本地启动模拟 api_v2 `/tts` 接口的 aiohttp 服务器
+
+运行：python -m unittest tests.test_gpt_sovits
+"""
+
+import asyncio
+import io
+import os
+import unittest
+import wave
+
+from aiohttp import web
+
+from services.tts.gpt_sovits import GPTSoVITS
+
+RATE = 32000
+PCM = b"\x01\x02" * RATE
+"""一秒的 16bit 单声道音频"""
+
+
+def wav_header() -> bytes:
+    """流式模式下服务器先发送的 WAV 头（长度字段无效）"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(RATE)
+    return buffer.getvalue()
+
+
+def wav_file() -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(RATE)
+        wf.writeframes(PCM)
+    return buffer.getvalue()
+
+
+class StubServer:
+    """
+    模拟的 GPT-SoVITS 服务器
+
+    流式模式下先发送 WAV 头与前半段音频，等待 `release` 置位后再发送后半段，
+    以此验证客户端在整句合成完毕之前就能拿到音频。`drop` 置位时在发送后半段之前断开连接
+    """
+
+    def __init__(self) -> None:
+        self.payloads = []
+        self.release = asyncio.Event()
+        self.status = 200
+        self.drop = False
+        self.runner: web.AppRunner
+
+    async def tts(self, request: web.Request) -> web.StreamResponse:
+        payload = await request.json()
+        self.payloads.append(payload)
+        if self.status != 200:
+            return web.Response(status=self.status, text="模拟错误")
+        if not payload["streaming_mode"]:
+            return web.Response(body=wav_file(), content_type="audio/wav")
+
+        response = web.StreamResponse(headers={"Content-Type": "audio/wav"})
+        await response.prepare(request)
+        await response.write(wav_header())
+        # 奇数长度的写入，确保客户端按帧对齐切分
+        half = len(PCM) // 2 + 1
+        await response.write(PCM[:half])
+        await self.release.wait()
+        if self.drop:
+            request.transport.close()  # type:ignore
+            return response
+        await response.write(PCM[half:])
+        await response.write_eof()
+        return response
+
+    async def start(self) -> int:
+        app = web.Application()
+        app.router.add_post("/tts", self.tts)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        return self.runner.addresses[0][1]
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+class GPTSoVITSTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = StubServer()
+        port = await self.server.start()
+        self.config = {"host": "127.0.0.1", "port": port, "ref_audio_path": "ref.wav", "timeout": 5}
+        self.files = []
+
+    async def asyncTearDown(self):
+        await self.tts.close()
+        await self.server.stop()
+        for path in self.files:
+            os.remove(path)
+
+    def read_wav(self, path: str) -> bytes:
+        self.files.append(path)
+        with wave.open(path, "rb") as wf:
+            self.assertEqual((wf.getnchannels(), wf.getsampwidth(), wf.getframerate()), (1, 2, RATE))
+            return wf.readframes(wf.getnframes())
+
+    async def test_stream_yields_before_synthesis_finishes(self):
+        self.tts = GPTSoVITS({**self.config, "streaming_mode": True})
+        stream = self.tts.synthesize_stream("你好")
+
+        first = await asyncio.wait_for(stream.__anext__(), 2)
+        self.assertEqual(first.params, (1, 2, RATE))
+        self.assertEqual(len(first.pcm) % first.frame_size, 0)
+        self.assertFalse(self.server.release.is_set())
+
+        self.server.release.set()
+        rest = [clip async for clip in stream]
+        pcm = b"".join(bytes(clip.pcm) for clip in [first, *rest])
+        self.assertEqual(pcm, PCM)
+        self.assertTrue(self.server.payloads[0]["streaming_mode"])
+
+    async def test_stream_synthesize_joins_chunks(self):
+        self.tts = GPTSoVITS({**self.config, "streaming_mode": True})
+        self.server.release.set()
+        clip = await self.tts.synthesize("你好")
+        self.assertIsNotNone(clip)
+        self.assertEqual(bytes(clip.pcm), PCM)  # type:ignore
+        self.assertAlmostEqual(clip.duration, 1.0)  # type:ignore
+
+    async def test_synthesize_whole_wav(self):
+        self.tts = GPTSoVITS(self.config)
+        clip = await self.tts.synthesize("你好")
+        self.assertIsNotNone(clip)
+        self.assertEqual(bytes(clip.pcm), PCM)  # type:ignore
+        self.assertEqual(self.server.payloads[0]["text"], "你好")
+        self.assertEqual(self.server.payloads[0]["ref_audio_path"], "ref.wav")
+
+    async def test_stream_raises_when_connection_drops(self):
+        self.server.drop = True
+        self.tts = GPTSoVITS({**self.config, "streaming_mode": True})
+        stream = self.tts.synthesize_stream("你好")
+        await asyncio.wait_for(stream.__anext__(), 2)
+
+        self.server.release.set()
+        with self.assertRaises(Exception):
+            async for _ in stream:
+                pass
+
+    async def test_synthesize_returns_none_when_connection_drops(self):
+        self.server.drop = True
+        self.server.release.set()
+        self.tts = GPTSoVITS({**self.config, "streaming_mode": True})
+        self.assertIsNone(await self.tts.synthesize("你好"))
+
+    async def test_generate_whole_wav(self):
+        self.tts = GPTSoVITS(self.config)
+        path = await self.tts.generate_tts("你好")
+        self.assertIsNotNone(path)
+        self.assertEqual(self.read_wav(path), PCM)  # type:ignore
+
+    async def test_generate_stream_header_rewritten(self):
+        self.tts = GPTSoVITS({**self.config, "streaming_mode": True})
+        self.server.release.set()
+        path = await self.tts.generate_tts("你好")
+        self.assertIsNotNone(path)
+        self.assertEqual(self.read_wav(path), PCM)  # type:ignore
+
+    async def test_server_error_returns_none(self):
+        self.server.status = 400
+        self.tts = GPTSoVITS({**self.config, "streaming_mode": True})
+        self.assertIsNone(await self.tts.synthesize("你好"))
+        self.assertEqual([clip async for clip in self.tts.synthesize_stream("你好")], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -15,6 +15,12 @@ class WebUI:
         captions:ui.label
         bot:ui.label
         realtime_chat:ui.label
+        queue:ui.label
+        tts_cache:ui.label
+        tts_pool:ui.label
+        model_router:ui.label
+        warmup:ui.label
+        executors:ui.label
 
     class icon:
         all:ui.icon
@@ -74,6 +80,18 @@ class WebUI:
                             ui.label('实时聊天状态')
                             self.icon.realtime_chat = ui.icon('circle',color='red')
                             self.label.realtime_chat = ui.label('未启动')
+                        with ui.row().style('line-height: 1'):
+                            ui.label('启动预热')
+                            self.label.warmup = ui.label('预热中...').style('white-space: pre-line')
+
+                    with ui.card().classes('w-50'):
+                        ui.label('队列状态').style('font-size: large')
+                        self.label.queue = ui.label('未运行')
+                        self.label.tts_cache = ui.label('')
+                        self.label.tts_pool = ui.label('').style('white-space: pre-line')
+                        self.label.model_router = ui.label('').style('white-space: pre-line')
+                        self.label.executors = ui.label('').style('white-space: pre-line')
+                        ui.timer(2.0, self.refresh_queue_status)
 
                 with ui.card().classes('w-50'):
                     ui.label('总操作台').style('font-size: large')
@@ -124,6 +142,15 @@ class WebUI:
     def start(self):
         return self.__Load()
 
+    def refresh_queue_status(self):
+        if self.action:
+            self.label.queue.set_text(self.action.get_queue_status())
+            self.label.tts_cache.set_text(self.action.get_tts_cache_status())
+            self.label.tts_pool.set_text(self.action.get_tts_pool_status())
+            self.label.model_router.set_text(self.action.get_model_router_status())
+            self.label.warmup.set_text(self.action.get_warmup_status())
+            self.label.executors.set_text(self.action.get_executor_status())
+
     def change_all_status(self, status):
         if status:
             self.icon.all.classes('text-green')
@@ -1,9 +1,12 @@
 import logging
+from infra.runtime import run_blocking
 
 logger = logging.getLogger('Muice.SpeechRecognition')
 
 class SpeechRecognitionPipeline:
     _model = None
+    EXECUTOR = 'asr-cpu'
+    """执行模型加载与推理的线程池"""
 
     @classmethod
     def load_model(cls, model_path):
@@ -42,7 +45,9 @@ class SpeechRecognitionPipeline:
         logger.info("Generating speech...")
         if not self._model:
             return
-        rec_result = self._model.generate(
+        rec_result = await run_blocking(
+                                          self.EXECUTOR,
+                                          self._model.generate,
                                           input=file_path,
                                           cache={},
                                           language="zh", # "auto", "zh", "en", "yue", "ja", "ko", "nospeech"